@@ -15,17 +15,34 @@ DEBUG = os.getenv('DJANGO_DEBUG', 'True') == 'True'
 # ✅ Allowed Hosts (Update for Production)
 ALLOWED_HOSTS = ['127.0.0.1', 'localhost']
 
-# ✅ Database Configuration (PostgreSQL)
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.postgresql',
-        'NAME': os.getenv('DB_NAME', 'civicconnect_db'),
-        'USER': os.getenv('DB_USER', 'postgres'),
-        'PASSWORD': os.getenv('DB_PASSWORD', '555666'),  # Change in environment
-        'HOST': os.getenv('DB_HOST', 'localhost'),
-        'PORT': os.getenv('DB_PORT', '5432'),
+# ✅ Database Configuration (PostgreSQL; DB_ENGINE=sqlite for a local file, e.g. synthetic data and benchmarks)
+if os.getenv('DB_ENGINE', 'postgresql') == 'sqlite':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.getenv('DB_NAME', os.path.join(BASE_DIR, 'db.sqlite3')),
+            'OPTIONS': {
+                # Case-sensitive LIKE lets geohash prefix lookups (__startswith) use their index, as on
+                # PostgreSQL; WAL lets pages be read while a report is being written.
+                'init_command': 'PRAGMA case_sensitive_like=ON; PRAGMA journal_mode=WAL;',
+                # Writers queue for the lock at BEGIN instead of failing with "database is locked"
+                # when two transactions both try to upgrade from reading to writing.
+                'transaction_mode': 'IMMEDIATE',
+                'timeout': 20,
+            },
+        }
+    }
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.getenv('DB_NAME', 'civicconnect_db'),
+            'USER': os.getenv('DB_USER', 'postgres'),
+            'PASSWORD': os.getenv('DB_PASSWORD', '555666'),  # Change in environment
+            'HOST': os.getenv('DB_HOST', 'localhost'),
+            'PORT': os.getenv('DB_PORT', '5432'),
+        }
     }
-}
 
 # ✅ Login URL
 LOGIN_URL = '/citizen_login/'
@@ -44,6 +61,7 @@ INSTALLED_APPS = [
 
 # ✅ Middleware
 MIDDLEWARE = [
+    'reports.metrics.MetricsMiddleware',  # First, so its timings cover the whole stack
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -88,6 +106,63 @@ if DEBUG:
     import mimetypes
     mimetypes.add_type("image/svg+xml", ".svg", True)
 
+# ✅ Duplicate Detection
+DEDUP_RADIUS_METERS = 200  # Only issues this close to a new report are dedup candidates
+ISSUE_INDEX_PATH = os.path.join(BASE_DIR, "civicconnect_ai", "issue_vector_index.npz")
+
+# ✅ Dedup Cascade (cheap word2vec/TF-IDF pass before MiniLM; see reports/cascade.py)
+DEDUP_CASCADE_SCORER = 'word2vec'  # 'word2vec' (falls back to 'tfidf' without gensim), 'tfidf', or None for MiniLM only
+# Cheap score below this: not a duplicate, no MiniLM. Calibrated with `manage.py benchmark_cascade`: no
+# labelled duplicate in civicconnect_ai/dedup_pairs.csv may score below it (the lowest scores 0.008).
+DEDUP_CASCADE_REJECT_BELOW = 0.0
+DEDUP_CASCADE_ACCEPT_ABOVE = None  # Cheap score at or above this: duplicate, no MiniLM (None: MiniLM always decides)
+DEDUP_CASCADE_ACCEPT_MIN_COVERAGE = 0.9  # ...and only when this share of both texts' words is in the cheap vocabulary
+
+# ✅ Severity Model Evaluation
+SEVERITY_EVALUATOR = 'compiled'  # 'compiled' (NumPy trees, no xgboost needed) or 'xgboost'
+SEVERITY_BOOSTER_MIN_ROWS = 32  # Batches at least this big use xgboost when installed (faster there); None = never
+
+# ✅ Severity Inference Micro-batching
+SEVERITY_BATCH_MAX_SIZE = 64  # Rows per batched predict
+SEVERITY_BATCH_MAX_WAIT_MS = 5  # How long a lone request waits for company (0 disables batching)
+
+# ✅ Cache (Redis shares entries and rebuild locks across workers; per-process memory otherwise)
+if os.getenv('REDIS_URL'):
+    CACHES = {'default': {'BACKEND': 'django.core.cache.backends.redis.RedisCache', 'LOCATION': os.getenv('REDIS_URL')}}
+else:
+    CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+# ✅ Cached Issue Lists (trending, prioritized; see reports/view_cache.py)
+VIEW_CACHE_SECONDS = 60  # Longest a change that skips signals (raw SQL) can go unseen
+VIEW_CACHE_LOCK_SECONDS = 30  # A rebuild lock outlives a crashed rebuilder by at most this
+
+# ✅ Model Output Cache (see reports/ml_cache.py)
+ML_CACHE_MAX_ENTRIES = 10000  # Per cache, per process
+ML_CACHE_SHARED = os.getenv('ML_CACHE_SHARED')  # e.g. "django", "django:ml" or "file:/var/tmp/ml_cache.sqlite3"
+
+# ✅ Model Preloading (load models in the master process before workers fork, e.g. gunicorn --preload)
+PRELOAD_MODELS = os.getenv('CIVICCONNECT_PRELOAD_MODELS', '').lower() in ('1', 'true', 'yes')
+
+# ✅ Background Jobs (database queue; run workers with `manage.py run_jobs`)
+JOBS_RUN_INLINE = os.getenv('CIVICCONNECT_JOBS_INLINE', '').lower() in ('1', 'true', 'yes')  # Run on enqueue, no worker
+JOBS_RETRY_BASE_SECONDS = 5  # Retry n waits 5s x 2^(n-1)
+JOBS_LEASE_SECONDS = 300  # A job running longer than this is assumed orphaned and requeued
+
+# ✅ Officer Work Queue (see reports/work_queue.py; run `manage.py rekey_work_queue` after changing)
+WORK_QUEUE_AGING_PER_DAY = 0.5  # Priority points an open issue gains per day it waits
+
+# ✅ Trending (see reports/trending.py; run `manage.py rebuild_heat` after changing)
+TRENDING_HALF_LIFE_HOURS = 24  # A report counts half as much towards an issue's heat after this long
+
+# ✅ Request Metrics (Prometheus text at /metrics/; see reports/metrics.py)
+METRICS_ALLOWED_IPS = [ip for ip in os.getenv('METRICS_ALLOWED_IPS', '127.0.0.1,::1').split(',') if ip]
+
+# ✅ Scheduler (`manage.py run_scheduler`; periodic jobs live in reports/cron.py)
+SCHEDULER_LOCK_SECONDS = 600  # Lease on the single-scheduler lock; a dead scheduler's lock lapses after this
+SCHEDULER_HEARTBEAT_SECONDS = 60  # Long jobs renew the lease from inside at most this often
+SCHEDULE_REPRIORITIZE_SECONDS = 5 * 60
+SCHEDULE_TEXT_INDEX_SECONDS = 24 * 60 * 60
+
 # ✅ Internationalization
 LANGUAGE_CODE = 'en-us'
 TIME_ZONE = 'Asia/Kolkata'
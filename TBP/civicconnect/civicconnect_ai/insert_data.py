@@ -1,3 +1,4 @@
+import hashlib
 import psycopg2
 from datetime import datetime, timedelta
 import random
@@ -99,11 +100,11 @@ for issue in REAL_ISSUES:
         cursor.execute(
             """
             INSERT INTO reports_issue 
-            (user_id, username, email, description, location_name, latitude, longitude, created_at, report_count, severity, priority_score, priority, status, title)
-            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, 'Pending', %s)
-            ON CONFLICT (description, latitude, longitude) DO NOTHING
+            (user_id, username, email, description, description_hash, location_name, latitude, longitude, created_at, report_count, severity, priority_score, priority, status, title)
+            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, 'Pending', %s)
+            ON CONFLICT (description_hash, latitude, longitude) DO NOTHING
             """,
-            (user_id, username, email, description, location_name, latitude, longitude, created_at, report_count, severity, priority_score, priority, title)
+            (user_id, username, email, description, hashlib.blake2b(description.encode(), digest_size=16).hexdigest(), location_name, latitude, longitude, created_at, report_count, severity, priority_score, priority, title)
         )
         conn.commit()  # ✅ Commit after each successful insert
 
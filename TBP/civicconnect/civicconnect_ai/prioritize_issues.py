@@ -1,74 +1,39 @@
-import psycopg2
-import pandas as pd
-from collections import Counter
-import joblib
-
-# ----------------------
-# Database Configuration
-# ----------------------
-DB_NAME = "civicconnect_db"
-DB_USER = "postgres"
-DB_PASSWORD = "555666"
-DB_HOST = "localhost"
-DB_PORT = "5432"
+import os
+import sys
 
-# ----------------------
-# Load AI Model & Vectorizer
-# ----------------------
-severity_model = joblib.load("civicconnect_ai/ai_severity_model.pkl")
-vectorizer = joblib.load("civicconnect_ai/tfidf_vectorizer.pkl")
+import django
+import pandas as pd
 
 # ----------------------
-# Connect to PostgreSQL and Fetch Issues
+# Django Setup
 # ----------------------
-conn = psycopg2.connect(
-    dbname=DB_NAME, user=DB_USER, password=DB_PASSWORD,
-    host=DB_HOST, port=DB_PORT
-)
-cursor = conn.cursor()
-
-query = """
-SELECT id, description, location_name, latitude, longitude, created_at, user_id
-FROM reports_issue;
-"""
-df = pd.read_sql(query, conn)
+# Scores go through the app's own engine (reports.scoring) so this script,
+# the dashboards and the cron job always agree on an issue's priority.
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "civicconnect.settings")
+django.setup()
 
-cursor.close()
-conn.close()
+from reports.models import Issue  # noqa: E402
+from reports.scoring import reprioritize  # noqa: E402
 
 # ----------------------
-# Calculate Priority Function
+# Re-score Issues in the Database
 # ----------------------
-def calculate_priority(df):
-    # Count how many reports in the same coordinates
-    area_counts = Counter(zip(df["latitude"], df["longitude"]))
-    df["Repeated_Reports"] = df.apply(
-        lambda row: area_counts[(row["latitude"], row["longitude"])], axis=1
-    )
-
-    # Predict severity from description
-    X_text = df["description"].fillna("")
-    X_vectorized = vectorizer.transform(X_text)
-    df["Severity_Score"] = severity_model.predict(X_vectorized)
-
-    # Add location-based weight (critical areas get higher score)
-    df["Location_Weight"] = df["location_name"].apply(
-        lambda loc: 1.5 if any(word in loc.lower() for word in ["hospital", "school", "junction", "main road", "market"]) else 1
-    )
-
-    # Combine everything into final score
-    df["Priority_Score"] = (
-        df["Severity_Score"] * 0.6 +          # AI severity has more weight
-        df["Repeated_Reports"] * 0.3 +        # Repeat boosts priority
-        df["Location_Weight"] * 0.1           # Important area boost
-    )
-
-    return df.sort_values(by="Priority_Score", ascending=False)
+stats = reprioritize()
+print(f"✅ Scanned {stats['scanned']} issues, updated {stats['updated']}.")
 
 # ----------------------
-# Run Prioritization and Save
+# Export Prioritized Issues
 # ----------------------
-df_prioritized = calculate_priority(df)
-df_prioritized.to_csv("civicconnect_ai/prioritized_issues.csv", index=False)
+columns = ["id", "description", "location_name", "latitude", "longitude", "created_at", "user_id",
+           "report_count", "severity", "priority_score"]
+rows = Issue.objects.order_by("-priority_score", "-report_count", "-id").values_list(*columns)
+df = pd.DataFrame.from_records(rows.iterator(chunk_size=2000), columns=columns)
+df = df.rename(columns={
+    "report_count": "Repeated_Reports",
+    "severity": "Severity_Score",
+    "priority_score": "Priority_Score",
+})
+df.to_csv("civicconnect_ai/prioritized_issues.csv", index=False)
 
 print("✅ Issues prioritized and saved to 'civicconnect_ai/prioritized_issues.csv'")
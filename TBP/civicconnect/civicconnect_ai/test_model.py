@@ -4,15 +4,14 @@ os.environ['TF_CPP_MIN_LOG_LEVEL'] = '3'
 import warnings
 warnings.filterwarnings('ignore')
 
-import pickle
+import sys
 
-# 🔹 Load trained model
-with open("ai_severity_model.pkl", "rb") as f:
-    model = pickle.load(f)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from reports.model_registry import load_severity_model  # noqa: E402
 
-# 🔹 Load TF-IDF vectorizer (instead of SentenceTransformer)
-with open("tfidf_vectorizer.pkl", "rb") as f:
-    vectorizer = pickle.load(f)
+# 🔹 Load the active model (booster + TF-IDF features) from the registry
+model = load_severity_model()
+print(f"Model version: {model.version}")
 
 # 🔹 Test civic issue descriptions
 test_descriptions = [
@@ -21,11 +20,8 @@ test_descriptions = [
     "A garbage bin is overflowing near the park entrance.",  # Low
 ]
 
-# 🔹 Transform using the TF-IDF vectorizer
-X_test = vectorizer.transform(test_descriptions)
-
-# 🔹 Predict severity
-y_pred = model.predict(X_test)
+# 🔹 Predict severity (TF-IDF transform happens inside the model)
+y_pred = model.predict(test_descriptions)
 
 # 🔹 Map output back to severity labels
 severity_map = {0: "Low", 1: "Medium", 2: "High"}
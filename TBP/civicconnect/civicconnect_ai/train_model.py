@@ -1,5 +1,7 @@
+import os
+import sys
+
 import pandas as pd
-import pickle
 import numpy as np
 from collections import Counter
 from sklearn.feature_extraction.text import TfidfVectorizer
@@ -9,6 +11,10 @@ from sklearn.utils.class_weight import compute_class_weight
 from imblearn.over_sampling import SMOTE
 import xgboost as xgb
 
+# Models are saved in the app's registry format (see reports/model_registry.py)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from reports.model_registry import load_severity_model, set_current, write_severity_artifact  # noqa: E402
+
 # 📥 Load dataset
 df = pd.read_csv("issues_dataset.csv", encoding="utf-8", on_bad_lines="skip")
 df.dropna(subset=["description", "severity"], inplace=True)
@@ -38,10 +44,6 @@ vectorizer = TfidfVectorizer(max_features=5000, stop_words='english')
 X = vectorizer.fit_transform(df["description"])
 y = df["severity"]
 
-# 💾 Save vectorizer
-with open("civicconnect_ai/tfidf_vectorizer.pkl", "wb") as f:
-    pickle.dump(vectorizer, f)
-
 # 📊 Class distribution before SMOTE
 class_counts = Counter(y)
 print(f"Class distribution before SMOTE: {class_counts}")
@@ -91,13 +93,34 @@ model = xgb.XGBClassifier(
 
 model.fit(X_train, y_train)
 
-# 💾 Save trained model
-with open("civicconnect_ai/ai_severity_model.pkl", "wb") as f:
-    pickle.dump(model, f)
-
 # 📈 Evaluate model
 y_pred = model.predict(X_test)
 accuracy = accuracy_score(y_test, y_pred)
 print(f"\n📊 Model Accuracy: {accuracy:.2f}")
 print("\nClassification Report:")
 print(classification_report(y_test, y_pred))
+
+# 💾 Save booster, its compiled NumPy trees and the vectorizer as a new registry version.
+version = write_severity_artifact(
+    model.get_booster(),
+    vectorizer,
+    classes=model.classes_,
+    metadata={"source": "train_model.py", "accuracy": round(float(accuracy), 4), "train_rows": int(X_train.shape[0])},
+    activate=False,
+)
+print(f"\n💾 Saved severity model {version}")
+
+# 🔍 Servers score with the compiled trees: they must agree with xgboost on every held-out row.
+ensemble = load_severity_model(version).ensemble
+if ensemble is not None:
+    X_check = X_test.tocsr()
+    compiled_pred = model.classes_[ensemble.predict_sparse(X_check.indptr, X_check.indices, X_check.data)]
+    mismatches = int(np.count_nonzero(compiled_pred != y_pred))
+    if mismatches:
+        print(f"❌ Compiled trees disagree with xgboost on {mismatches} of {len(y_pred)} test rows; {version} NOT activated.")
+        sys.exit(1)
+    print(f"✅ Compiled trees match xgboost on all {len(y_pred)} test rows.")
+
+# 🚀 Make it live. Running servers switch to it within a few seconds; no restart needed.
+set_current(version)
+print(f"🚀 {version} is now the active severity model.")
@@ -1,85 +1,37 @@
 import numpy as np
-import pandas as pd
-from django.utils.timezone import now
-from reports.models import Issue
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
 
-# ✅ Define priority mappings
-PRIORITY_MAPPING = {"High": 3, "Medium": 2, "Low": 1}
-HIGH_PRIORITY_ISSUES = {"accident", "fire", "emergency", "water leakage", "tree fallen", "gas leak", "bridge collapse"}
-MEDIUM_PRIORITY_ISSUES = {"pothole", "flood", "broken road", "open manhole", "streetlight failure"}
-LOW_PRIORITY_ISSUES = {"garbage", "noise", "graffiti", "stray animals", "general complaints"}
+from . import text_index
+from .scoring import reprioritize
 
-def compute_severity(description):
-    """Assigns a severity score (1-5) based on issue keywords."""
-    if not description:
-        return 2  # Default moderate severity
-
-    description = description.lower()
-    words = set(description.split())  # Convert description into a set of words
-
-    if words & HIGH_PRIORITY_ISSUES:
-        return 4  # High severity
-    elif words & MEDIUM_PRIORITY_ISSUES:
-        return 3  # Medium severity
-    elif words & LOW_PRIORITY_ISSUES:
-        return 1  # Low severity
-    return 2  # Default severity
 
 def calculate_priority():
-    """Dynamically updates issue priority based on frequency and severity."""
-    issues = Issue.objects.all()
-    if not issues.exists():
+    """Re-scores every issue with the shared scoring engine, in chunks, writing back only changed rows."""
+    stats = reprioritize()
+    if not stats["scanned"]:
         print("⚠ No issues found.")
         return
+    print(f"✅ Prioritization Completed! Updated {stats['updated']} of {stats['scanned']} issues.")
 
-    # Convert queryset to DataFrame
-    data = pd.DataFrame(list(issues.values("id", "description", "report_count", "created_at")))
-
-    if data.empty:
-        print("⚠ No valid data to process.")
-        return
-
-    # ✅ Compute severity based on description
-    data["severity"] = data["description"].apply(compute_severity)
-
-    # ✅ Normalize report count using log function
-    data["normalized_reports"] = np.log1p(data["report_count"])
-
-    # ✅ Compute priority score with restricted report impact on low severity
-    def compute_priority_score(row):
-        if row["severity"] == 1:
-            return 1.0  # Fixed for low severity
-        else:
-            return (0.7 * row["severity"]) + (0.3 * row["normalized_reports"])
 
-    data["priority_score"] = data.apply(compute_priority_score, axis=1)
+def is_similar_issue(new_desc, existing_desc_list=None, threshold=0.8):
+    """Checks if the new issue description is similar to any existing ones using TF-IDF.
 
-    # ✅ Assign priority levels based on computed score
-    def assign_priority(score):
-        if score > 4:
-            return 3  # High
-        elif score > 2.5:
-            return 2  # Medium
-        return 1  # Low
-
-    data["priority"] = data["priority_score"].apply(assign_priority)
-
-    # ✅ Bulk update database records
-    updates = [
-        Issue(id=row["id"], severity=row["severity"], priority_score=row["priority_score"], priority=row["priority"])
-        for _, row in data.iterrows()
-    ]
-
-    Issue.objects.bulk_update(updates, ["severity", "priority_score", "priority"])
-    print(f"✅ Prioritization Completed! Updated {len(updates)} issues.")
-
-def is_similar_issue(new_desc, existing_desc_list, threshold=0.8):
-    """Checks if the new issue description is similar to any existing ones using TF-IDF."""
+    Without `existing_desc_list`, searches the persistent index of open
+    issues (reports.text_index) and returns (True, issue id) on a match.
+    With a list, fits TF-IDF on it and returns (True, list index).
+    """
+    if existing_desc_list is None and new_desc:
+        hits = text_index.search(new_desc, k=1)
+        if hits and hits[0][1] >= threshold:
+            return True, hits[0][0]
+        return False, None
     if not existing_desc_list or not new_desc:
         return False, None
 
+    # scikit-learn (and scipy behind it) takes over a second to import; only pay that when used.
+    from sklearn.feature_extraction.text import TfidfVectorizer
+    from sklearn.metrics.pairwise import cosine_similarity
+
     vectorizer = TfidfVectorizer()
     vectors = vectorizer.fit_transform([new_desc] + existing_desc_list)
 
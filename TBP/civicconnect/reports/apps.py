@@ -1,6 +1,14 @@
 from django.apps import AppConfig
+from django.conf import settings
 
 
 class ReportsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'reports'
+
+    def ready(self):
+        from . import signals, tasks  # noqa: F401
+
+        if settings.PRELOAD_MODELS:
+            from .preload import preload_models
+            preload_models()
@@ -0,0 +1,149 @@
+"""Load-balanced officer assignment.
+
+Every officer carries open_issue_count: the number of unsolved issues
+assigned to them. Issue.save() keeps it current. An assignment, or a status
+change to or from Solved (update_progress), moves the count by one with an
+F() update. pick_officer() then reads the head of the
+(department, open_issue_count, id) index: the least-loaded officer of the
+department the issue belongs to, falling back to any department. That is
+one index seek whatever the number of officers, where
+ORDER BY RANDOM() sorted the whole table.
+
+assign_bulk() does the same for a backlog in one pass. It keeps the
+candidates in a heap, so m issues over n officers cost O((n + m) log n),
+with one UPDATE per distinct load increment.
+
+`manage.py benchmark_assignment` measures both paths at 10k officers.
+"""
+import heapq
+from collections import Counter, defaultdict
+
+from django.db.models import Count, F, Q
+
+# The first department whose keywords appear in a description handles it; officers'
+# `department` must match these names exactly. Anything else goes to any officer.
+DEPARTMENT_KEYWORDS = {
+    "Roads": ("pothole", "road", "traffic", "signage", "sidewalk", "parking", "pathway", "bus stop"),
+    "Sanitation": ("garbage", "waste", "dumping", "litter", "unhygienic", "rodent", "toilet"),
+    "Water": ("water", "sewage", "drain", "flood", "leak", "manhole", "pipe"),
+    "Electricity": ("power", "electric", "streetlight", "street light", "wire", "outage"),
+}
+UPDATE_BATCH_SIZE = 500
+
+
+def department_for(description):
+    lowered = (description or "").lower()
+    for department, keywords in DEPARTMENT_KEYWORDS.items():
+        if any(word in lowered for word in keywords):
+            return department
+    return None
+
+
+def pick_officer(description=None):
+    """The least-loaded officer for this description's department (any officer if none match)."""
+    from .models import Officer
+
+    department = department_for(description)
+    officer = None
+    if department is not None:
+        officer = Officer.objects.filter(department=department).order_by("open_issue_count", "id").first()
+    if officer is None:
+        officer = Officer.objects.order_by("open_issue_count", "id").first()
+    return officer
+
+
+def open_load(officer_id, status):
+    """The officer whose counter an issue contributes to (None when solved or unassigned)."""
+    return officer_id if status != "Solved" else None
+
+
+def move_load(old_officer_id, new_officer_id):
+    """Moves one open issue's worth of load between officers' counters."""
+    from .models import Officer
+
+    if old_officer_id == new_officer_id:
+        return
+    if old_officer_id is not None:
+        Officer.objects.filter(id=old_officer_id).update(open_issue_count=F("open_issue_count") - 1)
+    if new_officer_id is not None:
+        Officer.objects.filter(id=new_officer_id).update(open_issue_count=F("open_issue_count") + 1)
+
+
+def _add_load(increments):
+    """Applies {officer_id: n} to the counters, one UPDATE per distinct n (and id batch)."""
+    from .models import Officer
+
+    by_amount = defaultdict(list)
+    for officer_id, amount in increments.items():
+        by_amount[amount].append(officer_id)
+    for amount, officer_ids in by_amount.items():
+        for start in range(0, len(officer_ids), UPDATE_BATCH_SIZE):
+            Officer.objects.filter(id__in=officer_ids[start:start + UPDATE_BATCH_SIZE]).update(
+                open_issue_count=F("open_issue_count") + amount
+            )
+
+
+def plan_bulk(descriptions):
+    """Chooses an officer for each description, spreading load; returns a list of officer ids (or None).
+
+    Issues are handed out greedily to whoever is least loaded at that point,
+    counting what this batch has already handed out. Nothing is written.
+    """
+    from .models import Officer
+
+    load = {}
+    heaps = defaultdict(list)  # department -> [(load, officer id)]
+    everyone = []
+    for officer_id, department, count in Officer.objects.values_list("id", "department", "open_issue_count"):
+        load[officer_id] = count
+        heaps[department].append((count, officer_id))
+        everyone.append((count, officer_id))
+    for heap in heaps.values():
+        heapq.heapify(heap)
+    heapq.heapify(everyone)
+
+    chosen = []
+    for description in descriptions:
+        heap = heaps.get(department_for(description)) or everyone
+        if not heap:
+            chosen.append(None)
+            continue
+        # An officer sits in two heaps (their department's and everyone's), so an entry
+        # may predate a pick made through the other heap. Loads only grow, so stale
+        # entries rise to the top, where they are refreshed before being trusted.
+        while heap[0][0] != load[heap[0][1]]:
+            heapq.heapreplace(heap, (load[heap[0][1]], heap[0][1]))
+        officer_id = heap[0][1]
+        load[officer_id] += 1
+        heapq.heapreplace(heap, (load[officer_id], officer_id))
+        chosen.append(officer_id)
+    return chosen
+
+
+def assign_bulk(issue_ids, descriptions):
+    """Assigns officers to open issues in one pass and updates their counters.
+
+    Returns {issue_id: officer_id}. Callers write assigned_officer themselves
+    (see scoring.reprioritize) or use the mapping as they see fit.
+    """
+    chosen = plan_bulk(descriptions)
+    assignments = {issue_id: officer_id for issue_id, officer_id in zip(issue_ids, chosen) if officer_id is not None}
+    _add_load(Counter(assignments.values()))
+    return assignments
+
+
+def recount():
+    """Recomputes every officer's open_issue_count from the issues table. Returns officers changed."""
+    from .models import Officer
+
+    counts = Officer.objects.annotate(
+        actual=Count("issue", filter=~Q(issue__status="Solved"))
+    ).values_list("id", "open_issue_count", "actual")
+    changed = defaultdict(list)
+    for officer_id, stored, actual in counts:
+        if stored != actual:
+            changed[actual].append(officer_id)
+    for actual, officer_ids in changed.items():
+        for start in range(0, len(officer_ids), UPDATE_BATCH_SIZE):
+            Officer.objects.filter(id__in=officer_ids[start:start + UPDATE_BATCH_SIZE]).update(open_issue_count=actual)
+    return sum(len(ids) for ids in changed.values())
@@ -0,0 +1,193 @@
+"""Cheap first-stage similarity for the dedup cascade.
+
+Every candidate is first scored with a cheap text vector: averaged word2vec
+vectors from civicconnect_ai/word2vec_model.bin, or the severity model's
+TF-IDF features when gensim isn't installed, over the text's words minus
+STOPWORDS. A cheap score below DEDUP_CASCADE_REJECT_BELOW settles "not a
+duplicate"; everything else is re-scored with MiniLM (see
+dedup.find_duplicate_cascade). If every candidate is rejected, the new
+report's MiniLM embedding isn't needed for dedup at all.
+
+A rejected real duplicate is a duplicate issue filed, so the threshold is
+set from labelled pairs (civicconnect_ai/dedup_pairs.csv): `manage.py
+benchmark_cascade` reports the highest threshold that loses none of them.
+Paraphrases share few known words ("Water pipe burst flooding the street"
+vs "Broken water main flooding road" scores 0.2), which keeps it low.
+
+The cheap vocabularies are small and unknown words are simply dropped, so
+a high cheap score often means "the few known words match" ("Garbage piled
+up" vs "Garbage truck ran over a cyclist" scores 1.0). Settling
+"duplicate" on the cheap score alone is therefore off by default
+(DEDUP_CASCADE_ACCEPT_ABOVE = None). When enabled, it also requires
+DEDUP_CASCADE_ACCEPT_MIN_COVERAGE of both texts' words to be known.
+"""
+import os
+import re
+import threading
+import time
+
+import numpy as np
+from django.conf import settings
+
+WORD2VEC_PATH = os.path.join(os.path.dirname(__file__), '../civicconnect_ai/word2vec_model.bin')
+_TOKEN = re.compile(r"\w+")
+# Function words carry no topic, but in a mean over a handful of words they pull texts
+# together ("the", "on") or apart; note "not" stays ("not working").
+STOPWORDS = frozenset(
+    "a an and any are as at be been being but by can could did do does for from had has have how i if in "
+    "into is it its me my of on onto or our since so some than that the their them then there these they "
+    "this those to too until up us very was we were what when where which while who why will with would "
+    "you your".split()
+)
+
+
+def words(text):
+    """The words the cheap scorers look at: every token of `text` that isn't a stopword."""
+    return [token for token in _TOKEN.findall(text) if token.lower() not in STOPWORDS]
+
+
+def _known_share(lookups):
+    return sum(found is not None for found in lookups) / len(lookups) if lookups else 0.0
+
+
+class Word2VecScorer:
+    name = "word2vec"
+
+    def __init__(self, path=WORD2VEC_PATH):
+        from gensim.models import Word2Vec
+
+        vectors = Word2Vec.load(path).wv
+        self.index = dict(vectors.key_to_index)
+        matrix = np.asarray(vectors.vectors, dtype=np.float32)
+        self.matrix = matrix / np.maximum(np.linalg.norm(matrix, axis=1, keepdims=True), 1e-12)
+
+    def _lookup(self, token):
+        # The vocabulary keeps the training text's case ("Highway"), so try it as written first.
+        index = self.index.get(token)
+        return self.index.get(token.lower()) if index is None else index
+
+    def coverage(self, texts):
+        """Share of each text's words that are in the vocabulary (0 for a text with no words)."""
+        return np.array([_known_share([self._lookup(token) for token in words(text)]) for text in texts])
+
+    def vectors(self, texts):
+        """Unit-length mean word vector per text; a zero row when no word is known."""
+        out = np.zeros((len(texts), self.matrix.shape[1]), dtype=np.float32)
+        for row, text in enumerate(texts):
+            rows = [i for i in map(self._lookup, words(text)) if i is not None]
+            if rows:
+                mean = self.matrix[rows].mean(axis=0)
+                out[row] = mean / (np.linalg.norm(mean) or 1.0)
+        return out
+
+
+class TfidfScorer:
+    name = "tfidf"
+
+    def coverage(self, texts):
+        """Share of each text's words that are in the severity model's vocabulary."""
+        from .models import get_severity_model
+
+        vocabulary = get_severity_model().features.vocabulary
+        return np.array([_known_share([vocabulary.get(token.lower()) for token in words(text)]) for text in texts])
+
+    def vectors(self, texts):
+        """L2-normalised TF-IDF rows from the active severity model's vocabulary."""
+        from .models import get_severity_model
+
+        features = get_severity_model().features
+        indptr, indices, data = features.transform_arrays([" ".join(words(text)) for text in texts])
+        out = np.zeros((len(texts), len(features.terms)), dtype=np.float32)
+        out[np.repeat(np.arange(len(texts)), np.diff(indptr)), indices] = data
+        return out
+
+
+class CascadeStats:
+    """How many comparisons each stage settled, and what the skipped MiniLM work would have cost."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.comparisons = 0
+        self.rejected = 0  # Settled by the cheap stage as not a duplicate
+        self.accepted = 0  # Settled by the cheap stage as a duplicate
+        self.rescored = 0  # Sent to MiniLM
+        self.queries_skipped = 0  # Reports whose MiniLM embedding dedup never needed
+        self.cheap_seconds = 0.0
+        self.minilm_seconds = 0.0
+        self.minilm_reports = 0
+
+    def record(self, rejected, accepted, rescored, cheap_seconds, minilm_seconds=None):
+        with self._lock:
+            self.comparisons += rejected + accepted + rescored
+            self.rejected += rejected
+            self.accepted += accepted
+            self.rescored += rescored
+            self.cheap_seconds += cheap_seconds
+            if minilm_seconds is None:
+                self.queries_skipped += 1
+            else:
+                self.minilm_seconds += minilm_seconds
+                self.minilm_reports += 1
+
+    def as_dict(self):
+        with self._lock:
+            # MiniLM's cost is mostly encoding the report itself, so charge the mean MiniLM
+            # stage time per report for every report the cheap stage settled on its own,
+            # minus what the cheap stage cost across all reports.
+            per_report = self.minilm_seconds / self.minilm_reports if self.minilm_reports else 0.0
+            return {
+                "scorer": getattr(_scorer, "name", None),
+                "comparisons": self.comparisons,
+                "settled_cheap_reject": self.rejected,
+                "settled_cheap_accept": self.accepted,
+                "rescored_minilm": self.rescored,
+                "queries_skipped": self.queries_skipped,
+                "cheap_seconds": self.cheap_seconds,
+                "minilm_seconds": self.minilm_seconds,
+                "estimated_saved_seconds": self.queries_skipped * per_report - self.cheap_seconds,
+            }
+
+
+stats = CascadeStats()
+
+_scorer = None
+_scorer_lock = threading.Lock()
+
+
+def get_scorer():
+    """The configured cheap scorer, or None when the cascade is disabled."""
+    global _scorer
+    if _scorer is None and settings.DEDUP_CASCADE_SCORER:
+        with _scorer_lock:
+            if _scorer is None:
+                if settings.DEDUP_CASCADE_SCORER == "word2vec":
+                    try:
+                        _scorer = Word2VecScorer()
+                    except ImportError:  # gensim not installed
+                        _scorer = TfidfScorer()
+                elif settings.DEDUP_CASCADE_SCORER == "tfidf":
+                    _scorer = TfidfScorer()
+                else:
+                    raise ValueError(f"Unknown DEDUP_CASCADE_SCORER: {settings.DEDUP_CASCADE_SCORER!r}")
+    return _scorer
+
+
+def cheap_scores(description, candidate_descriptions, scorer=None):
+    """Cosine similarity of `description` to each candidate under the cheap scorer.
+
+    A text the scorer knows no words of gets NaN: the cheap stage can't
+    judge it, so it lands in the uncertainty band.
+    """
+    from .metrics import ml_timer
+
+    scorer = scorer or get_scorer()
+    start = time.perf_counter()
+    with ml_timer():
+        vectors = scorer.vectors([description] + list(candidate_descriptions))
+    scores = vectors[1:] @ vectors[0]
+    known = vectors.any(axis=1)
+    scores[~(known[1:] & known[0])] = np.nan
+    return scores, time.perf_counter() - start
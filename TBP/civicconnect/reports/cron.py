@@ -1,5 +1,39 @@
+"""Periodic jobs for `manage.py run_scheduler` (see reports.scheduler)."""
+from datetime import timedelta
+
+from django.conf import settings
+
 from .ai_prioritization import calculate_priority
+from .scheduler import heartbeat, periodic
+
+# updated_at is stamped when save() runs, not when its transaction commits, and app servers'
+# clocks may lag the scheduler's; look this far behind the mark so neither loses a change.
+HIGH_WATER_OVERLAP = timedelta(seconds=60)
+
 
 def run_cron_job():
     print("Running AI prioritization...")
     calculate_priority()
+
+
+@periodic("reprioritize", settings.SCHEDULE_REPRIORITIZE_SECONDS)
+def reprioritize_changed(since):
+    """Re-scores issues saved since the last successful run (all of them on the first run).
+
+    Issues scored by an older model or formula are picked up by `manage.py
+    refresh_priorities`, run after a new severity model is activated.
+    """
+    from .models import Issue
+    from .scoring import reprioritize
+
+    queryset = Issue.objects.all() if since is None else Issue.objects.filter(updated_at__gte=since - HIGH_WATER_OVERLAP)
+    stats = reprioritize(queryset, progress=heartbeat)
+    return {"rows": stats["scanned"], "updated": stats["updated"], "since": since and since.isoformat()}
+
+
+@periodic("rebuild_text_index", settings.SCHEDULE_TEXT_INDEX_SECONDS)
+def rebuild_text_index(since):
+    """Renormalises the TF-IDF postings (reports.text_index) against current document frequencies."""
+    from . import text_index
+
+    return {"rows": text_index.rebuild(progress=heartbeat)}
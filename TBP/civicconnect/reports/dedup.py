@@ -0,0 +1,163 @@
+import time
+
+import numpy as np
+from django.conf import settings
+from django.utils import timezone
+
+from . import embeddings
+from .geo import within_radius
+
+SIMILARITY_THRESHOLD = 0.75  # 75% semantic similarity threshold
+MAX_CANDIDATES = 20  # Nearest neighbours pulled from the vector index per report
+MAX_LOCAL_CANDIDATES = 200  # Closest issues pulled from the geohash index per report
+
+
+def is_match(score, threshold=SIMILARITY_THRESHOLD, inclusive=True):
+    return score >= threshold if inclusive else score > threshold
+
+
+def best_match(query, matrix, threshold=SIMILARITY_THRESHOLD, inclusive=True):
+    """Scores every row of `matrix` against `query` in one product.
+
+    Returns (index, score) of the highest-scoring row, or (None, best_score)
+    when no row clears the threshold.
+    """
+    if len(matrix) == 0:
+        return None, None
+    scores = matrix @ query
+    index = int(np.argmax(scores))
+    score = float(scores[index])
+    if is_match(score, threshold, inclusive):
+        return index, score
+    return None, score
+
+
+def first_match_sequential(query, vectors, threshold=SIMILARITY_THRESHOLD, inclusive=True):
+    """Reference per-candidate scan: returns the first vector over the threshold."""
+    for index, vector in enumerate(vectors):
+        score = float(vector @ query)
+        if is_match(score, threshold, inclusive):
+            return index, score
+    return None, None
+
+
+def candidate_matrix(issues):
+    """Stacks the stored embeddings of `issues` into one (n, dim) matrix.
+
+    Issues without an up-to-date embedding are encoded together in a single
+    batch and written back, so later checks hit the stored vector.
+    """
+    from .models import Issue
+
+    issues = list(issues)
+    stale = [issue for issue in issues if issue._embedding_is_stale()]
+    if stale:
+        vectors = embeddings.encode_many([issue.description for issue in stale])
+        now = timezone.now()
+        for issue, vector in zip(stale, vectors):
+            issue.embedding = embeddings.to_bytes(vector)
+            issue.embedding_version = embeddings.embedding_version()
+            issue.updated_at = now  # So vector indexes resync the row (see vector_index.sync)
+            issue._loaded_description = issue.description
+        Issue.objects.bulk_update(stale, ["embedding", "embedding_version", "updated_at"])
+
+    if not issues:
+        return issues, np.zeros((0, embeddings.EMBEDDING_DIM), dtype=embeddings.EMBEDDING_DTYPE)
+    buffer = b"".join(bytes(issue.embedding) for issue in issues)
+    matrix = np.frombuffer(buffer, dtype=embeddings.EMBEDDING_DTYPE).reshape(len(issues), -1)
+    return issues, matrix
+
+
+def find_duplicate(query, candidates, threshold=SIMILARITY_THRESHOLD, inclusive=True):
+    """Returns (issue, score) for the most similar candidate, or (None, None)."""
+    issues, matrix = candidate_matrix(candidates)
+    index, score = best_match(query, matrix, threshold, inclusive)
+    if index is None:
+        return None, None
+    return issues[index], score
+
+
+def find_duplicate_cascade(description, candidates, query, threshold=SIMILARITY_THRESHOLD, inclusive=True):
+    """find_duplicate() behind a cheap first stage (see cascade.py).
+
+    `query` is the MiniLM embedding of `description`, or a callable returning
+    it; it is only called if some candidate needs re-scoring by MiniLM.
+    Candidates the cheap stage accepts (only when DEDUP_CASCADE_ACCEPT_ABOVE
+    is set, and both texts are mostly in its vocabulary) count as duplicates
+    with their cheap score. Returns (issue, score) or (None, None).
+    """
+    from . import cascade
+
+    candidates = list(candidates)
+    if not candidates or cascade.get_scorer() is None:
+        if not candidates:
+            return None, None
+        return find_duplicate(query() if callable(query) else query, candidates, threshold, inclusive)
+
+    scores, cheap_seconds = cascade.cheap_scores(description, [issue.description for issue in candidates])
+    known = ~np.isnan(scores)
+    reject = known & (scores < settings.DEDUP_CASCADE_REJECT_BELOW)
+    accept = np.zeros_like(known)
+    if settings.DEDUP_CASCADE_ACCEPT_ABOVE is not None:
+        accept = known & (scores >= settings.DEDUP_CASCADE_ACCEPT_ABOVE)
+        if accept.any():
+            # A high score from a couple of known words says little; require most words known on both sides.
+            coverage = cascade.get_scorer().coverage([description] + [issue.description for issue in candidates])
+            minimum = settings.DEDUP_CASCADE_ACCEPT_MIN_COVERAGE
+            accept &= (coverage[1:] >= minimum) & (coverage[0] >= minimum)
+    band = ~(accept | reject)
+    if accept.any():
+        # A near-certain duplicate settles the report; band candidates need no MiniLM.
+        cascade.stats.record(int(reject.sum()), int(accept.sum()), 0, cheap_seconds)
+        index = int(np.flatnonzero(accept)[np.argmax(scores[accept])])
+        return candidates[index], float(scores[index])
+    if not band.any():
+        cascade.stats.record(int(reject.sum()), 0, 0, cheap_seconds)
+        return None, None
+
+    start = time.perf_counter()
+    vector = query() if callable(query) else query
+    issue, score = find_duplicate(vector, [c for c, keep in zip(candidates, band) if keep], threshold, inclusive)
+    cascade.stats.record(int(reject.sum()), 0, int(band.sum()), cheap_seconds, time.perf_counter() - start)
+    return issue, score
+
+
+def local_candidates(latitude, longitude, radius_m=None):
+    """Every open issue within radius_m (closest first, at most MAX_LOCAL_CANDIDATES)."""
+    from .models import Issue
+
+    if radius_m is None:
+        radius_m = settings.DEDUP_RADIUS_METERS
+    open_issues = Issue.objects.exclude(status="Solved")
+    return list(within_radius(open_issues, latitude, longitude, radius_m)[:MAX_LOCAL_CANDIDATES])
+
+
+def index_candidates(query, latitude, longitude, radius_m=None, k=MAX_CANDIDATES, exclude=()):
+    """The k open issues within radius_m semantically nearest to `query`, minus ids in `exclude`."""
+    from .models import Issue
+    from .vector_index import get_index
+
+    if radius_m is None:
+        radius_m = settings.DEDUP_RADIUS_METERS
+    index = get_index()
+    hits = [issue_id for issue_id, _ in index.query(query, k=k, lat=latitude, lon=longitude, radius_m=radius_m)]
+    missing = [issue_id for issue_id in hits if issue_id not in exclude]
+    found = list(Issue.objects.exclude(status="Solved").filter(id__in=missing)) if missing else []
+    # Another process may have solved or deleted some of these since we indexed them.
+    found_ids = {issue.id for issue in found}
+    for issue_id in missing:
+        if issue_id not in found_ids:
+            index.remove(issue_id)
+    return found
+
+
+def nearby_candidates(query, latitude, longitude, radius_m=None, k=MAX_CANDIDATES):
+    """Returns the open issues within radius_m that could be duplicates of `query`.
+
+    Every open issue in the radius comes from the geohash index, so nothing
+    close by is missed; the vector index adds the k semantically nearest open
+    issues in the same radius in case the neighbourhood is too dense to list.
+    """
+    local = local_candidates(latitude, longitude, radius_m)
+    known = {issue.id for issue in local}
+    return local + index_candidates(query, latitude, longitude, radius_m, k, exclude=known)
@@ -0,0 +1,82 @@
+import hashlib
+import json
+
+import numpy as np
+
+EMBEDDING_MODEL_NAME = 'all-MiniLM-L6-v2'
+EMBEDDING_DTYPE = np.float32
+EMBEDDING_DIM = 384
+
+_model = None  # Cache for SentenceTransformer
+_version = None  # embedding_version() of _model
+
+
+def get_model():
+    global _model
+    if _model is None:
+        from sentence_transformers import SentenceTransformer
+        _model = SentenceTransformer(EMBEDDING_MODEL_NAME)
+    return _model
+
+
+def embedding_version():
+    """Names the vectors the loaded model produces: EMBEDDING_MODEL_NAME plus a hash of its config and weights.
+
+    Stored embeddings, the shared caches and index snapshots are all keyed by
+    it, so new model files under the same name (a re-download, a fine-tune)
+    make them stale by themselves, as a new severity model version does.
+    """
+    global _version
+    if _version is None:
+        _version = f'{EMBEDDING_MODEL_NAME}/{fingerprint(get_model())[:12]}'
+    return _version
+
+
+def fingerprint(model):
+    """sha256 over everything that decides a SentenceTransformer's output: module configs, tokenizer, weights."""
+    digest = hashlib.sha256()
+    for module in model:
+        config = module.get_config_dict() if hasattr(module, 'get_config_dict') else {}
+        digest.update(json.dumps([type(module).__name__, config], sort_keys=True, default=str).encode())
+        if hasattr(module, 'auto_model'):
+            digest.update(module.auto_model.config.to_json_string(use_diff=False).encode())
+    digest.update(json.dumps(model.tokenizer.get_vocab(), sort_keys=True).encode())
+    for name, tensor in sorted(model.state_dict().items()):
+        digest.update(name.encode())
+        digest.update(tensor.detach().cpu().contiguous().numpy().tobytes())
+    return digest.hexdigest()
+
+
+def encode(text):
+    """Returns the unit-length embedding of a single description."""
+    return encode_many([text])[0]
+
+
+def encode_many(texts):
+    """Encodes a batch of descriptions into a (len(texts), dim) float32 matrix.
+
+    Results are cached by normalised text and embedding_version(), so repeated
+    descriptions are only run through the model once.
+    """
+    from .ml_cache import get_cache
+
+    texts = list(texts)
+    if not texts:
+        return np.zeros((0, EMBEDDING_DIM), dtype=EMBEDDING_DTYPE)
+    return np.stack(get_cache("embedding").get_or_compute(texts, embedding_version(), _encode_uncached))
+
+
+def _encode_uncached(texts):
+    from .metrics import ml_timer
+
+    with ml_timer():
+        vectors = get_model().encode(texts, convert_to_numpy=True, normalize_embeddings=True)
+    return [row.copy() for row in np.asarray(vectors, dtype=EMBEDDING_DTYPE)]
+
+
+def to_bytes(vector):
+    return np.asarray(vector, dtype=EMBEDDING_DTYPE).tobytes()
+
+
+def from_bytes(data):
+    return np.frombuffer(bytes(data), dtype=EMBEDDING_DTYPE)
@@ -0,0 +1,126 @@
+import math
+
+import numpy as np
+from django.db.models import Q
+
+EARTH_RADIUS_M = 6371008.8
+METERS_PER_DEGREE_LAT = 111320.0
+GEOHASH_PRECISION = 8  # ~38m x 19m cells; the length stored on Issue.geohash
+_BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+MAX_CELLS_PER_AXIS = 64  # covering_cells() needs at most a handful; a bound, not a tuning knob
+
+
+def parse_point(latitude, longitude):
+    """Returns (latitude, longitude) as floats; ValueError unless both are finite and on the globe."""
+    try:
+        latitude, longitude = float(latitude), float(longitude)
+    except (TypeError, ValueError):
+        raise ValueError("latitude and longitude must be numbers.")
+    if not (math.isfinite(latitude) and math.isfinite(longitude)):
+        raise ValueError("latitude and longitude must be finite.")
+    if not (-90.0 <= latitude <= 90.0 and -180.0 <= longitude <= 180.0):
+        raise ValueError("latitude must be within [-90, 90] and longitude within [-180, 180].")
+    return latitude, longitude
+
+
+def haversine_m(lat1, lon1, lat2, lon2):
+    """Great-circle distance in metres; any argument may be a NumPy array."""
+    lat1, lon1, lat2, lon2 = (np.radians(np.asarray(v, dtype=np.float64)) for v in (lat1, lon1, lat2, lon2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def encode_geohash(latitude, longitude, precision=GEOHASH_PRECISION):
+    lat_range, lon_range = [-90.0, 90.0], [-180.0, 180.0]
+    chars, bits, bit_count, even = [], 0, 0, True
+    while len(chars) < precision:
+        rng, value = (lon_range, longitude) if even else (lat_range, latitude)
+        mid = (rng[0] + rng[1]) / 2
+        bits <<= 1
+        if value >= mid:
+            bits |= 1
+            rng[0] = mid
+        else:
+            rng[1] = mid
+        even = not even
+        bit_count += 1
+        if bit_count == 5:
+            chars.append(_BASE32[bits])
+            bits, bit_count = 0, 0
+    return "".join(chars)
+
+
+def cell_size_deg(precision):
+    """Returns the (lat, lon) size in degrees of a geohash cell at `precision`."""
+    total_bits = 5 * precision
+    lon_bits = (total_bits + 1) // 2
+    return 180.0 / 2 ** (total_bits - lon_bits), 360.0 / 2 ** lon_bits
+
+
+def bounding_box(latitude, longitude, radius_m):
+    d_lat = radius_m / METERS_PER_DEGREE_LAT
+    d_lon = radius_m / (METERS_PER_DEGREE_LAT * max(math.cos(math.radians(latitude)), 1e-6))
+    # Clamped rather than wrapped: nothing we serve sits on the poles or the antimeridian.
+    return (
+        max(latitude - d_lat, -90.0), min(latitude + d_lat, 90.0),
+        max(longitude - d_lon, -180.0), min(longitude + d_lon, 180.0),
+    )
+
+
+def covering_cells(latitude, longitude, radius_m):
+    """Returns the geohash prefixes whose cells together cover the circle.
+
+    Uses the finest precision at which the circle's bounding box spans at most
+    three cells per axis, so a radius query is a handful of prefix range scans.
+    Raises ValueError for a non-finite point or radius, on which the scan would never end.
+    """
+    if not all(math.isfinite(value) for value in (latitude, longitude, radius_m)):
+        raise ValueError("latitude, longitude and radius must be finite.")
+    min_lat, max_lat, min_lon, max_lon = bounding_box(latitude, longitude, radius_m)
+    precision = GEOHASH_PRECISION
+    while precision > 1:
+        cell_lat, cell_lon = cell_size_deg(precision)
+        if max_lat - min_lat <= 2 * cell_lat and max_lon - min_lon <= 2 * cell_lon:
+            break
+        precision -= 1
+    cell_lat, cell_lon = cell_size_deg(precision)
+
+    cells = set()
+    lat = min_lat
+    for _ in range(MAX_CELLS_PER_AXIS):
+        lon = min_lon
+        for _ in range(MAX_CELLS_PER_AXIS):
+            cells.add(encode_geohash(lat, lon, precision))
+            if lon >= max_lon:
+                break
+            lon = min(lon + cell_lon, max_lon)
+        if lat >= max_lat:
+            break
+        lat = min(lat + cell_lat, max_lat)
+    return sorted(cells)
+
+
+def within_radius(queryset, latitude, longitude, radius_m):
+    """Returns the issues of `queryset` within radius_m metres, nearest first.
+
+    The geohash prefixes narrow the query to a few index ranges; the exact
+    haversine distance then drops the cell corners outside the circle. Each
+    returned issue carries its distance as `distance_m`.
+    """
+    cell_filter = Q()
+    for cell in covering_cells(latitude, longitude, radius_m):
+        cell_filter |= Q(geohash__startswith=cell)
+    issues = list(queryset.filter(cell_filter))
+    if not issues:
+        return []
+    distances = haversine_m(
+        latitude, longitude,
+        [issue.latitude for issue in issues], [issue.longitude for issue in issues],
+    )
+    nearby = []
+    for issue, distance in zip(issues, distances):
+        if distance <= radius_m:
+            issue.distance_m = float(distance)
+            nearby.append(issue)
+    nearby.sort(key=lambda issue: issue.distance_m)
+    return nearby
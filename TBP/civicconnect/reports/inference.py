@@ -0,0 +1,104 @@
+"""Micro-batching front end for the severity classifier.
+
+A single-row `model.predict` is dominated by per-call overhead, so
+concurrent requests are collected for up to `max_wait_ms` (or until
+`max_batch` rows are waiting) and classified with one transform + predict.
+Views call `predict()` and block only for their own row; bulk callers use
+`predict_many()` and skip the queue entirely.
+"""
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+import numpy as np
+from django.conf import settings
+
+
+def classify(descriptions):
+    """Returns the raw model classes for `descriptions` in one batched call."""
+    from .models import get_severity_model
+
+    return np.asarray(get_severity_model().predict(descriptions))
+
+
+class SeverityBatcher:
+    def __init__(self, max_batch=64, max_wait_ms=5.0, classify_fn=classify):
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000.0
+        self.classify_fn = classify_fn
+        self.batches = 0
+        self.rows = 0
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+
+    def _ensure_worker(self):
+        # Threads don't survive fork(), so a forked worker starts its own.
+        if self._thread is not None and self._pid == os.getpid() and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or self._pid != os.getpid() or not self._thread.is_alive():
+                self._queue = queue.Queue()
+                self._pid = os.getpid()
+                self._thread = threading.Thread(target=self._run, name="severity-batcher", daemon=True)
+                self._thread.start()
+
+    def predict(self, description):
+        """Classifies one description, sharing a model call with concurrent callers."""
+        if self.max_wait <= 0 or self.max_batch <= 1:
+            return int(self.predict_many([description])[0])
+        self._ensure_worker()
+        future = Future()
+        self._queue.put((description, future))
+        return future.result()
+
+    def predict_many(self, descriptions):
+        """Classifies a list of descriptions in one call, bypassing the queue."""
+        descriptions = list(descriptions)
+        if not descriptions:
+            return np.zeros(0, dtype=np.int64)
+        self.batches += 1
+        self.rows += len(descriptions)
+        return self.classify_fn(descriptions)
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.max_wait
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+
+            descriptions = [description for description, _ in batch]
+            try:
+                predictions = self.predict_many(descriptions)
+            except Exception as exc:  # Hand the failure to every waiting caller
+                for _, future in batch:
+                    future.set_exception(exc)
+                continue
+            for (_, future), prediction in zip(batch, predictions):
+                future.set_result(int(prediction))
+
+
+_batcher = None
+_batcher_lock = threading.Lock()
+
+
+def get_batcher():
+    global _batcher
+    if _batcher is None:
+        with _batcher_lock:
+            if _batcher is None:
+                _batcher = SeverityBatcher(
+                    max_batch=settings.SEVERITY_BATCH_MAX_SIZE,
+                    max_wait_ms=settings.SEVERITY_BATCH_MAX_WAIT_MS,
+                )
+    return _batcher
@@ -0,0 +1,129 @@
+"""Issue lists as JSON, one keyset page at a time (the `issue_list_api` view).
+
+Query parameters, all optional:
+
+    scope     mine (issues the user filed, the default) or reported (issues
+              the user reported, including duplicates merged into others')
+    order     created (newest first, the default) or priority (highest
+              priority_score first); ties break on id, so paging is stable
+    fields    comma-separated names from FIELDS (default DEFAULT_FIELDS);
+              only those columns are read
+    status    comma-separated statuses, e.g. Pending,In Progress
+    priority  comma-separated priority levels, e.g. 2,3
+    bbox      min_lat,min_lon,max_lat,max_lon
+    limit     page size, 1..MAX_LIMIT (default DEFAULT_LIMIT)
+    cursor    next_cursor from the previous page
+
+The response is {"issues": [...], "next_cursor": ...}; next_cursor is null
+on the last page. Every page, however deep, is one query (see
+pagination.py).
+"""
+from .pagination import keyset_paginate
+
+ORDERINGS = {
+    "created": ("-created_at", "-id"),
+    "priority": ("-priority_score", "-id"),
+}
+STATUSES = ("Pending", "In Progress", "Solved")
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 100
+
+
+class InvalidQuery(ValueError):
+    pass
+
+
+def _image_url(issue):
+    return issue.image.url if issue.image else None
+
+
+# Field name -> (columns it reads, value in the response)
+FIELDS = {
+    "id": ((), lambda issue: issue.id),
+    "title": (("title",), lambda issue: issue.title),
+    "description": (("description",), lambda issue: issue.description),
+    "status": (("status",), lambda issue: issue.status),
+    "location_name": (("location_name",), lambda issue: issue.location_name),
+    "latitude": (("latitude",), lambda issue: issue.latitude),
+    "longitude": (("longitude",), lambda issue: issue.longitude),
+    "severity": (("severity",), lambda issue: issue.severity),
+    "priority": (("priority",), lambda issue: issue.priority),
+    "priority_score": (("priority_score",), lambda issue: issue.priority_score),
+    "report_count": (("report_count",), lambda issue: issue.report_count),
+    "progress_percentage": (("progress_percentage",), lambda issue: issue.progress_percentage),
+    "created_at": (("created_at",), lambda issue: issue.created_at),
+    "image": (("image",), _image_url),
+}
+DEFAULT_FIELDS = ("id", "title", "status", "created_at")
+
+
+def _split(value):
+    return [part.strip() for part in value.split(",") if part.strip()]
+
+
+def _choices(params, name, allowed, default):
+    value = params.get(name)
+    if value is None:
+        return default
+    if value not in allowed:
+        raise InvalidQuery(f"{name} must be one of: {', '.join(allowed)}.")
+    return value
+
+
+def _fields(params):
+    fields = _split(params["fields"]) if params.get("fields") else list(DEFAULT_FIELDS)
+    unknown = [name for name in fields if name not in FIELDS]
+    if unknown or not fields:
+        raise InvalidQuery(f"Unknown fields: {', '.join(unknown) or '(none given)'}.")
+    return fields
+
+
+def _filter(queryset, params):
+    if params.get("status"):
+        statuses = _split(params["status"])
+        if not set(statuses) <= set(STATUSES):
+            raise InvalidQuery(f"status must be among: {', '.join(STATUSES)}.")
+        queryset = queryset.filter(status__in=statuses)
+    if params.get("priority"):
+        try:
+            queryset = queryset.filter(priority__in=[int(level) for level in _split(params["priority"])])
+        except ValueError:
+            raise InvalidQuery("priority must be comma-separated integers.")
+    if params.get("bbox"):
+        try:
+            min_lat, min_lon, max_lat, max_lon = (float(value) for value in _split(params["bbox"]))
+        except ValueError:
+            raise InvalidQuery("bbox must be min_lat,min_lon,max_lat,max_lon.")
+        queryset = queryset.filter(latitude__range=(min_lat, max_lat), longitude__range=(min_lon, max_lon))
+    return queryset
+
+
+def issue_page(user, params):
+    """One page of `user`'s issues as a JSON-ready dict, per the query parameters `params`.
+
+    Raises InvalidQuery (or pagination.InvalidCursor) for a bad parameter.
+    """
+    from .models import Issue
+
+    scope = _choices(params, "scope", ("mine", "reported"), "mine")
+    ordering = ORDERINGS[_choices(params, "order", tuple(ORDERINGS), "created")]
+    fields = _fields(params)
+    try:
+        limit = min(max(int(params.get("limit", DEFAULT_LIMIT)), 1), MAX_LIMIT)
+    except ValueError:
+        raise InvalidQuery("limit must be an integer.")
+
+    if scope == "mine":
+        queryset = Issue.objects.filter(user=user)
+    else:
+        # One ReportedUser row per issue and user, so the join can't repeat an issue.
+        queryset = Issue.objects.filter(reported_user_entries__user=user)
+    columns = {column for name in fields for column in FIELDS[name][0]}
+    columns |= {name.lstrip("-") for name in ordering}
+    queryset = _filter(queryset, params).only(*columns)
+
+    page = keyset_paginate(queryset, ordering, cursor=params.get("cursor"), page_size=limit)
+    return {
+        "issues": [{name: FIELDS[name][1](issue) for name in fields} for issue in page.items],
+        "next_cursor": page.next_cursor,
+    }
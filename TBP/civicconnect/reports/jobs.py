@@ -0,0 +1,131 @@
+"""A small database-backed job queue: no broker, just the Job table.
+
+Handlers are plain functions registered by kind with @handler and are given
+the job's JSON payload. Whatever they return (JSON-serialisable) is stored
+as the job's result. enqueue() adds a job, or returns the existing one when
+its idempotency key was seen before. `manage.py run_jobs` claims due jobs
+one at a time with a conditional UPDATE, so any number of workers can
+share the table. A failing job is retried with exponential backoff until
+max_attempts, then marked failed. A job whose worker died mid-run is
+requeued once its lease expires.
+
+With settings.JOBS_RUN_INLINE, enqueue() runs the job on the spot (tests,
+single-process development).
+"""
+import os
+import socket
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+HANDLERS = {}
+CLAIM_CANDIDATES = 10  # Due jobs looked at per claim attempt; losing a race just moves to the next
+
+
+class PermanentError(Exception):
+    """Raised by a handler when retrying can't help; the job fails at once."""
+
+
+def handler(kind):
+    def register(func):
+        HANDLERS[kind] = func
+        return func
+    return register
+
+
+def worker_name():
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def enqueue(kind, payload, idempotency_key=None, max_attempts=None, delay=0):
+    """Adds a job and returns it; an existing job with the same idempotency key is returned instead."""
+    from .models import Job
+
+    if kind not in HANDLERS:
+        raise ValueError(f"No handler registered for job kind {kind!r}")
+    fields = {"kind": kind, "payload": payload, "run_after": timezone.now() + timedelta(seconds=delay)}
+    if max_attempts is not None:
+        fields["max_attempts"] = max_attempts
+    if idempotency_key is None:
+        job = Job.objects.create(**fields)
+    else:
+        try:
+            with transaction.atomic():
+                job, created = Job.objects.get_or_create(idempotency_key=idempotency_key, defaults=fields)
+        except IntegrityError:  # Lost a race with a concurrent enqueue of the same key
+            job, created = Job.objects.get(idempotency_key=idempotency_key), False
+        if not created:
+            return job
+
+    if settings.JOBS_RUN_INLINE:
+        run(job)
+    return job
+
+
+def requeue_expired(now=None):
+    """Puts back jobs claimed more than JOBS_LEASE_SECONDS ago: their worker crashed or was killed."""
+    from .models import Job
+
+    now = now or timezone.now()
+    expired = now - timedelta(seconds=settings.JOBS_LEASE_SECONDS)
+    return Job.objects.filter(status=Job.RUNNING, locked_at__lt=expired).update(
+        status=Job.QUEUED, locked_by="", locked_at=None
+    )
+
+
+def claim(worker=None, kinds=None):
+    """Marks the next due job as running for `worker` and returns it, or None if nothing is due."""
+    from .models import Job
+
+    worker = worker or worker_name()
+    now = timezone.now()
+    due = Job.objects.filter(status=Job.QUEUED, run_after__lte=now)
+    if kinds:
+        due = due.filter(kind__in=kinds)
+    for job_id in due.order_by("run_after", "id").values_list("id", flat=True)[:CLAIM_CANDIDATES]:
+        # Only one worker's UPDATE can still see the job queued.
+        if Job.objects.filter(id=job_id, status=Job.QUEUED).update(status=Job.RUNNING, locked_by=worker, locked_at=now):
+            return Job.objects.get(id=job_id)
+    return None
+
+
+def run(job):
+    """Runs one job's handler and records the outcome: done, retry later, or failed."""
+    from .models import Job
+
+    job.attempts += 1
+    try:
+        result = HANDLERS[job.kind](job.payload)
+    except Exception as exc:
+        job.error = traceback.format_exc()
+        if isinstance(exc, PermanentError) or job.attempts >= job.max_attempts:
+            job.status = Job.FAILED
+            job.finished_at = timezone.now()
+        else:
+            job.status = Job.QUEUED
+            job.run_after = timezone.now() + timedelta(seconds=settings.JOBS_RETRY_BASE_SECONDS * 2 ** (job.attempts - 1))
+    else:
+        job.status = Job.DONE
+        job.result = result
+        job.error = ""
+        job.finished_at = timezone.now()
+    job.locked_by, job.locked_at = "", None
+    job.save(update_fields=["attempts", "status", "result", "error", "run_after", "locked_by", "locked_at",
+                            "finished_at"])
+    return job
+
+
+def run_pending(worker=None, limit=None, kinds=None):
+    """Claims and runs due jobs until none are left (or `limit` ran). Returns how many ran."""
+    requeue_expired()
+    count = 0
+    while limit is None or count < limit:
+        job = claim(worker, kinds)
+        if job is None:
+            break
+        run(job)
+        count += 1
+    return count
@@ -0,0 +1,403 @@
+"""Concurrent citizen, officer and authority traffic against the whole app (`manage.py loadtest`).
+
+Each virtual user is a thread with its own session that plays one role:
+it logs in, then repeats a weighted choice of that role's actions with a
+random think time, and logs in again every `session_actions` actions.
+Requests go through the Django test client in this process, with every
+middleware and view but no network, or over HTTP to a running server. In
+flood mode, citizens report flooding from around one spot, the way a
+storm brings hundreds of reports about the same street at once.
+
+Every request is timed under its action's name and counts as an error if
+it raises or comes back with anything but the expected status.
+summarize() turns the timings into throughput, p50/p95/p99 latency and
+error rates. Reports are answered with 202 and processed by the job queue,
+so job_stats() adds how long those jobs took from enqueue to done, and how
+many were merged into an existing issue.
+"""
+import http.cookiejar
+import json
+import random
+import re
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+import uuid
+from collections import Counter, defaultdict
+from contextlib import nullcontext
+
+import numpy as np
+from django.contrib.auth.hashers import make_password
+from django.db import connections
+from django.test.utils import override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from . import jobs, synthetic
+from .tasks import PROCESS_REPORT
+
+ROLES = ("citizen", "officer", "authority")
+# Action weights per role; each action is also the name its timings are reported under.
+ACTIONS = {
+    "citizen": {"report_issue": 40, "get_job_status": 20, "citizen_dashboard": 15, "track_issue": 10,
+                "nearby_issues": 15},
+    "officer": {"officer_dashboard": 40, "officer_work_queue": 30, "update_progress": 30},
+    "authority": {"authority_dashboard": 50, "trending_issues": 30, "issue_detail": 20},
+}
+LOGIN_URLS = {"citizen": "citizen_login", "officer": "officer_login", "authority": "authority_login"}
+# A report processed inline (JOBS_RUN_INLINE) may come back 400: "You have already reported this issue."
+EXPECTED_STATUS = {"login": 302, "report_issue": (202, 400), "update_progress": 302}
+FLOOD_WORDS = re.compile(r"flood|drain|sewage|water|rain", re.IGNORECASE)
+FLOOD_SPREAD_M = 150
+
+
+def account_name(role, i):
+    return f"loadtest-{role}-{i}"
+
+
+def ensure_accounts(counts, password):
+    """Creates (or resets the password of) `counts[role]` accounts per role; returns {role: [username]}."""
+    from django.contrib.auth.models import User
+
+    from .models import Officer
+
+    hashed = make_password(password)  # Hashing once is much faster than set_password() per account
+    accounts = {}
+    for role in ROLES:
+        names = [account_name(role, i) for i in range(counts.get(role, 0))]
+        existing = set(User.objects.filter(username__in=names).values_list("username", flat=True))
+        User.objects.bulk_create([User(username=name, email=f"{name}@example.com", password=hashed)
+                                  for name in names if name not in existing])
+        User.objects.filter(username__in=existing).update(password=hashed)
+        if role == "officer":
+            departments = synthetic.DEPARTMENTS
+            Officer.objects.bulk_create([
+                Officer(user=user, name=user.username, department=departments[i % len(departments)])
+                for i, user in enumerate(User.objects.filter(username__in=names, officer__isnull=True).order_by("id"))
+            ])
+        accounts[role] = names
+    return accounts
+
+
+class ClientTransport:
+    """Requests through django.test.Client, in this process."""
+
+    def __init__(self):
+        from django.test import Client
+
+        self.client = Client(raise_request_exception=False)
+
+    def request(self, method, path, data=None, headers=None):
+        if method == "GET":
+            response = self.client.get(path, data, headers=headers)
+        else:
+            response = self.client.post(path, data, headers=headers)
+        return response.status_code, _json(response.get("Content-Type", ""), response.content)
+
+    def close(self):
+        connections.close_all()  # This thread's connections
+
+
+class _NoRedirect(urllib.request.HTTPRedirectHandler):
+    def redirect_request(self, *args, **kwargs):
+        return None  # A redirect is the response being measured, not something to follow
+
+
+class HttpTransport:
+    """Requests over HTTP to a running server, with a cookie jar and Django's CSRF token."""
+
+    def __init__(self, base_url, timeout=30.0):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.cookies = http.cookiejar.CookieJar()
+        self.opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(self.cookies), _NoRedirect)
+
+    def _csrf_token(self):
+        return next((cookie.value for cookie in self.cookies if cookie.name == "csrftoken"), "")
+
+    def request(self, method, path, data=None, headers=None):
+        url = self.base_url + path
+        body = None
+        headers = {"Referer": self.base_url + "/", **(headers or {})}
+        if method == "GET":
+            if data:
+                url += "?" + urllib.parse.urlencode(data)
+        else:
+            body = urllib.parse.urlencode(data or {}).encode()
+            headers["X-CSRFToken"] = self._csrf_token()
+        try:
+            with self.opener.open(urllib.request.Request(url, data=body, headers=headers, method=method),
+                                  timeout=self.timeout) as response:
+                return response.status, _json(response.headers.get("Content-Type", ""), response.read())
+        except urllib.error.HTTPError as e:
+            return e.code, _json(e.headers.get("Content-Type", ""), e.read())
+
+    def close(self):
+        pass
+
+
+def _json(content_type, content):
+    if not content_type.startswith("application/json"):
+        return None
+    try:
+        return json.loads(content)
+    except ValueError:
+        return None
+
+
+class Recorder:
+    """Thread-safe timings, statuses and errors per action."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.seconds = defaultdict(list)
+        self.statuses = defaultdict(Counter)
+        self.errors = Counter()
+
+    def record(self, action, seconds, status, ok):
+        with self._lock:
+            self.seconds[action].append(seconds)
+            self.statuses[action][str(status)] += 1
+            if not ok:
+                self.errors[action] += 1
+
+
+class VirtualUser:
+    def __init__(self, role, username, password, transport, recorder, rng, city, options):
+        self.role = role
+        self.username = username
+        self.password = password
+        self.transport = transport
+        self.recorder = recorder
+        self.rng = rng
+        self.city = city
+        self.options = options
+        self.job_ids = []
+        self.queue_ids = []
+        self.actions, self.weights = zip(*ACTIONS[role].items())
+
+    def call(self, action, method, path, data=None, expect=200, headers=None):
+        start = time.perf_counter()
+        try:
+            status, body = self.transport.request(method, path, data, headers)
+        except Exception:  # Connection refused, timeout, ...: an error like any other
+            status, body = "exception", None
+        ok = status in expect if isinstance(expect, tuple) else status == expect
+        self.recorder.record(action, time.perf_counter() - start, status, ok)
+        return status, body
+
+    def login(self):
+        path = reverse(LOGIN_URLS[self.role])
+        start = time.perf_counter()
+        try:
+            if isinstance(self.transport, HttpTransport):
+                self.transport.request("GET", path)  # Sets the csrftoken cookie the POST must echo
+            status, _ = self.transport.request("POST", path, {"username": self.username, "password": self.password})
+        except Exception:
+            status = "exception"
+        self.recorder.record("login", time.perf_counter() - start, status, status == EXPECTED_STATUS["login"])
+
+    def run(self, deadline):
+        try:
+            done = 0
+            while time.monotonic() < deadline:
+                if done % self.options["session_actions"] == 0:
+                    self.login()
+                action = self.rng.choices(self.actions, self.weights)[0]
+                getattr(self, action)()
+                done += 1
+                time.sleep(self.rng.expovariate(1000.0 / self.options["think_ms"]) if self.options["think_ms"] else 0)
+        finally:
+            self.transport.close()
+
+    # Citizen actions
+
+    def report_issue(self):
+        texts, _ = self.city.descriptions(1)
+        if self.options["flood"]:
+            lat, lon = self.city.points_near(1, *self.options["focus"], FLOOD_SPREAD_M)
+        else:
+            lat, lon, _ = self.city.points(1)
+        status, body = self.call("report_issue", "POST", reverse("report_issue"), {
+            "description": texts[0], "location_name": "Load test", "latitude": float(lat[0]),
+            "longitude": float(lon[0]),
+        }, expect=EXPECTED_STATUS["report_issue"], headers={"Idempotency-Key": uuid.uuid4().hex})  # As the form sends
+        if body and body.get("job_id"):
+            self.job_ids.append(body["job_id"])
+
+    def get_job_status(self):
+        if not self.job_ids:
+            return self.citizen_dashboard()
+        self.call("get_job_status", "GET", reverse("get_job_status", args=[self.rng.choice(self.job_ids[-5:])]))
+
+    def citizen_dashboard(self):
+        self.call("citizen_dashboard", "GET", reverse("citizen_dashboard"))
+
+    def track_issue(self):
+        self.call("track_issue", "GET", reverse("track_issue"))
+        self.call("issue_list_api", "GET", reverse("issue_list_api"))  # The page's list, fetched by its script
+
+    def nearby_issues(self):
+        lat, lon = self.options["focus"] if self.options["flood"] else self.city.busiest_hotspot()
+        self.call("nearby_issues", "GET", reverse("nearby_issues"), {"lat": lat, "lon": lon})
+
+    # Officer actions
+
+    def officer_dashboard(self):
+        self.call("officer_dashboard", "GET", reverse("officer_dashboard"))
+
+    def officer_work_queue(self):
+        status, body = self.call("officer_work_queue", "GET", reverse("officer_work_queue"), {"limit": 10})
+        if body and "issues" in body:
+            self.queue_ids = [issue["id"] for issue in body["issues"]]
+
+    def update_progress(self):
+        if not self.queue_ids:
+            return self.officer_work_queue()
+        issue_id = self.queue_ids.pop(0)
+        progress = self.rng.choice((25, 50, 75, 100))
+        self.call("update_progress", "POST", reverse("update_progress", args=[issue_id]), {
+            "progress_percentage": progress, "status": "Solved" if progress == 100 else "In Progress",
+        }, expect=EXPECTED_STATUS["update_progress"])
+
+    # Authority actions
+
+    def authority_dashboard(self):
+        self.call("authority_dashboard", "GET", reverse("authority_dashboard"))
+
+    def trending_issues(self):
+        self.call("trending_issues", "GET", reverse("trending_issues"))
+
+    def issue_detail(self):
+        if not self.options["issue_ids"]:
+            return self.authority_dashboard()
+        self.call("issue_detail", "GET", reverse("issue_detail", args=[self.rng.choice(self.options["issue_ids"])]))
+
+
+def _job_worker(stop):
+    try:
+        while not stop.is_set():
+            if not jobs.run_pending(limit=10):
+                stop.wait(0.05)
+    finally:
+        connections.close_all()
+
+
+def run(users, mix, duration, url=None, password="loadtest-password", think_ms=200.0, session_actions=20,
+        flood=False, focus=None, job_workers=2, drain_seconds=30.0, seed=None):
+    """Runs the load test and returns its report (see summarize() and job_stats()).
+
+    Without a seed, each run draws a new one (reported back), so a rerun
+    doesn't file the very same reports again; pass it to replay a run.
+    """
+    from .models import Issue, Job
+
+    if seed is None:
+        seed = random.randrange(2**31)
+
+    total_weight = sum(mix.values())
+    counts = {role: round(users * mix.get(role, 0) / total_weight) for role in ROLES}
+    accounts = ensure_accounts(counts, password)
+    sentences = synthetic.load_sentences()
+    if flood:
+        sentences = [s for s in sentences if FLOOD_WORDS.search(s)] or sentences
+    options = {
+        "think_ms": think_ms, "session_actions": session_actions, "flood": flood,
+        "focus": focus or synthetic.SyntheticCity().busiest_hotspot(),
+        "issue_ids": list(Issue.objects.order_by("-id").values_list("id", flat=True)[:1000]),
+    }
+
+    recorder = Recorder()
+    virtual_users = []
+    for role in ROLES:
+        for i, username in enumerate(accounts[role]):
+            n = len(virtual_users)
+            transport = HttpTransport(url) if url else ClientTransport()
+            # Reports land in the generated data's city (the synthetic default layout).
+            city = synthetic.SyntheticCity(sentences=sentences, draws_seed=[seed, n])
+            virtual_users.append(VirtualUser(role, username, password, transport, recorder,
+                                             random.Random(seed + n), city, options))
+
+    stop = threading.Event()
+    workers = [threading.Thread(target=_job_worker, args=(stop,), daemon=True) for _ in range(job_workers)]
+    started_at = timezone.now()
+    start = time.monotonic()
+    deadline = start + duration
+    threads = [threading.Thread(target=user.run, args=(deadline,)) for user in virtual_users]
+    # The test client's host, allowed as `manage.py test` does.
+    with nullcontext() if url else override_settings(ALLOWED_HOSTS=["testserver"]):
+        for thread in workers + threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    elapsed = time.monotonic() - start
+
+    # Let the queue finish what the flood left behind, so job latency covers every report.
+    drain_until = time.monotonic() + drain_seconds
+    pending = Job.objects.filter(kind=PROCESS_REPORT, created_at__gte=started_at, status__in=[Job.QUEUED, Job.RUNNING])
+    while time.monotonic() < drain_until and pending.exists():
+        time.sleep(0.2)
+    stop.set()
+    for worker in workers:
+        worker.join()
+
+    return {
+        "started_at": started_at.isoformat(),
+        "mode": "http" if url else "in-process",
+        "target": url or "django.test.Client",
+        "virtual_users": counts,
+        "seed": seed,
+        "duration_s": round(elapsed, 3),
+        **summarize(recorder, elapsed),
+        "jobs": job_stats(started_at),
+    }
+
+
+def _percentiles(seconds):
+    ms = np.asarray(seconds) * 1000
+    p50, p95, p99 = np.percentile(ms, [50, 95, 99])
+    return {"p50_ms": round(float(p50), 2), "p95_ms": round(float(p95), 2), "p99_ms": round(float(p99), 2),
+            "max_ms": round(float(ms.max()), 2), "mean_ms": round(float(ms.mean()), 2)}
+
+
+def summarize(recorder, elapsed):
+    endpoints = {}
+    for action in sorted(recorder.seconds):
+        count = len(recorder.seconds[action])
+        endpoints[action] = {
+            "requests": count,
+            "errors": recorder.errors[action],
+            "error_rate": round(recorder.errors[action] / count, 4),
+            "throughput_rps": round(count / elapsed, 2),
+            **_percentiles(recorder.seconds[action]),
+            "statuses": dict(recorder.statuses[action]),
+        }
+    everything = [s for seconds in recorder.seconds.values() for s in seconds]
+    errors = sum(recorder.errors.values())
+    totals = {"requests": len(everything), "errors": errors,
+              "error_rate": round(errors / len(everything), 4) if everything else 0.0,
+              "throughput_rps": round(len(everything) / elapsed, 2) if elapsed else 0.0}
+    if everything:
+        totals.update(_percentiles(everything))
+    return {"totals": totals, "endpoints": endpoints}
+
+
+def job_stats(since):
+    """Outcome and enqueue-to-done latency of the report jobs created since `since`."""
+    from .models import Job
+
+    rows = list(Job.objects.filter(kind=PROCESS_REPORT, created_at__gte=since)
+                .values_list("status", "created_at", "finished_at", "result"))
+    stats = {"created": len(rows), "statuses": dict(Counter(status for status, *_ in rows))}
+    done = [(finished - created).total_seconds() for status, created, finished, _ in rows
+            if status == Job.DONE and finished]
+    if done:
+        stats.update(_percentiles(done))
+    outcomes = Counter()
+    for status, _, _, result in rows:
+        if status == Job.DONE and result:
+            outcomes["merged" if "report_count" in result else "error" if "error" in result else "new_issue"] += 1
+    stats["outcomes"] = dict(outcomes)
+    return stats
@@ -0,0 +1,43 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+from django.utils import timezone
+
+from reports import embeddings
+from reports.models import Issue
+
+
+class Command(BaseCommand):
+    help = "Encode and store sentence embeddings for issues that are missing one or carry an outdated model version."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=256)
+        parser.add_argument("--force", action="store_true", help="Re-encode every issue, not just stale ones.")
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        issues = Issue.objects.all()
+        if not options["force"]:
+            issues = issues.filter(
+                Q(embedding__isnull=True) | ~Q(embedding_version=embeddings.embedding_version())
+            )
+
+        # Walk the table by primary key so each batch is a cheap indexed range scan
+        # and rows updated by this command never shift the next page.
+        last_id = 0
+        total = 0
+        while True:
+            batch = list(issues.filter(id__gt=last_id).order_by("id").only("id", "description")[:batch_size])
+            if not batch:
+                break
+            vectors = embeddings.encode_many([issue.description for issue in batch])
+            now = timezone.now()
+            for issue, vector in zip(batch, vectors):
+                issue.embedding = embeddings.to_bytes(vector)
+                issue.embedding_version = embeddings.embedding_version()
+                issue.updated_at = now  # Running processes' vector indexes resync rows by updated_at
+            Issue.objects.bulk_update(batch, ["embedding", "embedding_version", "updated_at"])
+            last_id = batch[-1].id
+            total += len(batch)
+            self.stdout.write(f"Encoded {total} issues...")
+
+        self.stdout.write(self.style.SUCCESS(f"✅ Backfilled embeddings for {total} issues ({embeddings.embedding_version()})."))
@@ -0,0 +1,89 @@
+import csv
+import os
+import random
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from reports import assignment
+from reports.models import Officer
+
+DATASET = os.path.join(settings.BASE_DIR, "civicconnect_ai", "issues_dataset.csv")
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = ("Compare ORDER BY RANDOM() officer selection with load-balanced assignment, single and bulk, "
+            "on a throwaway table of officers (rolled back afterwards).")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--officers", type=int, default=10000)
+        parser.add_argument("--picks", type=int, default=200, help="Single assignments to time.")
+        parser.add_argument("--backlog", type=int, default=5000, help="Issues assigned in one bulk pass.")
+        parser.add_argument("--seed", type=int, default=42)
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                self._run(options)
+                raise Rollback
+        except Rollback:
+            pass
+
+    def _run(self, options):
+        rng = random.Random(options["seed"])
+        with open(DATASET, encoding="utf-8") as f:
+            corpus = [row["description"] for row in csv.DictReader(f) if row.get("description")]
+        departments = list(assignment.DEPARTMENT_KEYWORDS) + ["General"]
+
+        n = options["officers"]
+        users = User.objects.bulk_create(
+            [User(username=f"bench-officer-{i}", password="!") for i in range(n)], batch_size=2000
+        )
+        Officer.objects.bulk_create(
+            [Officer(user=user, name=user.username, department=rng.choice(departments),
+                     open_issue_count=rng.randrange(50)) for user in users],
+            batch_size=2000,
+        )
+        self.stdout.write(f"Officers: {Officer.objects.count()}")
+        self.stdout.write("Plan for one pick: " + " ".join(
+            Officer.objects.filter(department="Roads").order_by("open_issue_count", "id")[:1].explain().split()
+        ))
+
+        picks = options["picks"]
+        start = time.perf_counter()
+        for _ in range(picks):
+            Officer.objects.order_by("?").first()
+        random_ms = (time.perf_counter() - start) / picks * 1000
+
+        start = time.perf_counter()
+        for _ in range(picks):
+            officer = assignment.pick_officer(rng.choice(corpus))
+            assignment.move_load(None, officer.id)
+        balanced_ms = (time.perf_counter() - start) / picks * 1000
+        self.stdout.write(f"Single assignment: ORDER BY RANDOM() {random_ms:.2f} ms, "
+                          f"least-loaded pick + counter update {balanced_ms:.2f} ms")
+
+        backlog = [rng.choice(corpus) for _ in range(options["backlog"])]
+        before = dict(Officer.objects.values_list("id", "open_issue_count"))
+        start = time.perf_counter()
+        assigned = assignment.assign_bulk(range(len(backlog)), backlog)
+        bulk_s = time.perf_counter() - start
+        self.stdout.write(f"Bulk: {len(assigned)} issues in {bulk_s * 1000:.0f} ms "
+                          f"({bulk_s / max(len(assigned), 1) * 1e6:.0f} µs per issue)")
+
+        loads = Officer.objects.values_list("department", "open_issue_count")
+        gained = Counter(assigned.values())
+        for department in departments:
+            counts = [count for dept, count in loads if dept == department]
+            self.stdout.write(f"  {department:<12} officers {len(counts):>5}  load min/max after: "
+                              f"{min(counts)}/{max(counts)}")
+        self.stdout.write(f"Officers given work: {len(gained)}; highest load any of them had before: "
+                          f"{max(before[o] for o in gained) if gained else '-'}")
@@ -0,0 +1,123 @@
+import csv
+import os
+import random
+import time
+
+import numpy as np
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from reports import cascade, embeddings
+from reports.dedup import find_duplicate, find_duplicate_cascade
+from reports.ml_cache import get_cache
+from reports.models import Issue
+
+DATASET = os.path.join(settings.BASE_DIR, "civicconnect_ai", "issues_dataset.csv")
+PAIRS = os.path.join(settings.BASE_DIR, "civicconnect_ai", "dedup_pairs.csv")
+
+
+def _paraphrase(text, rng):
+    """A cheap near-duplicate: drop a word, maybe swap two, change the case."""
+    words = text.split()
+    if len(words) > 3:
+        words.pop(rng.randrange(len(words)))
+    if len(words) > 3 and rng.random() < 0.5:
+        i = rng.randrange(len(words) - 1)
+        words[i], words[i + 1] = words[i + 1], words[i]
+    text = " ".join(words)
+    return text.lower() if rng.random() < 0.5 else text
+
+
+def _issue(pk, description, vector):
+    # Unsaved issues carrying an up-to-date stored embedding, as rows from the database would.
+    issue = Issue(id=pk, description=description, embedding=embeddings.to_bytes(vector),
+                  embedding_version=embeddings.embedding_version())
+    issue._loaded_description = description
+    return issue
+
+
+class Command(BaseCommand):
+    help = ("Compare MiniLM-only dedup with the cheap-first cascade on the bundled dataset: "
+            "agreement, comparisons settled per stage, and latency; then calibrate the reject "
+            "threshold on labelled pairs.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--queries", type=int, default=200)
+        parser.add_argument("--candidates", type=int, default=30, help="Open issues near each report.")
+        parser.add_argument("--seed", type=int, default=42)
+        parser.add_argument("--pairs", default=PAIRS,
+                            help="Labelled pairs (CSV: first,second,duplicate) to calibrate the reject threshold on.")
+
+    def handle(self, *args, **options):
+        rng = random.Random(options["seed"])
+        with open(DATASET, encoding="utf-8") as f:
+            corpus = [row["description"] for row in csv.DictReader(f) if row.get("description")]
+        corpus += [_paraphrase(text, rng) for text in corpus]
+        vectors = embeddings.encode_many(corpus)
+        issues = [_issue(i + 1, text, vector) for i, (text, vector) in enumerate(zip(corpus, vectors))]
+        cascade.get_scorer()  # Keep model loading out of the timings
+        cascade.stats.reset()
+        cache = get_cache("embedding")
+
+        agree = 0
+        baseline_time = cascade_time = 0.0
+        for n in range(options["queries"]):
+            # Half the reports repeat a nearby issue in other words, half are new text.
+            source = rng.choice(corpus)
+            query = _paraphrase(source, rng) + (f" near block {n}" if rng.random() < 0.5 else "")
+            candidates = rng.sample(issues, min(options["candidates"], len(issues)))
+
+            cache.clear()  # Both paths pay for encoding the report, as a fresh report would
+            start = time.perf_counter()
+            expected, _ = find_duplicate(embeddings.encode(query), candidates)
+            baseline_time += time.perf_counter() - start
+
+            cache.clear()
+            start = time.perf_counter()
+            found, _ = find_duplicate_cascade(query, candidates, query=lambda: embeddings.encode(query))
+            cascade_time += time.perf_counter() - start
+            agree += (expected is None) == (found is None)
+
+        stats = cascade.stats.as_dict()
+        queries = options["queries"]
+        accept = settings.DEDUP_CASCADE_ACCEPT_ABOVE
+        self.stdout.write(f"Cheap scorer: {stats['scorer']}  band: [{settings.DEDUP_CASCADE_REJECT_BELOW}, "
+                          f"{'1]' if accept is None else f'{accept})'}")
+        self.stdout.write(f"Comparisons: {stats['comparisons']}  settled cheap (reject/accept): "
+                          f"{stats['settled_cheap_reject']}/{stats['settled_cheap_accept']}  "
+                          f"re-scored by MiniLM: {stats['rescored_minilm']}")
+        self.stdout.write(f"Reports that never needed MiniLM: {stats['queries_skipped']} of {queries}")
+        self.stdout.write(f"Same duplicate/new decision as MiniLM only: {agree} of {queries}")
+        self.stdout.write(f"Mean latency per report: MiniLM only {baseline_time / queries * 1000:.2f} ms, "
+                          f"cascade {cascade_time / queries * 1000:.2f} ms")
+        self.stdout.write(f"Estimated saved (from stage counters): {stats['estimated_saved_seconds'] * 1000:.1f} ms")
+        self._calibrate(options["pairs"])
+
+    def _calibrate(self, path):
+        """Decisions on hand-labelled pairs, and the highest reject threshold losing no labelled duplicate MiniLM finds."""
+        with open(path, encoding="utf-8") as f:
+            pairs = [(row["first"], row["second"], row["duplicate"] == "1") for row in csv.DictReader(f)]
+        firsts = embeddings.encode_many([first for first, _, _ in pairs])
+        seconds = embeddings.encode_many([second for _, second, _ in pairs])
+        found = {"MiniLM only": [], "cascade": []}
+        safe = []
+        for (first, second, duplicate), query, vector in zip(pairs, firsts, seconds):
+            candidate = [_issue(1, second, vector)]
+            minilm = find_duplicate(query, candidate)[0] is not None
+            found["MiniLM only"].append(minilm)
+            found["cascade"].append(find_duplicate_cascade(first, candidate, query=query)[0] is not None)
+            score = cascade.cheap_scores(first, [second])[0][0]
+            if duplicate and minilm and not np.isnan(score):
+                safe.append(score)
+
+        duplicates = [duplicate for _, _, duplicate in pairs]
+        self.stdout.write(f"\nLabelled pairs ({path}): {len(pairs)}, {sum(duplicates)} duplicates")
+        for name, decisions in found.items():
+            hits = sum(d and f for d, f in zip(duplicates, decisions))
+            false = sum(f and not d for d, f in zip(duplicates, decisions))
+            self.stdout.write(f"  {name:<12} finds {hits} of {sum(duplicates)} duplicates, {false} false matches")
+        agree = sum(a == b for a, b in zip(found["MiniLM only"], found["cascade"]))
+        self.stdout.write(f"  cascade agrees with MiniLM only on {agree} of {len(pairs)}")
+        if safe:
+            self.stdout.write(f"  Highest DEDUP_CASCADE_REJECT_BELOW losing none of them: {min(safe):.3f} "
+                              f"(now {settings.DEDUP_CASCADE_REJECT_BELOW})")
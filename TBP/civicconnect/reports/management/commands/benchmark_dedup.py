@@ -0,0 +1,57 @@
+import time
+
+import numpy as np
+from django.core.management.base import BaseCommand
+
+from reports import embeddings
+from reports.dedup import best_match, first_match_sequential
+
+
+def _timeit(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+class Command(BaseCommand):
+    help = "Compare per-candidate and batched duplicate scoring over stored embedding bytes."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000])
+        parser.add_argument("--dim", type=int, default=384)
+        parser.add_argument("--repeat", type=int, default=20)
+        parser.add_argument("--seed", type=int, default=42)
+
+    def handle(self, *args, **options):
+        rng = np.random.default_rng(options["seed"])
+        dim, repeat = options["dim"], options["repeat"]
+
+        self.stdout.write(f"{'candidates':>10} {'sequential ms':>14} {'batched ms':>11} {'speedup':>8}  match")
+        for size in options["sizes"]:
+            vectors = rng.standard_normal((size, dim)).astype(embeddings.EMBEDDING_DTYPE)
+            vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+            # Plant a near-duplicate at a random position so both paths have something to find.
+            query = vectors[rng.integers(size)] + 0.02 * rng.standard_normal(dim).astype(embeddings.EMBEDDING_DTYPE)
+            query /= np.linalg.norm(query)
+            # Both paths start from what the database hands back: one bytes blob per issue.
+            blobs = [embeddings.to_bytes(vector) for vector in vectors]
+
+            seq_time, (seq_index, seq_score) = _timeit(
+                lambda: first_match_sequential(query, (embeddings.from_bytes(b) for b in blobs)), repeat
+            )
+            batch_time, (batch_index, batch_score) = _timeit(
+                lambda: best_match(
+                    query,
+                    np.frombuffer(b"".join(blobs), dtype=embeddings.EMBEDDING_DTYPE).reshape(size, dim),
+                ),
+                repeat,
+            )
+
+            same = seq_index == batch_index and np.isclose(seq_score, batch_score, atol=1e-5)
+            self.stdout.write(
+                f"{size:>10} {seq_time * 1000:>14.3f} {batch_time * 1000:>11.3f} "
+                f"{seq_time / batch_time:>7.1f}x  {'same' if same else 'DIFFERENT'}"
+            )
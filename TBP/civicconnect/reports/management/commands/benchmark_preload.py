@@ -0,0 +1,105 @@
+import argparse
+import json
+import multiprocessing
+import os
+import subprocess
+import sys
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+SAMPLE_DESCRIPTION = "Garbage overflowing for 3 days near the market"
+
+
+def memory_usage():
+    """Resident, proportional and private memory of this process in MB (Linux)."""
+    fields = {}
+    try:
+        with open("/proc/self/smaps_rollup") as f:
+            for line in f:
+                name, _, rest = line.partition(":")
+                if rest.strip().endswith("kB"):
+                    fields[name] = int(rest.split()[0]) / 1024
+    except OSError:
+        import resource
+        return {"rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, "pss_mb": None, "private_mb": None}
+    return {
+        "rss_mb": fields.get("Rss"),
+        "pss_mb": fields.get("Pss"),
+        "private_mb": fields.get("Private_Clean", 0) + fields.get("Private_Dirty", 0),
+    }
+
+
+def _worker(barrier, results):
+    from reports import embeddings
+    from reports.models import compute_severity
+
+    # The same model work a first report does: severity + embedding for dedup.
+    start = time.perf_counter()
+    compute_severity(SAMPLE_DESCRIPTION)
+    embeddings.encode(SAMPLE_DESCRIPTION)
+    latency_ms = (time.perf_counter() - start) * 1000
+    # PSS splits shared pages between the processes mapping them, so read it
+    # only once every worker is alive and warm.
+    barrier.wait()
+    results.put({"pid": os.getpid(), "first_request_ms": latency_ms, **memory_usage()})
+
+
+class Command(BaseCommand):
+    help = ("Fork workers with PRELOAD_MODELS off and on and report per-worker memory (RSS/PSS) "
+            "and first-request latency.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=4)
+        parser.add_argument("--json", dest="json_path", help="Also write the results to this file.")
+        # Internal: run one measurement in a fresh interpreter (see handle()).
+        parser.add_argument("--fork-workers", action="store_true", help=argparse.SUPPRESS)
+
+    def handle(self, *args, **options):
+        if options["fork_workers"]:
+            self.stdout.write(json.dumps(self.fork_workers(options["workers"])))
+            return
+
+        # Each mode runs in a fresh interpreter, so "off" really starts with nothing loaded
+        # and "on" goes through ReportsConfig.ready() exactly as a --preload server would.
+        results = {}
+        for mode, flag in (("off", "0"), ("on", "1")):
+            env = {**os.environ, "CIVICCONNECT_PRELOAD_MODELS": flag}
+            proc = subprocess.run(
+                [sys.executable, "-m", "django", "benchmark_preload", "--fork-workers", "--workers", str(options["workers"])],
+                cwd=settings.BASE_DIR, env=env, capture_output=True, text=True,
+            )
+            if proc.returncode:
+                raise CommandError(f"preload={mode} run failed:\n{proc.stderr}")
+            results[mode] = json.loads(proc.stdout.strip().splitlines()[-1])
+
+        self.stdout.write(f"{'preload':>7} {'first req ms':>12} {'RSS/worker':>10} "
+                          f"{'PSS/worker':>10} {'private/worker':>14} {'total PSS':>9}")
+        for mode, run in results.items():
+            workers = run["workers"]
+            mean = lambda key: sum(w[key] or 0 for w in workers) / len(workers)  # noqa: E731
+            total_pss = (run["parent"]["pss_mb"] or 0) + sum(w["pss_mb"] or 0 for w in workers)
+            self.stdout.write(
+                f"{mode:>7} {mean('first_request_ms'):>12.1f} {mean('rss_mb'):>8.0f}MB "
+                f"{mean('pss_mb'):>8.0f}MB {mean('private_mb'):>12.0f}MB {total_pss:>7.0f}MB"
+            )
+
+        if options["json_path"]:
+            with open(options["json_path"], "w") as f:
+                json.dump(results, f, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"✅ Results written to {options['json_path']}"))
+
+    def fork_workers(self, count):
+        context = multiprocessing.get_context("fork")
+        barrier = context.Barrier(count + 1)
+        results = context.Queue()
+        workers = [context.Process(target=_worker, args=(barrier, results)) for _ in range(count)]
+        for worker in workers:
+            worker.start()
+        barrier.wait(timeout=600)
+        parent = memory_usage()
+        collected = [results.get(timeout=60) for _ in workers]
+        for worker in workers:
+            worker.join()
+        return {"parent": parent, "workers": collected}
@@ -0,0 +1,65 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+
+from reports.inference import SeverityBatcher, classify
+from reports.models import get_severity_model
+
+SAMPLE_DESCRIPTIONS = [
+    "Large pothole causing accidents near school zone",
+    "Streetlights not working, making area unsafe at night",
+    "Garbage overflowing for 3 days, foul smell in the area",
+    "Broken traffic signal causing traffic congestion",
+    "Water leakage from underground pipes leading to water wastage",
+    "Open manhole posing danger to pedestrians",
+    "Tree branches obstructing road visibility",
+    "Stray dogs chasing children near the park",
+]
+
+
+class Command(BaseCommand):
+    help = "Measure severity classification throughput at several batch sizes, direct and through the micro-batcher."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--sizes", type=int, nargs="+", default=[1, 8, 64, 512])
+        parser.add_argument("--rows", type=int, default=4096, help="Rows classified per measurement.")
+        parser.add_argument("--wait-ms", type=float, default=5.0)
+        parser.add_argument("--single-rows", type=int, default=500, help="Rows timed one at a time per evaluator.")
+
+    def handle(self, *args, **options):
+        model = get_severity_model()
+        rows = options["rows"]
+        texts = [SAMPLE_DESCRIPTIONS[i % len(SAMPLE_DESCRIPTIONS)] + f" #{i}" for i in range(rows)]
+        classify(texts[:max(options["sizes"])])  # Keep model (and xgboost) loading out of the timings
+
+        self.stdout.write(f"{'batch':>6} {'direct rows/s':>14} {'batcher rows/s':>15} {'mean batch':>11}")
+        for size in options["sizes"]:
+            start = time.perf_counter()
+            for i in range(0, rows, size):
+                classify(texts[i:i + size])
+            direct = rows / (time.perf_counter() - start)
+
+            # `size` concurrent callers each submitting one row at a time, the way views do.
+            batcher = SeverityBatcher(max_batch=size, max_wait_ms=options["wait_ms"])
+            start = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=size) as pool:
+                list(pool.map(batcher.predict, texts))
+            batched = rows / (time.perf_counter() - start)
+            mean_batch = batcher.rows / max(batcher.batches, 1)
+
+            self.stdout.write(f"{size:>6} {direct:>14.0f} {batched:>15.0f} {mean_batch:>11.1f}")
+
+        if model.ensemble is None:
+            return
+        # Single-row latency is what a report pays; compare the two evaluators directly.
+        singles = texts[:options["single_rows"]]
+        self.stdout.write(f"\n{'evaluator':>9} {'single-row us':>14}")
+        for name, predict in (("compiled", model.predict_compiled), ("xgboost", model.predict_xgboost)):
+            predict(singles[:1])
+            start = time.perf_counter()
+            for text in singles:
+                predict([text])
+            self.stdout.write(f"{name:>9} {(time.perf_counter() - start) / len(singles) * 1e6:>14.0f}")
+        agree = (model.predict_compiled(texts) == model.predict_xgboost(texts)).all()
+        self.stdout.write(f"Compiled and xgboost predictions identical on {rows} rows: {bool(agree)}")
@@ -0,0 +1,215 @@
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import time
+from contextlib import redirect_stdout
+
+import django
+import numpy as np
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Count
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from reports import embeddings, synthetic
+from reports.ai_prioritization import calculate_priority
+from reports.dedup import find_duplicate, find_duplicate_cascade, index_candidates, local_candidates
+from reports.ml_cache import get_cache
+from reports.models import Issue, Officer, compute_severity
+
+BENCHMARKS = ("report_issue_dedup", "compute_severity", "calculate_priority", "dashboards")
+DASHBOARDS = ("authority_dashboard", "officer_dashboard", "citizen_dashboard", "trending_issues", "prioritized_issues")
+
+
+class Rollback(Exception):
+    pass
+
+
+def _summary(seconds, **extra):
+    ms = sorted(s * 1000 for s in seconds)
+    return {
+        "runs": len(ms),
+        "min_ms": round(ms[0], 3),
+        "median_ms": round(statistics.median(ms), 3),
+        "p95_ms": round(ms[min(len(ms) - 1, int(0.95 * len(ms)))], 3),
+        "mean_ms": round(statistics.fmean(ms), 3),
+        **extra,
+    }
+
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=settings.BASE_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+class Command(BaseCommand):
+    help = ("Time report dedup, compute_severity, calculate_priority and dashboard rendering at several table "
+            "sizes, topping the table up with synthetic data, and save the results as JSON.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 100000, 1000000])
+        parser.add_argument("--only", nargs="+", choices=BENCHMARKS, default=list(BENCHMARKS))
+        parser.add_argument("--repeat", type=int, default=50, help="Timed calls per benchmark and size.")
+        parser.add_argument("--priority-repeat", type=int, default=1,
+                            help="Full calculate_priority() passes per size (each one rolled back).")
+        parser.add_argument("--seed", type=int, default=synthetic.DEFAULT_SEED)
+        parser.add_argument("--output", help="JSON file to write (default: benchmarks/<time>-<commit>.json).")
+        parser.add_argument("--compare", help="An earlier results file to print median changes against.")
+
+    def handle(self, *args, **options):
+        sizes = sorted(options["sizes"])
+        commit = _git_commit()
+        results = {
+            "commit": commit,
+            "started_at": timezone.now().isoformat(),
+            "database": connection.vendor,
+            "python": platform.python_version(),
+            "django": django.get_version(),
+            "embedding_model": embeddings.embedding_version(),
+            "options": {key: options[key] for key in ("repeat", "priority_repeat", "seed")},
+            "sizes": {},
+        }
+        for size in sizes:
+            issues = self._top_up(size, options["seed"])
+            if issues > size:
+                self.stdout.write(self.style.WARNING(f"Table already holds {issues} issues (> {size})."))
+            self.stdout.write(f"\n== {issues} issues ==")
+            # The data's city, but new draws per size, so severities measured at one size aren't
+            # cache hits at the next.
+            city = synthetic.SyntheticCity(seed=options["seed"], draws_seed=options["seed"] + size)
+            measured = {}
+            for name in options["only"]:
+                measured.update(getattr(self, f"_bench_{name}")(city, options))
+            for name, summary in measured.items():
+                self.stdout.write(f"{name:<32} median {summary['median_ms']:>10.2f} ms   "
+                                  f"p95 {summary['p95_ms']:>10.2f} ms   runs {summary['runs']}")
+            results["sizes"][str(size)] = {"issues": issues, "benchmarks": measured}
+
+        output = options["output"] or os.path.join(
+            settings.BASE_DIR, "benchmarks", f"{timezone.now():%Y%m%d-%H%M%S}-{commit}.json"
+        )
+        os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+        with open(output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        self.stdout.write(self.style.SUCCESS(f"\n✅ Results written to {output}"))
+        if options["compare"]:
+            self._compare(options["compare"], results)
+
+    def _top_up(self, size, seed):
+        issues = Issue.objects.count()
+        if issues < size:
+            missing = size - issues
+            self.stdout.write(f"Generating {missing} synthetic issues...")
+            synthetic.generate(missing, users=max(100, missing // 10), officers=max(10, missing // 1000), seed=seed)
+            issues = size
+        return issues
+
+    def _bench_report_issue_dedup(self, city, options):
+        """The duplicate check a report goes through (tasks.process_report), without the write."""
+        repeat = options["repeat"]
+        texts, _ = city.descriptions(repeat)
+        lat, lon, _ = city.points(repeat)
+
+        def check(i):
+            candidates = local_candidates(lat[i], lon[i])
+            issue, _ = find_duplicate_cascade(texts[i], candidates, query=lambda: embeddings.encode(texts[i]))
+            if issue is None:
+                vector = embeddings.encode(texts[i])
+                extra = index_candidates(vector, lat[i], lon[i], exclude={c.id for c in candidates})
+                issue, _ = find_duplicate(vector, extra)
+            return len(candidates), issue is not None
+
+        # Candidates' missing embeddings are encoded and stored on first touch, as after a
+        # deploy; time the steady state, which is what every later report sees.
+        for i in range(repeat):
+            check(i)
+        seconds, candidates, duplicates = [], [], 0
+        for i in range(repeat):
+            start = time.perf_counter()
+            count, duplicate = check(i)
+            seconds.append(time.perf_counter() - start)
+            candidates.append(count)
+            duplicates += duplicate
+        return {"report_issue_dedup": _summary(seconds, mean_candidates=round(float(np.mean(candidates)), 1),
+                                               duplicates_found=duplicates)}
+
+    def _bench_compute_severity(self, city, options):
+        """One uncached severity call: the in-process cache is emptied before each."""
+        texts, _ = city.descriptions(options["repeat"])
+        compute_severity(texts[0])  # Model loading isn't part of a call
+        cache = get_cache("severity")
+        seconds = []
+        for text in texts:
+            cache.clear()
+            start = time.perf_counter()
+            compute_severity(text)
+            seconds.append(time.perf_counter() - start)
+        return {"compute_severity": _summary(seconds)}
+
+    def _bench_calculate_priority(self, city, options):
+        """Full re-score of the table, rolled back each time so every pass does the same work."""
+        seconds = []
+        for _ in range(options["priority_repeat"]):
+            try:
+                with transaction.atomic():
+                    start = time.perf_counter()
+                    with redirect_stdout(io.StringIO()):
+                        calculate_priority()
+                    seconds.append(time.perf_counter() - start)
+                    raise Rollback
+            except Rollback:
+                pass
+        return {"calculate_priority": _summary(seconds)}
+
+    @override_settings(ALLOWED_HOSTS=["testserver"])  # The test client's host, as under `manage.py test`
+    def _bench_dashboards(self, city, options):
+        busiest_officer = Officer.objects.order_by("-open_issue_count", "id").first()
+        busiest_citizen = (Issue.objects.values("user").annotate(n=Count("id")).order_by("-n").first() or {}).get("user")
+        if busiest_officer is None or busiest_citizen is None:
+            raise CommandError("Dashboards need at least one officer and one issue.")
+        logins = {
+            "authority_dashboard": busiest_citizen,
+            "officer_dashboard": busiest_officer.user_id,
+            "citizen_dashboard": busiest_citizen,
+            "trending_issues": busiest_citizen,
+            "prioritized_issues": busiest_citizen,
+        }
+
+        measured = {}
+        client = Client()
+        for name in DASHBOARDS:
+            client.force_login(django.contrib.auth.get_user_model().objects.get(id=logins[name]))
+            url = reverse(name)
+            client.get(url)  # Template compilation and session warm-up
+            seconds = []
+            for _ in range(options["repeat"]):
+                with CaptureQueriesContext(connection) as queries:
+                    start = time.perf_counter()
+                    response = client.get(url)
+                    seconds.append(time.perf_counter() - start)
+                if response.status_code != 200:
+                    raise CommandError(f"{name} returned {response.status_code}")
+            measured[f"render_{name}"] = _summary(seconds, queries=len(queries), bytes=len(response.content))
+        return measured
+
+    def _compare(self, path, results):
+        with open(path, encoding="utf-8") as f:
+            before = json.load(f)
+        self.stdout.write(f"\nMedian vs {before.get('commit', '?')} ({path}):")
+        for size, current in results["sizes"].items():
+            previous = before.get("sizes", {}).get(size, {}).get("benchmarks", {})
+            for name, summary in current["benchmarks"].items():
+                if name in previous and previous[name]["median_ms"]:
+                    ratio = summary["median_ms"] / previous[name]["median_ms"]
+                    self.stdout.write(f"{size:>8} {name:<32} {previous[name]['median_ms']:>10.2f} -> "
+                                      f"{summary['median_ms']:>10.2f} ms  ({ratio:.2f}x)")
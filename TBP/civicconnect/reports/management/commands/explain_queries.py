@@ -0,0 +1,183 @@
+import json
+import os
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DatabaseError, connection, transaction
+from django.db.models import Count
+from django.utils import timezone
+
+from reports import trending
+from reports.models import Issue, Officer, description_hash
+from reports.views import DASHBOARD_ORDERING, DASHBOARD_PAGE_SIZE
+
+from .benchmark_suite import Rollback, _git_commit, _summary
+
+ISSUE_TABLE = Issue._meta.db_table
+INSERT_ROWS = 100
+# The schema before migration 0012, rebuilt inside a rolled-back transaction for the "before" run.
+NEW_INDEXES = ("issue_user_created_idx", "issue_officer_status_idx")
+OLD_INDEXES = {
+    "before_issue_user_idx": ("user_id",),
+    "before_issue_officer_idx": ("assigned_officer_id",),
+}
+OLD_UNIQUE = ("before_unique_issue_location", ("description", "latitude", "longitude"))
+NEW_UNIQUE = ("unique_issue_location", ("description_hash", "latitude", "longitude"))
+
+
+class Command(BaseCommand):
+    help = ("EXPLAIN and time each view's Issue queries on the current schema and on the one before "
+            "migration 0012 (description unique key, no composite indexes), and save the report as JSON.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--repeat", type=int, default=50, help="Timed runs per query and schema.")
+        parser.add_argument("--output", help="JSON file to write (default: benchmarks/explain-<time>-<commit>.json).")
+
+    def handle(self, *args, **options):
+        queries = self._queries()
+        commit = _git_commit()
+        results = {
+            "commit": commit,
+            "started_at": timezone.now().isoformat(),
+            "database": connection.vendor,
+            "issues": Issue.objects.count(),
+            "before": {},
+            "after": self._measure(queries, options["repeat"], old=False),
+        }
+        results["after"]["unique_index_bytes"] = self._index_bytes(NEW_UNIQUE[1])
+        try:
+            with transaction.atomic():
+                self.stdout.write("Rebuilding the old schema in a transaction (rolled back afterwards)...")
+                results["before_kept_hash_key"] = not self._old_schema()
+                results["before"] = self._measure(queries, options["repeat"], old=True)
+                results["before"]["unique_index_bytes"] = self._index_bytes(OLD_UNIQUE[1])
+                raise Rollback
+        except Rollback:
+            pass
+
+        for name in queries:
+            before, after = results["before"][name], results["after"][name]
+            self.stdout.write(f"\n== {name} ==\n  before {before['median_ms']:>10.3f} ms   {before['plan']}\n"
+                              f"  after  {after['median_ms']:>10.3f} ms   {after['plan']}")
+        self.stdout.write(f"\nunique_issue_location: {results['before']['unique_index_bytes']} -> "
+                          f"{results['after']['unique_index_bytes']} bytes")
+        if results["before_kept_hash_key"]:
+            self.stdout.write(self.style.WARNING(
+                "The hashed unique key is part of the table definition here, so the 'before' run kept it "
+                "next to the old one: its insert timing counts both."
+            ))
+
+        output = options["output"] or os.path.join(
+            settings.BASE_DIR, "benchmarks", f"explain-{timezone.now():%Y%m%d-%H%M%S}-{commit}.json"
+        )
+        os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+        with open(output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        self.stdout.write(self.style.SUCCESS(f"\n✅ Report written to {output}"))
+
+    def _queries(self):
+        """name -> function(old) returning the queryset to EXPLAIN (None for writes) and a callable running it.
+
+        `old` asks for the query as the app made it before migration 0012, where that differs.
+        """
+        citizen = (Issue.objects.values("user").annotate(n=Count("id")).order_by("-n").first() or {}).get("user")
+        officer = Officer.objects.order_by("-open_issue_count", "id").first()
+        sample = Issue.objects.order_by("-id").only("description", "latitude", "longitude").first()
+        if citizen is None or officer is None or sample is None:
+            raise CommandError("Needs issues and officers; run generate_synthetic_data first.")
+        key = description_hash(sample.description)
+
+        mine = Issue.objects.filter(user_id=citizen).order_by("-created_at", "-id")[:DASHBOARD_PAGE_SIZE + 1]
+        in_progress = Issue.objects.filter(assigned_officer=officer, status="In Progress")
+        load = (Issue.objects.exclude(status="Solved").exclude(assigned_officer=None)
+                .values("assigned_officer").annotate(n=Count("id")))
+        dashboard = Issue.objects.order_by(*DASHBOARD_ORDERING)[:DASHBOARD_PAGE_SIZE + 1]
+        hot = trending.trending_issues()[:10]
+        duplicate = Issue.objects.filter(description_hash=key, latitude=sample.latitude, longitude=sample.longitude)
+        duplicate_before = Issue.objects.filter(description=sample.description, latitude=sample.latitude,
+                                                longitude=sample.longitude)
+        # all() clones, so each run queries instead of reading the last run's result cache.
+        return {
+            "citizen_issues (issue_list_api)": lambda old: (mine, lambda: list(mine.all())),
+            "officer_in_progress_count": lambda old: (in_progress.values("id"), in_progress.count),
+            "officer_load (assignment.recount)": lambda old: (load, lambda: list(load.all())),
+            "authority_dashboard": lambda old: (dashboard, lambda: list(dashboard.all())),
+            "trending_issues": lambda old: (hot, lambda: list(hot.all())),
+            # The lookup the uniqueness key answers; the old schema only had the description to go on.
+            "exact_duplicate": lambda old: (duplicate_before if old else duplicate,
+                                            (duplicate_before if old else duplicate).exists),
+            f"insert_{INSERT_ROWS}_issues": lambda old: (None, lambda: self._insert(citizen)),
+        }
+
+    def _measure(self, queries, repeat, old):
+        measured = {}
+        for name, query in queries.items():
+            queryset, run = query(old)
+            run()  # Warm the page cache
+            seconds = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                run()
+                seconds.append(time.perf_counter() - start)
+            plan = " | ".join(queryset.explain().splitlines()) if queryset is not None else None
+            measured[name] = _summary(seconds, plan=plan)
+        return measured
+
+    def _insert(self, citizen):
+        """Bulk-inserts INSERT_ROWS issues and rolls them back: the cost of maintaining every index."""
+        stamp = time.perf_counter_ns()
+        rows = [Issue(user_id=citizen, username="explain", email="explain@example.com",
+                      description=f"Index maintenance probe {stamp}-{i}: " + "water logging near the market " * 8,
+                      location_name="Probe", latitude=i * 1e-3, longitude=stamp % 1000 * 1e-3)
+                for i in range(INSERT_ROWS)]
+        try:
+            with transaction.atomic():
+                Issue.objects.bulk_create(rows)
+                raise Rollback
+        except Rollback:
+            pass
+
+    def _old_schema(self):
+        """Swaps in the pre-0012 indexes. Returns whether the hashed unique key could be dropped.
+
+        SQLite declares it inside CREATE TABLE, where only rebuilding the table removes it.
+        """
+        quote = connection.ops.quote_name
+        dropped = connection.vendor == "postgresql"
+        with connection.cursor() as cursor:
+            for name in NEW_INDEXES:
+                cursor.execute(f"DROP INDEX {quote(name)}")
+            if dropped:
+                cursor.execute(f"ALTER TABLE {quote(ISSUE_TABLE)} DROP CONSTRAINT {quote(NEW_UNIQUE[0])}")
+            for unique, (name, columns) in [(True, OLD_UNIQUE), *((False, index) for index in OLD_INDEXES.items())]:
+                columns = ", ".join(quote(column) for column in columns)
+                cursor.execute(f"CREATE {'UNIQUE ' if unique else ''}INDEX {quote(name)} "
+                               f"ON {quote(ISSUE_TABLE)} ({columns})")
+        return dropped
+
+    def _index_bytes(self, columns):
+        """On-disk size of the issue index over `columns`, where the database can tell (PostgreSQL, SQLite with dbstat)."""
+        with connection.cursor() as cursor:
+            constraints = connection.introspection.get_constraints(cursor, ISSUE_TABLE)
+            if connection.vendor == "sqlite":
+                # Constraints declared in CREATE TABLE are backed by sqlite_autoindex_* indexes.
+                cursor.execute(f"PRAGMA index_list({connection.ops.quote_name(ISSUE_TABLE)})")
+                names = [row[1] for row in cursor.fetchall()]
+                constraints = {}
+                for name in names:
+                    cursor.execute(f"PRAGMA index_info({connection.ops.quote_name(name)})")
+                    constraints[name] = {"columns": [row[2] for row in cursor.fetchall()]}
+        name = next((name for name, info in constraints.items() if info["columns"] == list(columns)), None)
+        sql = {
+            "postgresql": "SELECT pg_relation_size(%s::regclass)",
+            "sqlite": "SELECT SUM(pgsize) FROM dbstat WHERE name = %s",
+        }.get(connection.vendor)
+        if name is None or sql is None:
+            return None
+        try:
+            with transaction.atomic(), connection.cursor() as cursor:
+                cursor.execute(sql, [name])
+                return cursor.fetchone()[0]
+        except DatabaseError:
+            return None
@@ -0,0 +1,53 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from reports import synthetic
+
+
+class Command(BaseCommand):
+    help = ("Add synthetic citizens, officers, spatially clustered issues and their reports "
+            "(works on SQLite: DB_ENGINE=sqlite). See reports/synthetic.py.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--issues", type=int, default=1000)
+        parser.add_argument("--users", type=int, default=None,
+                            help="Citizens to add (default: one per 10 issues, at least 100).")
+        parser.add_argument("--officers", type=int, default=None,
+                            help="Officers to add (default: one per 1000 issues, at least 10).")
+        parser.add_argument("--hotspots", type=int, default=50)
+        parser.add_argument("--radius-km", type=float, default=15.0)
+        parser.add_argument("--days", type=int, default=365, help="Spread created_at over this many days.")
+        parser.add_argument("--seed", type=int, default=synthetic.DEFAULT_SEED)
+        parser.add_argument("--batch-size", type=int, default=5000)
+        parser.add_argument("--prefix", default="synth", help="Username prefix of the generated accounts.")
+        parser.add_argument("--embed", action="store_true", help="Encode MiniLM embeddings while inserting.")
+
+    def handle(self, *args, **options):
+        issues = options["issues"]
+        users = options["users"] if options["users"] is not None else max(100, issues // 10)
+        officers = options["officers"] if options["officers"] is not None else max(10, issues // 1000)
+        start = time.perf_counter()
+
+        def progress(done, total):
+            elapsed = time.perf_counter() - start
+            self.stdout.write(f"{done}/{total} issues ({done / elapsed:.0f}/s)")
+
+        try:
+            counts = synthetic.generate(
+                issues, users=users, officers=officers, seed=options["seed"], hotspots=options["hotspots"],
+                radius_km=options["radius_km"], days=options["days"], batch_size=options["batch_size"],
+                prefix=options["prefix"], embed=options["embed"], progress=progress,
+            )
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ Added {counts['users']} users, {counts['officers']} officers, {counts['issues']} issues and "
+            f"{counts['reports']} reports in {time.perf_counter() - start:.1f}s."
+        ))
+        follow_up = ["refresh_priorities (re-score each description with the model)"]
+        if not options["embed"]:
+            follow_up.insert(0, "backfill_embeddings")
+        follow_up += ["rebuild_issue_index", "rebuild_text_index"]
+        self.stdout.write("For dedup and search over these rows, run: " + ", ".join(follow_up))
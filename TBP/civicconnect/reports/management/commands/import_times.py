@@ -0,0 +1,65 @@
+import json
+import os
+import pkgutil
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# Libraries that cost hundreds of milliseconds (or seconds) to import. None of
+# them should be loaded until a request actually needs a model or a dataframe.
+HEAVY_MODULES = ("torch", "sentence_transformers", "transformers", "sklearn", "scipy", "xgboost", "pandas", "gensim")
+
+PROBE = """
+import importlib, json, sys, time
+start = time.perf_counter()
+import django
+django.setup()
+setup_s = time.perf_counter() - start
+start = time.perf_counter()
+importlib.import_module({module!r})
+import_s = time.perf_counter() - start
+print(json.dumps({{"setup_s": setup_s, "import_s": import_s,
+                  "heavy": [m for m in {heavy!r} if m in sys.modules]}}))
+"""
+
+
+def app_modules():
+    """Every module of the reports app that a worker or manage.py can end up importing."""
+    import reports
+
+    names = [f"reports.{info.name}" for info in pkgutil.iter_modules(reports.__path__)
+             if not info.ispkg and info.name != "tests"]
+    return names + ["civicconnect.urls"]
+
+
+def probe(module):
+    """Imports `module` in a fresh interpreter after django.setup() and returns the timings."""
+    proc = subprocess.run(
+        [sys.executable, "-c", PROBE.format(module=module, heavy=HEAVY_MODULES)],
+        cwd=settings.BASE_DIR, env={**os.environ, "CIVICCONNECT_PRELOAD_MODELS": "0"}, capture_output=True, text=True,
+    )
+    if proc.returncode:
+        raise CommandError(f"Importing {module} failed:\n{proc.stderr}")
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+class Command(BaseCommand):
+    help = "Report how long django.setup() and each reports module take to import, and which heavy libraries they pull in."
+
+    def add_arguments(self, parser):
+        parser.add_argument("modules", nargs="*", help="Modules to probe (default: every reports module).")
+        parser.add_argument("--repeat", type=int, default=3, help="Fresh interpreters per module; the fastest run is kept.")
+
+    def handle(self, *args, **options):
+        modules = options["modules"] or app_modules()
+        rows = []
+        for module in modules:
+            runs = [probe(module) for _ in range(options["repeat"])]
+            rows.append((module, min(r["setup_s"] for r in runs), min(r["import_s"] for r in runs), runs[0]["heavy"]))
+
+        self.stdout.write(f"django.setup(): {min(r[1] for r in rows) * 1000:.0f} ms")
+        self.stdout.write(f"{'module':<36} {'import ms':>9}  heavy imports")
+        for module, _, import_s, heavy in sorted(rows, key=lambda r: -r[2]):
+            self.stdout.write(f"{module:<36} {import_s * 1000:>9.1f}  {', '.join(heavy) or '-'}")
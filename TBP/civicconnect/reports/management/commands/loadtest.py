@@ -0,0 +1,90 @@
+import json
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from reports import loadtest
+
+from .benchmark_suite import _git_commit
+
+
+def _mix(value):
+    try:
+        mix = {role: float(weight) for role, weight in (part.split("=") for part in value.split(","))}
+    except ValueError:
+        raise CommandError(f"--mix expects role=weight pairs, e.g. citizen=70,officer=20,authority=10; got {value!r}")
+    unknown = set(mix) - set(loadtest.ROLES)
+    if unknown:
+        raise CommandError(f"Unknown roles in --mix: {', '.join(sorted(unknown))}")
+    return mix
+
+
+def _point(value):
+    try:
+        lat, lon = (float(part) for part in value.split(","))
+    except ValueError:
+        raise CommandError(f"--focus expects LAT,LON; got {value!r}")
+    return lat, lon
+
+
+class Command(BaseCommand):
+    help = ("Drive the app with concurrent simulated citizens, officers and authorities (in-process, or over HTTP "
+            "with --url) and write per-endpoint throughput, latency percentiles and error rates as JSON.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=50, help="Concurrent virtual users.")
+        parser.add_argument("--mix", default="citizen=70,officer=20,authority=10",
+                            help="Share of virtual users per role.")
+        parser.add_argument("--duration", type=float, default=60.0, help="Seconds of traffic.")
+        parser.add_argument("--url", help="Base URL of a running server (default: in-process test client).")
+        parser.add_argument("--think-ms", type=float, default=200.0, help="Mean pause between a user's actions.")
+        parser.add_argument("--session-actions", type=int, default=20, help="Actions per login.")
+        parser.add_argument("--flood", action="store_true",
+                            help="Citizens all report flooding from around one spot (see --focus).")
+        parser.add_argument("--focus", help="LAT,LON of the flood (default: the busiest synthetic hotspot).")
+        parser.add_argument("--job-workers", type=int, default=None,
+                            help="Report-processing workers to run here (default: 2 in-process, 0 with --url, "
+                                 "where the server's `run_jobs` does the work).")
+        parser.add_argument("--drain-seconds", type=float, default=30.0,
+                            help="How long to wait afterwards for queued reports to be processed.")
+        parser.add_argument("--password", default="loadtest-password", help="Password of the loadtest-* accounts.")
+        parser.add_argument("--seed", type=int, help="Replay the traffic of an earlier run (default: a new seed).")
+        parser.add_argument("--output", help="JSON file to write (default: benchmarks/loadtest-<time>-<commit>.json).")
+
+    def handle(self, *args, **options):
+        job_workers = options["job_workers"]
+        if job_workers is None:
+            job_workers = 0 if options["url"] else 2
+        commit = _git_commit()
+        report = loadtest.run(
+            options["users"], _mix(options["mix"]), options["duration"], url=options["url"],
+            password=options["password"], think_ms=options["think_ms"], session_actions=options["session_actions"],
+            flood=options["flood"], focus=_point(options["focus"]) if options["focus"] else None,
+            job_workers=job_workers, drain_seconds=options["drain_seconds"], seed=options["seed"],
+        )
+        report = {"commit": commit, **report, "options": {
+            key: options[key] for key in ("users", "mix", "duration", "think_ms", "session_actions", "flood")
+        }}
+
+        self.stdout.write(f"{'endpoint':<20} {'requests':>8} {'req/s':>8} {'p50 ms':>9} {'p95 ms':>9} "
+                          f"{'p99 ms':>9} {'errors':>7}")
+        for name, stats in list(report["endpoints"].items()) + [("TOTAL", report["totals"])]:
+            if not stats["requests"]:
+                continue
+            self.stdout.write(f"{name:<20} {stats['requests']:>8} {stats['throughput_rps']:>8.1f} "
+                              f"{stats['p50_ms']:>9.1f} {stats['p95_ms']:>9.1f} {stats['p99_ms']:>9.1f} "
+                              f"{stats['error_rate']:>7.1%}")
+        jobs = report["jobs"]
+        if jobs["created"]:
+            latency = f", enqueue to done p50 {jobs['p50_ms']:.0f} ms / p99 {jobs['p99_ms']:.0f} ms" if "p50_ms" in jobs else ""
+            self.stdout.write(f"Report jobs: {jobs['created']} {jobs['statuses']} {jobs['outcomes']}{latency}")
+
+        output = options["output"] or os.path.join(
+            settings.BASE_DIR, "benchmarks", f"loadtest-{timezone.now():%Y%m%d-%H%M%S}-{commit}.json"
+        )
+        os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+        with open(output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        self.stdout.write(self.style.SUCCESS(f"✅ Report written to {output}"))
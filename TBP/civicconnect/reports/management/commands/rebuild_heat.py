@@ -0,0 +1,19 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from reports import trending, view_cache
+
+
+class Command(BaseCommand):
+    help = ("Recompute every issue's trending heat from ReportedUser.reported_at "
+            "(after changing TRENDING_HALF_LIFE_HOURS or bulk inserts).")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=trending.BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        count = trending.rebuild(batch_size=options["batch_size"])
+        view_cache.TRENDING.invalidate()
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ Rebuilt the heat of {count} issues at a {settings.TRENDING_HALF_LIFE_HOURS}h half-life."
+        ))
@@ -0,0 +1,19 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from reports import vector_index
+
+
+class Command(BaseCommand):
+    help = "Rebuild the vector index over open issues' embeddings and write its snapshot."
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        index = vector_index.build_from_db()
+        path = vector_index.snapshot_path()
+        index.save(path)
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ Indexed {len(index)} open issues into {len(index.centroids) or 1} lists "
+            f"in {time.perf_counter() - start:.2f}s -> {path}"
+        ))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from reports.assignment import recount
+
+
+class Command(BaseCommand):
+    help = "Recompute every officer's open-issue counter from the issues table (after bulk SQL edits)."
+
+    def handle(self, *args, **options):
+        changed = recount()
+        self.stdout.write(self.style.SUCCESS(f"✅ Corrected the open-issue count of {changed} officers."))
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from reports.scoring import CHUNK_SIZE, current_priority_version, reprioritize
+
+
+class Command(BaseCommand):
+    help = "Re-score issues whose priority was computed by an older severity model or formula."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+        parser.add_argument("--all", action="store_true", help="Re-score every issue, not just stale ones.")
+
+    def handle(self, *args, **options):
+        stats = reprioritize(chunk_size=options["chunk_size"], only_stale=not options["all"])
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ Scanned {stats['scanned']} issues, updated {stats['updated']} ({current_priority_version()})."
+        ))
@@ -0,0 +1,14 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from reports import work_queue
+
+
+class Command(BaseCommand):
+    help = "Recompute officers' work-queue keys (after changing WORK_QUEUE_AGING_PER_DAY or bulk inserts)."
+
+    def handle(self, *args, **options):
+        count = work_queue.rekey()
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ Re-keyed {count} issues at {settings.WORK_QUEUE_AGING_PER_DAY} priority points per day waiting."
+        ))
@@ -0,0 +1,31 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from reports import jobs
+
+
+class Command(BaseCommand):
+    help = "Run queued background jobs (report dedup and scoring, ...). Start as many workers as needed."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--once", action="store_true", help="Run every due job, then exit.")
+        parser.add_argument("--sleep", type=float, default=1.0, help="Seconds to wait when the queue is empty.")
+        parser.add_argument("--kind", action="append", dest="kinds", help="Only run jobs of this kind (repeatable).")
+
+    def handle(self, *args, **options):
+        worker = jobs.worker_name()
+        self.stdout.write(f"Worker {worker} handling: {', '.join(options['kinds'] or sorted(jobs.HANDLERS))}")
+        try:
+            while True:
+                start = time.perf_counter()
+                count = jobs.run_pending(worker, kinds=options["kinds"])
+                if count:
+                    self.stdout.write(f"Ran {count} jobs in {time.perf_counter() - start:.2f}s")
+                if options["once"]:
+                    break
+                if not count:
+                    time.sleep(options["sleep"])
+        except KeyboardInterrupt:
+            pass
+        self.stdout.write(self.style.SUCCESS(f"✅ Worker {worker} stopped."))
@@ -0,0 +1,46 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from reports import cron, scheduler  # noqa: F401 (cron registers the periodic jobs)
+from reports.models import ScheduledRun
+
+
+class Command(BaseCommand):
+    help = ("Run the periodic jobs in reports/cron.py when due. Safe to start on several hosts: "
+            "a database lock lets only one of them work at a time.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--once", action="store_true", help="Run whatever is due, then exit.")
+        parser.add_argument("--tick", type=float, default=30.0, help="Seconds between checks for due jobs.")
+        parser.add_argument("--run", action="append", default=[], metavar="JOB",
+                            help="Run this job now whether or not it is due (repeatable; implies --once).")
+        parser.add_argument("--history", type=int, metavar="N", help="Show the last N runs and exit.")
+
+    def handle(self, *args, **options):
+        if options["history"]:
+            for run in ScheduledRun.objects.order_by("-started_at")[:options["history"]]:
+                self.stdout.write(f"{timezone.localtime(run.started_at):%Y-%m-%d %H:%M:%S}  {run.job:<20} {run.status:<7} "
+                                  f"{run.duration_seconds or 0:8.2f}s  {run.rows if run.rows is not None else '-':>8} rows")
+            return
+        unknown = set(options["run"]) - set(scheduler.JOBS)
+        if unknown:
+            raise CommandError(f"Unknown job(s): {', '.join(sorted(unknown))}. Known: {', '.join(sorted(scheduler.JOBS))}")
+
+        owner = scheduler.worker_name()
+        try:
+            while True:
+                runs = scheduler.tick(owner, force=options["run"])
+                if runs is None:
+                    self.stdout.write("Another scheduler holds the lock; skipping.")
+                for run in runs or ():
+                    style = self.style.SUCCESS if run.status == ScheduledRun.OK else self.style.ERROR
+                    self.stdout.write(style(f"{run.job}: {run.status} in {run.duration_seconds:.2f}s, {run.rows} rows"))
+                if options["once"] or options["run"]:
+                    break
+                time.sleep(options["tick"])
+        except KeyboardInterrupt:
+            pass
+        finally:
+            scheduler.release_lock(owner)
@@ -0,0 +1,58 @@
+import os
+import pickle
+
+from django.core.management.base import BaseCommand, CommandError
+
+from reports import model_registry
+
+LEGACY_DIR = os.path.dirname(model_registry.REGISTRY_DIR)  # civicconnect_ai/
+
+
+class Command(BaseCommand):
+    help = "List, activate or convert severity model artifacts in the model registry."
+
+    def add_arguments(self, parser):
+        group = parser.add_mutually_exclusive_group()
+        group.add_argument("--activate", metavar="VERSION", help="Make VERSION the live model (workers switch within seconds).")
+        group.add_argument("--convert", action="store_true",
+                           help="Convert the legacy ai_severity_model.pkl / tfidf_vectorizer.pkl into a new version.")
+        parser.add_argument("--pickle-dir", default=LEGACY_DIR, help="Where the legacy pickles live.")
+        parser.add_argument("--no-activate", action="store_true", help="With --convert: don't make the new version live.")
+
+    def handle(self, *args, **options):
+        try:
+            if options["convert"]:
+                self.convert(options["pickle_dir"], activate=not options["no_activate"])
+            elif options["activate"]:
+                model_registry.load_severity_model(options["activate"])  # Refuse to activate a broken artifact
+                model_registry.set_current(options["activate"])
+                self.stdout.write(self.style.SUCCESS(f"✅ {options['activate']} is now the active severity model."))
+            else:
+                self.list_versions()
+        except model_registry.ArtifactError as exc:
+            raise CommandError(str(exc)) from exc
+
+    def list_versions(self):
+        try:
+            current = model_registry.current_version()
+        except model_registry.ArtifactError:
+            current = None
+        versions = model_registry.list_versions()
+        if not versions:
+            self.stdout.write("⚠ No severity models in the registry.")
+        for version in versions:
+            manifest = model_registry.read_manifest(version)
+            marker = "*" if version == current else " "
+            source = manifest["metadata"].get("source", "")
+            self.stdout.write(f"{marker} {version}  {manifest['num_features']:>5} features  {manifest['created_at']}  {source}")
+
+    def convert(self, pickle_dir, activate):
+        with open(os.path.join(pickle_dir, "ai_severity_model.pkl"), "rb") as f:
+            model = pickle.load(f)
+        with open(os.path.join(pickle_dir, "tfidf_vectorizer.pkl"), "rb") as f:
+            vectorizer = pickle.load(f)
+        version = model_registry.write_severity_artifact(
+            model.get_booster(), vectorizer, classes=model.classes_,
+            metadata={"source": "converted from ai_severity_model.pkl"}, activate=activate,
+        )
+        self.stdout.write(self.style.SUCCESS(f"✅ Wrote severity model {version}{' (active)' if activate else ''}."))
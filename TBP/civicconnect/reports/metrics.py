@@ -0,0 +1,201 @@
+"""Per-view request metrics, exposed in the Prometheus text format at /metrics/.
+
+MetricsMiddleware times every request. It counts the SQL queries and
+their time through a database execute_wrapper, and adds up the time spent
+in ML code, which is marked with `with ml_timer():` (embedding, severity and
+cheap-scorer calls). Totals are kept per URL name and method. Latency
+also goes into a histogram, and so does the number of queries per request,
+which is where an N+1 pattern shows up.
+
+The counters live in this process. Run one scrape target per worker
+process, or accept that each scrape sees the worker that answered it.
+ML cache, dedup-cascade and cached-list counters are appended to the same page.
+"""
+import threading
+import time
+from bisect import bisect_left
+from collections import defaultdict
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import connection
+from django.http import HttpResponse, HttpResponseForbidden
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+_local = threading.local()
+
+
+@contextmanager
+def ml_timer():
+    """Adds the time spent inside the block to the current request's ML time (no-op outside requests)."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        if getattr(_local, "ml_seconds", None) is not None:
+            _local.ml_seconds += time.perf_counter() - start
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # The last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class ViewStats:
+    def __init__(self):
+        self.latency = Histogram(LATENCY_BUCKETS)
+        self.queries = Histogram(QUERY_BUCKETS)
+        self.db_seconds = 0.0
+        self.ml_seconds = 0.0
+        self.statuses = defaultdict(int)
+
+
+class Registry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.views = defaultdict(ViewStats)  # (view, method) -> ViewStats
+
+    def observe(self, view, method, status, seconds, queries, db_seconds, ml_seconds):
+        with self._lock:
+            stats = self.views[(view, method)]
+            stats.latency.observe(seconds)
+            stats.queries.observe(queries)
+            stats.db_seconds += db_seconds
+            stats.ml_seconds += ml_seconds
+            stats.statuses[status] += 1
+
+    def reset(self):
+        with self._lock:
+            self.views.clear()
+
+    def render(self):
+        lines = []
+        with self._lock:
+            views = sorted(self.views.items())
+            _family(lines, "civicconnect_requests_total", "counter", "Requests by view, method and status.")
+            for (view, method), stats in views:
+                for status, count in sorted(stats.statuses.items()):
+                    lines.append(f'civicconnect_requests_total{_labels(view=view, method=method, status=status)} {count}')
+            _family(lines, "civicconnect_request_seconds", "histogram", "Wall time per request.")
+            for (view, method), stats in views:
+                _histogram(lines, "civicconnect_request_seconds", stats.latency, view=view, method=method)
+            _family(lines, "civicconnect_request_queries", "histogram", "SQL queries per request.")
+            for (view, method), stats in views:
+                _histogram(lines, "civicconnect_request_queries", stats.queries, view=view, method=method)
+            _family(lines, "civicconnect_request_db_seconds_total", "counter", "Time spent in SQL queries.")
+            for (view, method), stats in views:
+                lines.append(f"civicconnect_request_db_seconds_total{_labels(view=view, method=method)} {stats.db_seconds}")
+            _family(lines, "civicconnect_request_ml_seconds_total", "counter", "Time spent in ML code.")
+            for (view, method), stats in views:
+                lines.append(f"civicconnect_request_ml_seconds_total{_labels(view=view, method=method)} {stats.ml_seconds}")
+        return lines
+
+
+registry = Registry()
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(**labels):
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + "}"
+
+
+def _family(lines, name, kind, help_text):
+    lines.append(f"# HELP {name} {help_text}")
+    lines.append(f"# TYPE {name} {kind}")
+
+
+def _histogram(lines, name, histogram, **labels):
+    cumulative = 0
+    for bound, count in zip(list(histogram.buckets) + ["+Inf"], histogram.counts):
+        cumulative += count
+        lines.append(f"{name}_bucket{_labels(**labels, le=bound)} {cumulative}")
+    lines.append(f"{name}_sum{_labels(**labels)} {histogram.sum}")
+    lines.append(f"{name}_count{_labels(**labels)} {histogram.count}")
+
+
+def _ml_lines():
+    from . import cascade, ml_cache
+
+    lines = []
+    _family(lines, "civicconnect_ml_cache_events_total", "counter", "Model output cache lookups by result.")
+    caches = ml_cache.stats()
+    for namespace, stats in sorted(caches.items()):
+        for event in ("hits", "shared_hits", "misses", "evictions"):
+            lines.append(f"civicconnect_ml_cache_events_total{_labels(cache=namespace, event=event)} {stats[event]}")
+    _family(lines, "civicconnect_ml_cache_entries", "gauge", "Entries held in each in-process model output cache.")
+    for namespace, stats in sorted(caches.items()):
+        lines.append(f"civicconnect_ml_cache_entries{_labels(cache=namespace)} {stats['entries']}")
+
+    stats = cascade.stats.as_dict()
+    _family(lines, "civicconnect_dedup_comparisons_total", "counter", "Dedup comparisons by the stage that settled them.")
+    for stage, key in (("cheap_reject", "settled_cheap_reject"), ("cheap_accept", "settled_cheap_accept"),
+                       ("minilm", "rescored_minilm")):
+        lines.append(f"civicconnect_dedup_comparisons_total{_labels(stage=stage)} {stats[key]}")
+    _family(lines, "civicconnect_dedup_minilm_skipped_total", "counter", "Reports deduplicated without MiniLM.")
+    lines.append(f"civicconnect_dedup_minilm_skipped_total {stats['queries_skipped']}")
+    return lines
+
+
+def _view_cache_lines():
+    from . import view_cache
+
+    lines = []
+    _family(lines, "civicconnect_view_cache_events_total", "counter", "Cached issue list lookups, rebuilds and invalidations.")
+    for name, counts in sorted(view_cache.stats().items()):
+        for event, count in counts.items():
+            lines.append(f"civicconnect_view_cache_events_total{_labels(list=name, event=event)} {count}")
+    return lines
+
+
+def render():
+    return "\n".join(registry.render() + _ml_lines() + _view_cache_lines()) + "\n"
+
+
+class MetricsMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        queries = [0, 0.0]  # count, seconds
+
+        def record_query(execute, sql, params, many, context):
+            start = time.perf_counter()
+            try:
+                return execute(sql, params, many, context)
+            finally:
+                queries[0] += 1
+                queries[1] += time.perf_counter() - start
+
+        _local.ml_seconds = 0.0
+        start = time.perf_counter()
+        try:
+            with connection.execute_wrapper(record_query):
+                response = self.get_response(request)
+        finally:
+            ml_seconds, _local.ml_seconds = _local.ml_seconds, None
+        elapsed = time.perf_counter() - start
+
+        match = getattr(request, "resolver_match", None)
+        view = (match.url_name or match.view_name) if match else "unmatched"
+        registry.observe(view, request.method, response.status_code, elapsed, queries[0], queries[1], ml_seconds)
+        return response
+
+
+def metrics_view(request):
+    """Prometheus scrape endpoint; only METRICS_ALLOWED_IPS (or anyone with DEBUG) may read it."""
+    if not settings.DEBUG and request.META.get("REMOTE_ADDR") not in settings.METRICS_ALLOWED_IPS:
+        return HttpResponseForbidden()
+    return HttpResponse(render(), content_type="text/plain; version=0.0.4; charset=utf-8")
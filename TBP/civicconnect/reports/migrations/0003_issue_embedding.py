@@ -0,0 +1,21 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reports', '0002_badge_alter_issue_title_pointslog_userprofile'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='issue',
+            name='embedding',
+            field=models.BinaryField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='issue',
+            name='embedding_version',
+            field=models.CharField(blank=True, default='', max_length=64),
+        ),
+    ]
@@ -0,0 +1,32 @@
+from django.db import migrations, models
+
+
+def fill_geohash(apps, schema_editor):
+    from reports.geo import encode_geohash
+
+    Issue = apps.get_model('reports', 'Issue')
+    batch = []
+    for issue in Issue.objects.only('id', 'latitude', 'longitude').iterator(chunk_size=2000):
+        issue.geohash = encode_geohash(issue.latitude, issue.longitude)
+        batch.append(issue)
+        if len(batch) >= 2000:
+            Issue.objects.bulk_update(batch, ['geohash'])
+            batch = []
+    if batch:
+        Issue.objects.bulk_update(batch, ['geohash'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reports', '0003_issue_embedding'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='issue',
+            name='geohash',
+            field=models.CharField(blank=True, db_index=True, default='', editable=False, max_length=12),
+        ),
+        migrations.RunPython(fill_geohash, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,20 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reports', '0004_issue_geohash'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='issue',
+            name='priority_version',
+            field=models.CharField(blank=True, default='', max_length=64),
+        ),
+        migrations.AddIndex(
+            model_name='issue',
+            index=models.Index(fields=['-priority_score', '-report_count', '-id'], name='issue_dashboard_order_idx'),
+        ),
+    ]
@@ -0,0 +1,61 @@
+import math
+import re
+from collections import Counter
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+# A frozen copy of reports.text_index as of this migration: TfidfVectorizer's
+# default tokens, smooth idf and l2-normalised count / norm posting weights.
+TOKEN_PATTERN = re.compile(r"(?u)\b\w\w+\b")
+
+
+def term_counts(text):
+    return Counter(token[:64] for token in TOKEN_PATTERN.findall((text or "").lower()))
+
+
+def fill_postings(apps, schema_editor):
+    Issue = apps.get_model('reports', 'Issue')
+    IssueTerm = apps.get_model('reports', 'IssueTerm')
+    rows = Issue.objects.exclude(status='Solved').order_by('id').values_list('id', 'description')
+    df = Counter()
+    n = 0
+    for _, description in rows.iterator(chunk_size=2000):
+        df.update(term_counts(description).keys())
+        n += 1
+
+    batch = []
+    for issue_id, description in rows.iterator(chunk_size=2000):
+        counts = term_counts(description)
+        idfs = {term: math.log((1 + n) / (1 + df[term])) + 1 for term in counts}
+        norm = math.sqrt(sum((count * idfs[term]) ** 2 for term, count in counts.items()))
+        if not norm:
+            continue
+        batch.extend(IssueTerm(issue_id=issue_id, term=term, weight=count / norm) for term, count in counts.items())
+        if len(batch) >= 2000:
+            IssueTerm.objects.bulk_create(batch)
+            batch = []
+    IssueTerm.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reports', '0005_issue_priority_version'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IssueTerm',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(max_length=64)),
+                ('weight', models.FloatField()),
+                ('issue', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='terms', to='reports.issue')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('term', 'issue'), name='unique_issue_term')],
+            },
+        ),
+        migrations.RunPython(fill_postings, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,35 @@
+from django.db import migrations, models
+
+
+def fill_counts(apps, schema_editor):
+    Officer = apps.get_model('reports', 'Officer')
+    counts = (
+        apps.get_model('reports', 'Issue').objects.exclude(status='Solved').exclude(assigned_officer=None)
+        .values('assigned_officer').annotate(n=models.Count('id'))
+    )
+    for row in counts:
+        Officer.objects.filter(id=row['assigned_officer']).update(open_issue_count=row['n'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reports', '0008_scheduler'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='officer',
+            name='open_issue_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='officer',
+            index=models.Index(fields=['department', 'open_issue_count', 'id'], name='officer_dept_load_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='officer',
+            index=models.Index(fields=['open_issue_count', 'id'], name='officer_load_idx'),
+        ),
+        migrations.RunPython(fill_counts, migrations.RunPython.noop),
+    ]
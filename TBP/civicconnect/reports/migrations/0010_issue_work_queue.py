@@ -0,0 +1,42 @@
+from django.conf import settings
+from django.db import migrations, models
+
+
+def fill_queue_keys(apps, schema_editor):
+    Issue = apps.get_model('reports', 'Issue')
+    rate = settings.WORK_QUEUE_AGING_PER_DAY
+    batch = []
+    for issue in Issue.objects.only('id', 'created_at', 'priority_score').iterator(chunk_size=2000):
+        issue.created_day = issue.created_at.timestamp() / 86400.0
+        issue.queue_key = issue.priority_score - rate * issue.created_day
+        batch.append(issue)
+        if len(batch) >= 2000:
+            Issue.objects.bulk_update(batch, ['created_day', 'queue_key'])
+            batch = []
+    if batch:
+        Issue.objects.bulk_update(batch, ['created_day', 'queue_key'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reports', '0009_officer_open_issue_count'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='issue',
+            name='created_day',
+            field=models.FloatField(default=0.0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='issue',
+            name='queue_key',
+            field=models.FloatField(default=0.0, editable=False),
+        ),
+        migrations.RunPython(fill_queue_keys, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='issue',
+            index=models.Index(condition=models.Q(('status', 'Solved'), _negated=True), fields=['assigned_officer', '-queue_key', '-id'], name='officer_queue_idx'),
+        ),
+    ]
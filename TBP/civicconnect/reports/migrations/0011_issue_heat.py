@@ -0,0 +1,48 @@
+from itertools import groupby
+
+import numpy as np
+from django.conf import settings
+from django.db import migrations, models
+
+
+def fill_heat(apps, schema_editor):
+    # heat_key = log2(sum(2 ** (reported_at / half_life))) per issue, as reports/trending.py
+    # defines it when this migration was written; issues without reports keep the 0.0 default.
+    Issue = apps.get_model('reports', 'Issue')
+    ReportedUser = apps.get_model('reports', 'ReportedUser')
+    half_life_seconds = settings.TRENDING_HALF_LIFE_HOURS * 3600.0
+    rows = ReportedUser.objects.order_by('issue_id').values_list('issue_id', 'reported_at')
+    batch = []
+    for issue_id, reports in groupby(rows.iterator(chunk_size=2000), key=lambda row: row[0]):
+        times = [reported_at for _, reported_at in reports]
+        heat_key = float(np.logaddexp2.reduce([when.timestamp() / half_life_seconds for when in times]))
+        batch.append(Issue(id=issue_id, heat_key=heat_key, heat_updated_at=max(times)))
+        if len(batch) >= 2000:
+            Issue.objects.bulk_update(batch, ['heat_key', 'heat_updated_at'])
+            batch = []
+    Issue.objects.bulk_update(batch, ['heat_key', 'heat_updated_at'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reports', '0010_issue_work_queue'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='issue',
+            name='heat_key',
+            field=models.FloatField(default=0.0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='issue',
+            name='heat_updated_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.RunPython(fill_heat, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='issue',
+            index=models.Index(fields=['-heat_key', '-id'], name='issue_heat_idx'),
+        ),
+    ]
@@ -0,0 +1,61 @@
+import hashlib
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def fill_description_hashes(apps, schema_editor):
+    Issue = apps.get_model('reports', 'Issue')
+    batch = []
+    for issue in Issue.objects.only('id', 'description').iterator(chunk_size=2000):
+        issue.description_hash = hashlib.blake2b(issue.description.encode(), digest_size=16).hexdigest()
+        batch.append(issue)
+        if len(batch) >= 2000:
+            Issue.objects.bulk_update(batch, ['description_hash'])
+            batch = []
+    if batch:
+        Issue.objects.bulk_update(batch, ['description_hash'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('reports', '0011_issue_heat'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='issue',
+            name='description_hash',
+            field=models.CharField(blank=True, editable=False, max_length=32, null=True),
+        ),
+        migrations.RunPython(fill_description_hashes, migrations.RunPython.noop),
+        migrations.RemoveConstraint(
+            model_name='issue',
+            name='unique_issue_location',
+        ),
+        migrations.AddConstraint(
+            model_name='issue',
+            constraint=models.UniqueConstraint(fields=('description_hash', 'latitude', 'longitude'), name='unique_issue_location'),
+        ),
+        migrations.AddIndex(
+            model_name='issue',
+            index=models.Index(fields=['user', '-created_at', '-id'], name='issue_user_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='issue',
+            index=models.Index(fields=['assigned_officer', 'status'], name='issue_officer_status_idx'),
+        ),
+        migrations.AlterField(
+            model_name='issue',
+            name='user',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AlterField(
+            model_name='issue',
+            name='assigned_officer',
+            field=models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.SET_NULL, to='reports.officer'),
+        ),
+    ]
@@ -0,0 +1,37 @@
+import hashlib
+
+from django.db import migrations
+import reports.models
+
+
+def fill_missing_description_hashes(apps, schema_editor):
+    # Rows bulk-inserted without a hash since 0012 filled the column.
+    Issue = apps.get_model('reports', 'Issue')
+    batch = []
+    for issue in Issue.objects.filter(description_hash__isnull=True).only('id', 'description').iterator(chunk_size=2000):
+        issue.description_hash = hashlib.blake2b(issue.description.encode(), digest_size=16).hexdigest()
+        batch.append(issue)
+        if len(batch) >= 2000:
+            Issue.objects.bulk_update(batch, ['description_hash'])
+            batch = []
+    if batch:
+        Issue.objects.bulk_update(batch, ['description_hash'])
+
+
+class Migration(migrations.Migration):
+    # The backfill commits before the ALTER TABLE: PostgreSQL refuses to alter a
+    # table with pending trigger events from updates in the same transaction.
+    atomic = False
+
+    dependencies = [
+        ('reports', '0012_issue_description_hash'),
+    ]
+
+    operations = [
+        migrations.RunPython(fill_missing_description_hashes, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='issue',
+            name='description_hash',
+            field=reports.models.DescriptionHashField(editable=False, max_length=32),
+        ),
+    ]
@@ -0,0 +1,190 @@
+"""Content-keyed cache for model outputs (severity classes, sentence embeddings).
+
+Keys are a hash of the normalised text plus the producing model's version,
+so identical reports share one result and a retrained/replaced model never
+sees entries computed by its predecessor. Lookups go to a bounded
+in-process LRU first, then to an optional shared tier configured by
+ML_CACHE_SHARED:
+
+    None                      no shared tier
+    "django" / "django:alias" a Django cache backend (default alias if omitted)
+    "file:/path/cache.sqlite3" a local SQLite file shared by all workers
+"""
+import hashlib
+import os
+import pickle
+import re
+import sqlite3
+import threading
+import unicodedata
+from collections import OrderedDict
+
+from django.conf import settings
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_text(text):
+    return _WHITESPACE.sub(" ", unicodedata.normalize("NFKC", text)).strip().casefold()
+
+
+class DjangoCacheTier:
+    def __init__(self, alias="default"):
+        from django.core.cache import caches
+
+        self.cache = caches[alias]
+
+    def get_many(self, keys):
+        return self.cache.get_many(keys)
+
+    def set_many(self, mapping):
+        self.cache.set_many(mapping, timeout=None)
+
+
+class FileCacheTier:
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+
+    def _connection(self):
+        # One connection per thread and per process (connections can't cross fork()).
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("CREATE TABLE IF NOT EXISTS ml_cache (key TEXT PRIMARY KEY, value BLOB)")
+            self._local.conn, self._local.pid = conn, os.getpid()
+        return conn
+
+    def get_many(self, keys):
+        if not keys:
+            return {}
+        placeholders = ",".join("?" * len(keys))
+        rows = self._connection().execute(f"SELECT key, value FROM ml_cache WHERE key IN ({placeholders})", keys)
+        return {key: pickle.loads(value) for key, value in rows}
+
+    def set_many(self, mapping):
+        self._connection().executemany(
+            "INSERT OR REPLACE INTO ml_cache (key, value) VALUES (?, ?)",
+            [(key, pickle.dumps(value)) for key, value in mapping.items()],
+        )
+
+
+def shared_tier_from_settings():
+    spec = getattr(settings, "ML_CACHE_SHARED", None)
+    if not spec:
+        return None
+    kind, _, arg = spec.partition(":")
+    if kind == "django":
+        return DjangoCacheTier(arg or "default")
+    if kind == "file":
+        return FileCacheTier(arg)
+    raise ValueError(f"Unknown ML_CACHE_SHARED backend: {spec!r}")
+
+
+class MLCache:
+    def __init__(self, namespace, max_entries=10000, shared=None):
+        self.namespace = namespace
+        self.max_entries = max_entries
+        self.shared = shared
+        self.hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._version = None
+        self._lock = threading.Lock()
+
+    def make_key(self, text, version):
+        digest = hashlib.sha256(normalize_text(text).encode()).hexdigest()
+        return f"ml:{self.namespace}:{version}:{digest}"
+
+    def _check_version(self, version):
+        # A new model version makes every local entry unreachable; drop them at once.
+        if version != self._version:
+            self._entries.clear()
+            self._version = version
+
+    def _remember(self, key, value):
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def get_or_compute(self, texts, version, compute):
+        """Returns one value per text, calling compute(list_of_texts) only for misses.
+
+        Texts that normalise to the same key are computed once per call.
+        """
+        texts = list(texts)
+        keys = [self.make_key(text, version) for text in texts]
+        results = [None] * len(texts)
+        missing = OrderedDict()
+
+        with self._lock:
+            self._check_version(version)
+            for i, key in enumerate(keys):
+                if key in self._entries:
+                    self._entries.move_to_end(key)
+                    results[i] = self._entries[key]
+                    self.hits += 1
+                else:
+                    missing.setdefault(key, []).append(i)
+
+        if missing and self.shared is not None:
+            found = self.shared.get_many(list(missing))
+            with self._lock:
+                for key, value in found.items():
+                    for i in missing.pop(key):
+                        results[i] = value
+                        self.shared_hits += 1
+                    self._remember(key, value)
+
+        if missing:
+            miss_keys = list(missing)
+            values = compute([texts[missing[key][0]] for key in miss_keys])
+            computed = dict(zip(miss_keys, values))
+            with self._lock:
+                for key, value in computed.items():
+                    for i in missing[key]:
+                        results[i] = value
+                        self.misses += 1
+                    self._remember(key, value)
+            if self.shared is not None:
+                self.shared.set_many(computed)
+        return results
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "shared_hits": self.shared_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+def get_cache(namespace):
+    with _caches_lock:
+        if namespace not in _caches:
+            _caches[namespace] = MLCache(
+                namespace,
+                max_entries=settings.ML_CACHE_MAX_ENTRIES,
+                shared=shared_tier_from_settings(),
+            )
+        return _caches[namespace]
+
+
+def stats():
+    """Hit/miss/eviction counters for every cache in this process."""
+    return {namespace: cache.stats() for namespace, cache in _caches.items()}
@@ -0,0 +1,321 @@
+"""Versioned on-disk artifacts for the severity model.
+
+Each trained model lives in its own directory under
+civicconnect_ai/models/severity/<version>/:
+
+    booster.ubj      XGBoost's native (UBJSON) booster
+    trees.npz        the same trees compiled to flat node arrays (see tree_ensemble.py)
+    vocabulary.npy   TF-IDF terms, row i is feature column i
+    idf.npy          float64 idf weights, one per term
+    manifest.json    vectorizer settings, class labels, metadata and a sha256 per file
+
+The .npy files are memory-mapped on load. Transforming text needs neither
+scikit-learn nor unpickling, scoring it needs only NumPy unless the xgboost
+evaluator is asked for, and every artifact has a version that can be
+checked. A `CURRENT` file next to the version directories names the active
+version. Rewriting it (see set_current) is how a new model goes live: running
+workers pick it up on their next check without a restart.
+"""
+import hashlib
+import importlib.util
+import json
+import os
+import re
+import shutil
+import tempfile
+import time
+from collections import Counter
+
+import numpy as np
+
+from .tree_ensemble import CompiledEnsemble, UnsupportedModel, compile_booster
+
+REGISTRY_DIR = os.path.join(os.path.dirname(__file__), '../civicconnect_ai/models')
+SEVERITY = "severity"
+FORMAT_VERSION = 1
+
+BOOSTER_FILE = "booster.ubj"
+TREES_FILE = "trees.npz"
+VOCABULARY_FILE = "vocabulary.npy"
+IDF_FILE = "idf.npy"
+MANIFEST_FILE = "manifest.json"
+CURRENT_FILE = "CURRENT"
+
+
+class ArtifactError(Exception):
+    pass
+
+
+def _sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def model_dir(name=SEVERITY, root=None):
+    return os.path.join(root or REGISTRY_DIR, name)
+
+
+class TfidfFeatures:
+    """A scikit-learn-free TfidfVectorizer.transform() for word unigrams/n-grams.
+
+    Produces the same float64 CSR matrix as the fitted vectorizer it was exported from.
+    """
+
+    def __init__(self, terms, idf, params):
+        self.terms = terms
+        self.idf = idf
+        self.vocabulary = {term: i for i, term in enumerate(terms.tolist())}
+        self.lowercase = params["lowercase"]
+        self.token_pattern = re.compile(params["token_pattern"])
+        self.stop_words = frozenset(params["stop_words"] or ())
+        self.ngram_range = tuple(params["ngram_range"])
+        self.norm = params["norm"]
+        self.sublinear_tf = params["sublinear_tf"]
+        self.use_idf = params["use_idf"]
+
+    @classmethod
+    def export_params(cls, vectorizer):
+        """The settings of a fitted sklearn TfidfVectorizer that transform() needs."""
+        unsupported = {
+            "analyzer": vectorizer.analyzer != "word",
+            "tokenizer": vectorizer.tokenizer is not None,
+            "preprocessor": vectorizer.preprocessor is not None,
+            "strip_accents": vectorizer.strip_accents is not None,
+            "binary": vectorizer.binary,
+        }
+        if any(unsupported.values()):
+            raise ArtifactError(f"Unsupported vectorizer settings: {[k for k, v in unsupported.items() if v]}")
+        stop_words = vectorizer.get_stop_words()
+        return {
+            "lowercase": vectorizer.lowercase,
+            "token_pattern": vectorizer.token_pattern,
+            "stop_words": sorted(stop_words) if stop_words else [],
+            "ngram_range": list(vectorizer.ngram_range),
+            "norm": vectorizer.norm,
+            "sublinear_tf": vectorizer.sublinear_tf,
+            "use_idf": vectorizer.use_idf,
+        }
+
+    def analyze(self, text):
+        if self.lowercase:
+            text = text.lower()
+        tokens = [t for t in self.token_pattern.findall(text) if t not in self.stop_words]
+        low, high = self.ngram_range
+        if high == 1:
+            return tokens
+        grams = list(tokens) if low == 1 else []
+        for n in range(max(low, 2), high + 1):
+            grams.extend(" ".join(tokens[i:i + n]) for i in range(len(tokens) - n + 1))
+        return grams
+
+    def transform(self, texts):
+        """The TF-IDF matrix of `texts` as a scipy CSR matrix."""
+        from scipy.sparse import csr_matrix
+
+        indptr, indices, data = self.transform_arrays(texts)
+        return csr_matrix((data, indices, indptr), shape=(len(indptr) - 1, len(self.terms)))
+
+    def transform_arrays(self, texts):
+        """The TF-IDF matrix of `texts` as raw CSR (indptr, indices, data) arrays."""
+        indptr, indices, data = [0], [], []
+        for text in texts:
+            counts = Counter(self.vocabulary[t] for t in self.analyze(text) if t in self.vocabulary)
+            columns = sorted(counts)
+            values = np.array([counts[c] for c in columns], dtype=np.float64)
+            if self.sublinear_tf and len(values):
+                values = np.log(values) + 1
+            if self.use_idf and len(values):
+                values *= self.idf[columns]
+            if self.norm == "l2" and len(values):
+                # Accumulate left to right like sklearn's row normaliser, so features match bit for bit.
+                total = 0.0
+                for value in values.tolist():
+                    total += value * value
+                values /= np.sqrt(total) or 1.0
+            elif self.norm == "l1" and len(values):
+                values /= np.abs(values).sum() or 1.0
+            indices.extend(columns)
+            data.extend(values.tolist())
+            indptr.append(len(indices))
+        return np.array(indptr, dtype=np.int64), np.array(indices, dtype=np.int32), np.array(data, dtype=np.float64)
+
+
+class SeverityModel:
+    """A loaded severity artifact: text in, model classes out.
+
+    Predictions come from the compiled NumPy ensemble when the artifact has
+    one. Its per-call cost is a fraction of xgboost's, but xgboost's C++ loop
+    wins on throughput, so batches of `booster_min_rows` or more go to the
+    booster when xgboost is installed. Both give identical results, and the
+    booster is only loaded once it is actually used.
+    """
+
+    def __init__(self, path, manifest, features, ensemble=None, booster_min_rows=None):
+        self.path = path
+        self.manifest = manifest
+        self.features = features
+        self.ensemble = ensemble
+        self.booster_min_rows = booster_min_rows
+        self.classes = np.asarray(manifest["classes"])
+        self._booster = None
+
+    @property
+    def version(self):
+        return self.manifest["version"]
+
+    @property
+    def evaluator(self):
+        return "compiled" if self.ensemble is not None else "xgboost"
+
+    @property
+    def booster(self):
+        if self._booster is None:
+            import xgboost as xgb
+
+            booster = xgb.Booster()
+            booster.load_model(os.path.join(self.path, BOOSTER_FILE))
+            if booster.num_features() != self.manifest["num_features"]:
+                raise ArtifactError(f"{self.path}: booster expects {booster.num_features()} features, "
+                                    f"vocabulary has {self.manifest['num_features']}")
+            self._booster = booster
+        return self._booster
+
+    def predict(self, descriptions):
+        descriptions = list(descriptions)
+        if self.ensemble is None or (
+            self.booster_min_rows is not None and len(descriptions) >= self.booster_min_rows
+            and importlib.util.find_spec("xgboost") is not None
+        ):
+            return self.predict_xgboost(descriptions)
+        return self.predict_compiled(descriptions)
+
+    def predict_compiled(self, descriptions):
+        return self.classes[self.ensemble.predict_sparse(*self.features.transform_arrays(descriptions))]
+
+    def predict_xgboost(self, descriptions):
+        import xgboost as xgb
+
+        X = self.features.transform(list(descriptions))
+        output = self.booster.predict(xgb.DMatrix(X))
+        # multi:softmax predicts the class index directly (as a float); multi:softprob one column per class.
+        index = np.argmax(output, axis=1) if output.ndim == 2 else output.astype(np.int64)
+        return self.classes[index]
+
+
+def write_severity_artifact(booster, vectorizer, classes=(0, 1, 2), metadata=None, root=None, activate=True):
+    """Writes a fitted booster + TfidfVectorizer as a new version and returns its name.
+
+    The directory is assembled under a temporary name and renamed into place,
+    so a half-written version is never visible to loaders.
+    """
+    base = model_dir(SEVERITY, root)
+    os.makedirs(base, exist_ok=True)
+    staging = tempfile.mkdtemp(prefix=".staging-", dir=base)
+    try:
+        booster.save_model(os.path.join(staging, BOOSTER_FILE))
+        try:
+            np.savez(os.path.join(staging, TREES_FILE), **compile_booster(booster))
+        except UnsupportedModel:
+            pass  # Served through xgboost instead
+        vocabulary = vectorizer.vocabulary_
+        terms = sorted(vocabulary, key=vocabulary.get)
+        np.save(os.path.join(staging, VOCABULARY_FILE), np.array(terms, dtype=str))
+        np.save(os.path.join(staging, IDF_FILE), np.asarray(vectorizer.idf_, dtype=np.float64))
+
+        files = {name: _sha256(os.path.join(staging, name)) for name in sorted(os.listdir(staging))}
+        combined = hashlib.sha256("".join(files[name] for name in sorted(files)).encode()).hexdigest()
+        version = f"{time.strftime('%Y%m%d-%H%M%S')}-{combined[:8]}"
+        manifest = {
+            "name": SEVERITY,
+            "version": version,
+            "format": FORMAT_VERSION,
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "classes": [int(c) for c in classes],
+            "num_features": len(terms),
+            "vectorizer": TfidfFeatures.export_params(vectorizer),
+            "files": files,
+            "metadata": metadata or {},
+        }
+        with open(os.path.join(staging, MANIFEST_FILE), "w") as f:
+            json.dump(manifest, f, indent=2)
+        os.chmod(staging, 0o755)
+        target = os.path.join(base, version)
+        if os.path.isdir(target) and read_manifest(version, SEVERITY, root)["files"] == files:
+            shutil.rmtree(staging)  # The same model saved twice within a second
+        else:
+            os.rename(staging, target)
+    except BaseException:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+    if activate:
+        set_current(version, root=root)
+    return version
+
+
+def list_versions(name=SEVERITY, root=None):
+    base = model_dir(name, root)
+    if not os.path.isdir(base):
+        return []
+    return sorted(
+        entry for entry in os.listdir(base)
+        if not entry.startswith(".") and os.path.isfile(os.path.join(base, entry, MANIFEST_FILE))
+    )
+
+
+def current_version(name=SEVERITY, root=None):
+    try:
+        with open(os.path.join(model_dir(name, root), CURRENT_FILE)) as f:
+            return f.read().strip()
+    except FileNotFoundError:
+        raise ArtifactError(f"No active {name} model; train one or run `manage.py severity_model --convert`.") from None
+
+
+def set_current(version, name=SEVERITY, root=None):
+    """Atomically points CURRENT at `version`; running processes switch on their next check."""
+    base = model_dir(name, root)
+    if version not in list_versions(name, root):
+        raise ArtifactError(f"Unknown {name} model version {version!r}")
+    fd, tmp = tempfile.mkstemp(prefix=".current-", dir=base)
+    with os.fdopen(fd, "w") as f:
+        f.write(version + "\n")
+    os.chmod(tmp, 0o644)
+    os.replace(tmp, os.path.join(base, CURRENT_FILE))
+
+
+def read_manifest(version, name=SEVERITY, root=None):
+    with open(os.path.join(model_dir(name, root), version, MANIFEST_FILE)) as f:
+        return json.load(f)
+
+
+def load_severity_model(version=None, root=None, verify=True, evaluator="compiled", booster_min_rows=None):
+    """Loads one version (the CURRENT one by default), checking file checksums first.
+
+    evaluator="compiled" uses the artifact's NumPy trees when it has them (see
+    SeverityModel for booster_min_rows); "xgboost" always predicts through the
+    native booster.
+    """
+    version = version or current_version(SEVERITY, root)
+    path = os.path.join(model_dir(SEVERITY, root), version)
+    manifest = read_manifest(version, SEVERITY, root)
+    if manifest.get("format") != FORMAT_VERSION:
+        raise ArtifactError(f"{path}: unsupported artifact format {manifest.get('format')!r}")
+    if verify:
+        for name, checksum in manifest["files"].items():
+            if _sha256(os.path.join(path, name)) != checksum:
+                raise ArtifactError(f"{path}/{name}: checksum mismatch")
+
+    terms = np.load(os.path.join(path, VOCABULARY_FILE), mmap_mode="r")
+    idf = np.load(os.path.join(path, IDF_FILE), mmap_mode="r")
+    features = TfidfFeatures(terms, idf, manifest["vectorizer"])
+    ensemble = None
+    if evaluator == "compiled" and TREES_FILE in manifest["files"]:
+        ensemble = CompiledEnsemble.load(os.path.join(path, TREES_FILE))
+        if ensemble.num_feature != len(terms):
+            raise ArtifactError(f"{path}: trees expect {ensemble.num_feature} features, vocabulary has {len(terms)}")
+    model = SeverityModel(path, manifest, features, ensemble, booster_min_rows)
+    if ensemble is None:
+        model.booster  # Load (and validate) the booster now rather than on the first request
+    return model
@@ -1,57 +1,70 @@
+from django.conf import settings
 from django.db import models
 from django.contrib.auth import get_user_model
-from django.db.models import F, Q
-import math
-from sentence_transformers import util
-import pickle
-import os
+from django.db.models import F
+from django.db.models.functions import Now
+from django.utils import timezone
+import hashlib
+import threading
+import time
+
+from . import assignment, embeddings, model_registry, scoring, work_queue
+from .dedup import find_duplicate, find_duplicate_cascade, index_candidates, local_candidates
+from .geo import encode_geohash
+from .embeddings import get_model  # noqa: F401 (re-exported for existing callers)
 
 User = get_user_model()
 
-_model = None  # Cache for SentenceTransformer
-_ml_model = None  # Cache for ML severity model
-_vectorizer = None  # Cache for TF-IDF vectorizer
+MODEL_CHECK_INTERVAL = 2.0  # Seconds between checks of the registry's CURRENT pointer
 
-
-def get_model():
-    global _model
-    if _model is None:
-        from sentence_transformers import SentenceTransformer
-        _model = SentenceTransformer('all-MiniLM-L6-v2')
-    return _model
+_severity_model = None  # Loaded model_registry.SeverityModel
+_severity_checked_at = 0.0
+_severity_lock = threading.Lock()
 
 
 def get_severity_model():
-    global _ml_model, _vectorizer
-    if _ml_model is None or _vectorizer is None:
-        base_path = os.path.join(os.path.dirname(__file__), '../civicconnect_ai')
-        with open(os.path.join(base_path, "ai_severity_model.pkl"), "rb") as f:
-            _ml_model = pickle.load(f)
-        with open(os.path.join(base_path, "tfidf_vectorizer.pkl"), "rb") as f:
-            _vectorizer = pickle.load(f)
-    return _ml_model, _vectorizer
+    """Returns the active severity model, switching to a newly activated version without a restart."""
+    global _severity_model, _severity_checked_at
+    now = time.monotonic()
+    if _severity_model is not None and now - _severity_checked_at < MODEL_CHECK_INTERVAL:
+        return _severity_model
+    with _severity_lock:
+        _severity_checked_at = now
+        version = model_registry.current_version()
+        if _severity_model is None or _severity_model.version != version:
+            _severity_model = model_registry.load_severity_model(
+                version,
+                evaluator=settings.SEVERITY_EVALUATOR,
+                booster_min_rows=settings.SEVERITY_BOOSTER_MIN_ROWS,
+            )
+    return _severity_model
+
+
+def severity_model_version():
+    """Version of the active severity model, so scores from a retrained model are detectable."""
+    return get_severity_model().version
 
 
 def compute_severity(description, is_urgent=False):
-    emergency_keywords = [
-        "fire", "flood", "gas leak", "earthquake", "emergency", "explosion",
-        "collapsed", "accident", "hazard", "toxic", "fatal", "ambulance"
-    ]
+    return int(scoring.severity_many([description], urgent=[is_urgent])[0])
 
-    lowered = description.lower()
 
-    if is_urgent or any(word in lowered for word in emergency_keywords):
-        print(f"Emergency detected in description: {description}")
-        return 3  # High severity for emergencies
+def description_hash(description):
+    """The key unique_issue_location compares descriptions by: 128 bits, 32 characters however long the text."""
+    return hashlib.blake2b(description.encode(), digest_size=16).hexdigest()
 
-    model, vectorizer = get_severity_model()
-    X = vectorizer.transform([description])
-    prediction = model.predict(X)[0]
 
-    print(f"Severity predicted by model: {prediction}")
+class DescriptionHashField(models.CharField):
+    """Holds description_hash(description), recomputed whenever the row is written, bulk_create included.
 
-    severity_map = {0: 1, 1: 2, 2: 3}
-    return severity_map.get(prediction, 1)
+    Like auto_now, the value comes from pre_save(), so no insert path can
+    leave the column empty or out of step with the description.
+    """
+
+    def pre_save(self, model_instance, add):
+        value = description_hash(model_instance.description)
+        setattr(model_instance, self.attname, value)
+        return value
 
 
 class Officer(models.Model):
@@ -59,17 +72,27 @@ class Officer(models.Model):
     name = models.CharField(max_length=255)
     department = models.CharField(max_length=255)
     contact_number = models.CharField(max_length=20, null=True, blank=True)
+    # Unsolved issues assigned to this officer; kept current by Issue.save() (see reports.assignment).
+    open_issue_count = models.IntegerField(default=0)
+
+    class Meta:
+        indexes = [
+            # Least-loaded officer of a department: one seek to the head of this index.
+            models.Index(fields=['department', 'open_issue_count', 'id'], name='officer_dept_load_idx'),
+            models.Index(fields=['open_issue_count', 'id'], name='officer_load_idx'),
+        ]
 
     def __str__(self):
         return self.name
 
 
 class Issue(models.Model):
-    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, db_index=False)  # Leads issue_user_created_idx
     username = models.CharField(max_length=150)
     email = models.EmailField()
     title = models.CharField(max_length=255, default="Untitled Issue", blank=True)
     description = models.TextField()
+    description_hash = DescriptionHashField(max_length=32, editable=False)
 
     status = models.CharField(
         max_length=20,
@@ -79,94 +102,271 @@ class Issue(models.Model):
     location_name = models.CharField(max_length=255)
     latitude = models.FloatField()
     longitude = models.FloatField()
+    geohash = models.CharField(max_length=12, db_index=True, blank=True, default="", editable=False)
     image = models.ImageField(upload_to="issue_images/", null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    # Bumped by every save(), so the scheduler can pick up only issues changed since its last run.
+    # Bulk writes that don't go through save() (e.g. scoring.reprioritize) leave it alone.
+    updated_at = models.DateTimeField(auto_now=True, db_default=Now(), db_index=True)
 
     report_count = models.IntegerField(default=1)
     severity = models.IntegerField(default=1)
     priority_score = models.FloatField(default=0.0)
     priority = models.IntegerField(default=0)
-
-    assigned_officer = models.ForeignKey('Officer', on_delete=models.SET_NULL, null=True, blank=True)
+    # Severity model and formula that produced severity/priority (see
+    # reports.scoring); stale rows are re-scored by `manage.py refresh_priorities`.
+    priority_version = models.CharField(max_length=64, blank=True, default="")
+    # Officers' work queue order (see reports.work_queue): created_at in days since the
+    # epoch, fixed at insert, and priority_score less the aging credit for that day.
+    created_day = models.FloatField(default=0.0, editable=False)
+    queue_key = models.FloatField(default=0.0, editable=False)
+    # Trending order (see reports.trending): log2 of the reports' time-decayed count, less the
+    # decay every issue shares, moved only by SQL updates; and when it last moved.
+    heat_key = models.FloatField(default=0.0, editable=False)
+    heat_updated_at = models.DateTimeField(null=True, blank=True, editable=False)
+
+    # Leads issue_officer_status_idx (and officer_queue_idx over open issues)
+    assigned_officer = models.ForeignKey('Officer', on_delete=models.SET_NULL, null=True, blank=True, db_index=False)
     progress_percentage = models.IntegerField(default=0)
     work_images = models.ImageField(upload_to='work_images/', null=True, blank=True)
 
+    # Unit-length sentence embedding of `description`, tagged with the model
+    # that produced it so stale vectors can be detected and re-encoded.
+    embedding = models.BinaryField(null=True, blank=True, editable=False)
+    embedding_version = models.CharField(max_length=64, blank=True, default="")
+
+    PRIORITY_FIELDS = tuple(scoring.SCORED_FIELDS)
+    HEAT_FIELDS = ("heat_key", "heat_updated_at")
+
     class Meta:
+        indexes = [
+            # Authority dashboard: ORDER BY priority_score DESC, report_count DESC, id DESC
+            models.Index(fields=['-priority_score', '-report_count', '-id'], name='issue_dashboard_order_idx'),
+            # Officer work queue: WHERE assigned_officer_id = ? AND NOT status = 'Solved' ORDER BY queue_key DESC, id DESC
+            models.Index(fields=['assigned_officer', '-queue_key', '-id'], condition=~models.Q(status='Solved'),
+                         name='officer_queue_idx'),
+            # Trending: ORDER BY heat_key DESC, id DESC
+            models.Index(fields=['-heat_key', '-id'], name='issue_heat_idx'),
+            # A citizen's issues (issue_list_api): WHERE user_id = ? ORDER BY created_at DESC, id DESC
+            models.Index(fields=['user', '-created_at', '-id'], name='issue_user_created_idx'),
+            # Officer load (assignment.recount) and per-status counts: WHERE assigned_officer_id = ? AND status ...
+            models.Index(fields=['assigned_officer', 'status'], name='issue_officer_status_idx'),
+        ]
         constraints = [
-            models.UniqueConstraint(fields=['description', 'latitude', 'longitude'], name='unique_issue_location')
+            models.UniqueConstraint(fields=['description_hash', 'latitude', 'longitude'],
+                                    name='unique_issue_location')
         ]
 
     def __str__(self):
         return f"Issue by {self.username} at {self.location_name} (Severity: {self.severity}, Priority: {self.priority})"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the loaded description so save() can tell when it was edited,
+        # and whose workload counter the issue adds to.
+        instance._loaded_description = instance.__dict__.get("description")
+        if "status" in instance.__dict__ and "assigned_officer_id" in instance.__dict__:
+            instance._loaded_load = assignment.open_load(instance.assigned_officer_id, instance.status)
+        return instance
+
+    def _description_edited(self):
+        loaded = getattr(self, "_loaded_description", None)
+        return not self._state.adding and loaded is not None and loaded != self.description
+
+    def _embedding_is_stale(self):
+        if not self.embedding or self.embedding_version != embeddings.embedding_version():
+            return True
+        return self._description_edited()
+
+    def refresh_embedding(self):
+        self.embedding = embeddings.to_bytes(embeddings.encode(self.description))
+        self.embedding_version = embeddings.embedding_version()
+
+    def get_embedding(self):
+        """Returns the stored embedding, encoding (and persisting) it only if missing or stale."""
+        if self._embedding_is_stale():
+            self.refresh_embedding()
+            if self.pk:
+                # updated_at tells other processes' vector indexes to pick the new vector up.
+                Issue.objects.filter(pk=self.pk).update(
+                    embedding=self.embedding, embedding_version=self.embedding_version, updated_at=timezone.now()
+                )
+                self._loaded_description = self.description
+        return embeddings.from_bytes(self.embedding)
+
     def save(self, *args, **kwargs):
-        if not self.assigned_officer and self.priority == 3:
-            officer = Officer.objects.order_by("?").first()
+        update_fields = kwargs.get("update_fields")
+        extra_fields = set()
+        touches_description = update_fields is None or "description" in update_fields
+        if self._state.adding and not self.created_day:
+            self.created_day = work_queue.day_number(timezone.now())
+            extra_fields.add("created_day")
+
+        # Priority only depends on the description and report count, so it is
+        # recomputed here when the description is new or edited, and by
+        # update_priority() when a report is added -- never on read.
+        if touches_description and (self._state.adding or self._description_edited()):
+            self.compute_priority()
+            extra_fields |= set(self.PRIORITY_FIELDS)
+
+        if not self.assigned_officer and self.priority == 3 and self.status != "Solved":
+            officer = assignment.pick_officer(self.description)
             if officer:
                 self.assigned_officer = officer
+                extra_fields.add("assigned_officer")
+
+        if touches_description:
+            extra_fields.add("description_hash")  # Recomputed by its field's pre_save()
+        if touches_description and self._embedding_is_stale():
+            self.refresh_embedding()
+            extra_fields |= {"embedding", "embedding_version"}
+        if update_fields is None or {"latitude", "longitude"} & set(update_fields):
+            self.geohash = encode_geohash(self.latitude, self.longitude)
+            extra_fields.add("geohash")
+        if update_fields is not None:
+            kwargs["update_fields"] = set(update_fields) | extra_fields | {"updated_at"}
+        elif not self._state.adding and not kwargs.get("force_insert"):
+            # Reports move the heat in SQL while this copy is held; don't write a stale one back.
+            skip = set(self.HEAT_FIELDS) | self.get_deferred_fields()
+            kwargs["update_fields"] = {field.name for field in self._meta.concrete_fields
+                                       if not field.primary_key and field.attname not in skip}
+        old_load = None if self._state.adding else getattr(self, "_loaded_load", False)
+        writes_load = update_fields is None or {"status", "assigned_officer"} & set(kwargs["update_fields"])
         super().save(*args, **kwargs)
+        self._loaded_description = self.description
 
-    def update_priority(self):
-        # Check if the issue is urgent (contains emergency keywords)
-        self.severity = compute_severity(self.description, is_urgent=True)
-
-        # Calculate priority score
-        score = (self.severity * 1.5) + math.log(self.report_count + 1)
-        self.priority_score = round(score, 2)
+        # Unknown old load (loaded without status/officer): `manage.py recount_officer_load` repairs.
+        if writes_load and old_load is not False:
+            new_load = assignment.open_load(self.assigned_officer_id, self.status)
+            assignment.move_load(old_load, new_load)
+            self._loaded_load = new_load
 
-        # Decide priority level
-        if self.severity == 3:
-            self.priority = 3
-        elif score >= 4:
-            self.priority = 2
-        else:
-            self.priority = 1
+    def compute_priority(self):
+        """Recomputes severity, priority and officer assignment in memory."""
+        scoring.score_issue(self)
 
         # Assign officer if needed
-        if self.priority == 3 and not self.assigned_officer:
-            self.assigned_officer = Officer.objects.order_by("?").first()
+        if self.priority == 3 and not self.assigned_officer and self.status != "Solved":
+            self.assigned_officer = assignment.pick_officer(self.description)
 
-        self.save(update_fields=["severity", "priority_score", "priority", "assigned_officer"])
+    def update_priority(self):
+        self.compute_priority()
+        self.save(update_fields=list(self.PRIORITY_FIELDS))
 
     def compute_description_similarity(self, other_description):
-        model = get_model()
-        emb_self = model.encode(self.description, convert_to_tensor=True)
-        emb_other = model.encode(other_description, convert_to_tensor=True)
-        return util.pytorch_cos_sim(emb_self, emb_other).item()
+        emb_other = embeddings.encode(other_description)
+        return float(self.get_embedding() @ emb_other)
 
     def report_issue(self, user):
         if ReportedUser.objects.filter(issue=self, user=user).exists():
             return False
 
-        similar_issues = Issue.objects.filter(
-            Q(location_name__icontains=self.location_name) |
-            (
-                Q(latitude__range=(self.latitude - 0.001, self.latitude + 0.001)) &
-                Q(longitude__range=(self.longitude - 0.001, self.longitude + 0.001))
-            )
-        )
-
-        model = get_model()
-        emb_self = model.encode(self.description, convert_to_tensor=True)
-
-        for issue in similar_issues:
-            emb_existing = model.encode(issue.description, convert_to_tensor=True)
-            similarity = util.pytorch_cos_sim(emb_self, emb_existing).item()
-            if similarity > 0.75:
-                issue.report_count = F('report_count') + 1
-                issue.save(update_fields=["report_count"])
-                issue.refresh_from_db()
-                ReportedUser.objects.create(issue=issue, user=user)
-                issue.update_priority()
-                return True
+        similar_issues = local_candidates(self.latitude, self.longitude)
+        issue, _ = find_duplicate_cascade(self.description, similar_issues, query=self.get_embedding, inclusive=False)
+        if issue is None:
+            emb_self = self.get_embedding()
+            extra = index_candidates(emb_self, self.latitude, self.longitude, exclude={i.id for i in similar_issues})
+            issue, _ = find_duplicate(emb_self, extra, inclusive=False)
+        if issue is not None:
+            issue.report_count = F('report_count') + 1
+            issue.save(update_fields=["report_count"])
+            issue.refresh_from_db()
+            ReportedUser.objects.create(issue=issue, user=user)
+            issue.update_priority()
+            return True
 
         self.report_count = 1
-        self.save()
+        self.save()  # Scores the new issue
         ReportedUser.objects.create(issue=self, user=user)
-        self.update_priority()
         return True
 
 
+class IssueTerm(models.Model):
+    """One posting of the persistent TF-IDF index (see reports.text_index)."""
+    issue = models.ForeignKey(Issue, on_delete=models.CASCADE, related_name='terms')
+    term = models.CharField(max_length=64)
+    weight = models.FloatField()  # Term count / the issue's TF-IDF norm when indexed
+
+    class Meta:
+        constraints = [
+            # Also the lookup index: queries read postings by term.
+            models.UniqueConstraint(fields=['term', 'issue'], name='unique_issue_term')
+        ]
+
+    def __str__(self):
+        return f"{self.term} -> issue {self.issue_id}"
+
+
+class Job(models.Model):
+    """A unit of background work, run by `manage.py run_jobs` (see reports.jobs)."""
+    QUEUED, RUNNING, DONE, FAILED = "queued", "running", "done", "failed"
+
+    kind = models.CharField(max_length=64)
+    payload = models.JSONField(default=dict)
+    status = models.CharField(
+        max_length=10,
+        choices=[(QUEUED, 'Queued'), (RUNNING, 'Running'), (DONE, 'Done'), (FAILED, 'Failed')],
+        default=QUEUED,
+    )
+    # Enqueuing again with the same key returns the existing job instead of adding one.
+    idempotency_key = models.CharField(max_length=128, unique=True, null=True, blank=True)
+    attempts = models.IntegerField(default=0)
+    max_attempts = models.IntegerField(default=5)
+    run_after = models.DateTimeField(default=timezone.now)
+    locked_by = models.CharField(max_length=128, blank=True, default="")
+    locked_at = models.DateTimeField(null=True, blank=True)
+    result = models.JSONField(null=True, blank=True)
+    error = models.TextField(blank=True, default="")
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # Workers: WHERE status = 'queued' AND run_after <= now ORDER BY run_after, id
+            models.Index(fields=['status', 'run_after', 'id'], name='job_queue_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} #{self.id} ({self.status})"
+
+
+class SchedulerLock(models.Model):
+    """A named lease that at most one scheduler process holds at a time (see reports.scheduler)."""
+    name = models.CharField(max_length=64, unique=True)
+    owner = models.CharField(max_length=128, blank=True, default="")
+    expires_at = models.DateTimeField()
+
+    def __str__(self):
+        return f"{self.name} held by {self.owner or 'nobody'} until {self.expires_at}"
+
+
+class ScheduledRun(models.Model):
+    """One run of a periodic job: how long it took, how many rows it handled, where it got to."""
+    RUNNING, OK, FAILED = "running", "ok", "failed"
+
+    job = models.CharField(max_length=64)
+    status = models.CharField(
+        max_length=10, choices=[(RUNNING, 'Running'), (OK, 'OK'), (FAILED, 'Failed')], default=RUNNING
+    )
+    started_at = models.DateTimeField()
+    finished_at = models.DateTimeField(null=True, blank=True)
+    duration_seconds = models.FloatField(null=True, blank=True)
+    rows = models.IntegerField(null=True, blank=True)
+    result = models.JSONField(null=True, blank=True)
+    error = models.TextField(blank=True, default="")
+    # Changes up to this instant are covered; the next run only looks at rows updated after it.
+    high_water_mark = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['job', 'status', '-started_at'], name='scheduled_run_job_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.job} at {self.started_at} ({self.status})"
+
+
 class ReportedUser(models.Model):
     issue = models.ForeignKey(Issue, on_delete=models.CASCADE, related_name='reported_user_entries')
     user = models.ForeignKey(User, on_delete=models.CASCADE)
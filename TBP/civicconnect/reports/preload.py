@@ -0,0 +1,45 @@
+"""Loads and warms every model in the current process so forked workers inherit it.
+
+With a pre-forking server (gunicorn --preload, uwsgi without lazy-apps) the
+master imports the app once and forks its workers. Loading MiniLM and the
+severity model there means every worker shares the same physical pages
+copy-on-write instead of paying the cold start on its first report and
+keeping a private copy.
+"""
+import gc
+import os
+import time
+
+WARMUP_TEXT = "Streetlight not working near the bus stop"
+
+
+def preload_models():
+    """Loads, warms and freezes the models; returns the seconds spent per step."""
+    from . import embeddings
+    from .models import get_severity_model
+
+    # The fast tokenizer's thread pool doesn't survive fork(); keep it off in workers.
+    os.environ.setdefault("TOKENIZERS_PARALLELISM", "false")
+
+    timings = {}
+    start = time.perf_counter()
+    model = get_severity_model()
+    model.predict([WARMUP_TEXT])
+    if model.ensemble is not None and model.booster_min_rows:
+        # Large batches go through xgboost: import and load it, but don't predict. That
+        # would start OpenMP threads, and OpenMP isn't safe to use across fork().
+        model.booster
+    timings["severity"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    # Straight to the model rather than encode(), which would cache the warm-up text.
+    embeddings.get_model().encode([WARMUP_TEXT], convert_to_numpy=True, normalize_embeddings=True)
+    embeddings.embedding_version()  # Hashes the weights once here rather than in every worker
+    timings["embedding"] = time.perf_counter() - start
+
+    # Move everything allocated so far out of the collector's generations. Otherwise
+    # the first full collection in each worker writes to every object header and
+    # un-shares the pages we just loaded.
+    gc.collect()
+    gc.freeze()
+    return timings
@@ -0,0 +1,154 @@
+"""Periodic jobs run by `manage.py run_scheduler`.
+
+Jobs are registered with @periodic(name, interval_seconds) (see cron.py).
+Each one is called with `since`, the high-water mark of its last successful
+run (None the first time), and returns a dict that includes "rows", the
+number of rows it handled. The new mark is taken *before* the job starts,
+so a row changed while a run is in progress is seen again by the next run
+instead of being missed.
+
+Only one scheduler does work at a time: each tick first takes the
+SchedulerLock row with a conditional UPDATE. That is a lease, renewed
+before every job, so a crashed scheduler's lock lapses after
+SCHEDULER_LOCK_SECONDS. A job that can outlast the lease calls heartbeat()
+between chunks, which renews it (at most every SCHEDULER_HEARTBEAT_SECONDS)
+and raises LeaseLost if another scheduler has taken over, ending the run
+as failed. Every run is recorded as a ScheduledRun, with its duration and
+row count.
+"""
+import threading
+import time
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError
+from django.db.models import Q
+from django.utils import timezone
+
+from .jobs import worker_name
+
+LOCK_NAME = "scheduler"
+
+_lease = threading.local()  # Owner and last renewal of the lease the running job holds
+
+
+class LeaseLost(Exception):
+    pass
+
+
+class PeriodicJob:
+    def __init__(self, name, interval, func):
+        self.name = name
+        self.interval = interval  # Seconds between the starts of two runs
+        self.func = func
+
+
+JOBS = {}
+
+
+def periodic(name, interval):
+    def register(func):
+        JOBS[name] = PeriodicJob(name, interval, func)
+        return func
+    return register
+
+
+def acquire_lock(owner, name=LOCK_NAME):
+    """Takes (or renews) the named lease for `owner`; False if another live owner holds it."""
+    from .models import SchedulerLock
+
+    now = timezone.now()
+    try:
+        SchedulerLock.objects.get_or_create(name=name, defaults={"expires_at": now})
+    except IntegrityError:  # Created concurrently; it exists now either way
+        pass
+    return bool(
+        SchedulerLock.objects.filter(Q(owner=owner) | Q(owner="") | Q(expires_at__lt=now), name=name)
+        .update(owner=owner, expires_at=now + timedelta(seconds=settings.SCHEDULER_LOCK_SECONDS))
+    )
+
+
+def release_lock(owner, name=LOCK_NAME):
+    from .models import SchedulerLock
+
+    SchedulerLock.objects.filter(name=name, owner=owner).update(owner="", expires_at=timezone.now())
+
+
+def heartbeat(*progress):
+    """Keeps the running job's lease alive; a no-op outside a scheduled run.
+
+    Takes (and ignores) any arguments, so it can be passed straight in as a
+    `progress` callback. Raises LeaseLost when the lease has gone to another
+    scheduler, so the job stops instead of running alongside its successor.
+    Called inside a transaction, the renewal keeps the lock row locked until
+    commit, so a scheduler trying to take over waits and then finds it renewed.
+    """
+    owner = getattr(_lease, "owner", None)
+    if owner is None or time.monotonic() - _lease.renewed < settings.SCHEDULER_HEARTBEAT_SECONDS:
+        return
+    if not acquire_lock(owner):
+        raise LeaseLost(f"{owner} lost the {LOCK_NAME} lease mid-run")
+    _lease.renewed = time.monotonic()
+
+
+def last_successful_run(name):
+    from .models import ScheduledRun
+
+    return ScheduledRun.objects.filter(job=name, status=ScheduledRun.OK).order_by("-started_at").first()
+
+
+def is_due(job, now=None):
+    from .models import ScheduledRun
+
+    last = ScheduledRun.objects.filter(job=job.name).order_by("-started_at").first()
+    now = now or timezone.now()
+    return last is None or (now - last.started_at).total_seconds() >= job.interval
+
+
+def run_job(job, owner=None):
+    """Runs one periodic job from its high-water mark and records the run.
+
+    `owner` is the lease holder the job's heartbeat() calls renew for.
+    """
+    from .models import ScheduledRun
+
+    last = last_successful_run(job.name)
+    since = last.high_water_mark if last else None
+    started_at = timezone.now()
+    run = ScheduledRun.objects.create(job=job.name, started_at=started_at)
+    start = time.perf_counter()
+    _lease.owner, _lease.renewed = owner, time.monotonic()
+    try:
+        result = job.func(since)
+    except Exception:
+        run.status = ScheduledRun.FAILED
+        run.error = traceback.format_exc()
+    else:
+        run.status = ScheduledRun.OK
+        run.result = result
+        run.rows = result.get("rows")
+        run.high_water_mark = started_at
+    finally:
+        _lease.owner = None
+    run.finished_at = timezone.now()
+    run.duration_seconds = time.perf_counter() - start
+    run.save()
+    return run
+
+
+def tick(owner=None, force=()):
+    """Runs every due job (and those named in `force`) if this process holds the lock.
+
+    Returns the ScheduledRuns made, or None when another scheduler holds the lock.
+    """
+    owner = owner or worker_name()
+    if not acquire_lock(owner):
+        return None
+    runs = []
+    for job in list(JOBS.values()):
+        if job.name in force or is_due(job):
+            if not acquire_lock(owner):  # Renew the lease; give up if it lapsed and was taken over
+                break
+            runs.append(run_job(job, owner))
+    return runs
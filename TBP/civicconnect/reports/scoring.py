@@ -0,0 +1,161 @@
+"""The one priority formula, applied to whole NumPy arrays of issues at a time.
+
+Per-issue updates (Issue.compute_priority) and batch re-prioritization
+(reprioritize, calculate_priority, prioritize_issues.py) all go through
+severity_many() and score_arrays(), so they can't drift apart.
+"""
+from collections import defaultdict
+
+import numpy as np
+
+from . import view_cache, work_queue
+
+EMERGENCY_KEYWORDS = (
+    "fire", "flood", "gas leak", "earthquake", "emergency", "explosion",
+    "collapsed", "accident", "hazard", "toxic", "fatal", "ambulance",
+)
+PRIORITY_FORMULA_VERSION = 2  # Bump whenever score_arrays() or severity_many() changes
+CHUNK_SIZE = 2000
+UPDATE_BATCH_SIZE = 500  # ids per UPDATE; stays under SQLite's bound-parameter limit
+
+SCORED_FIELDS = ["severity", "priority_score", "priority", "priority_version", "queue_key", "assigned_officer"]
+
+
+def current_priority_version():
+    from .models import severity_model_version
+
+    return f"{severity_model_version()}/{PRIORITY_FORMULA_VERSION}"
+
+
+def is_emergency(description):
+    lowered = description.lower()
+    return any(word in lowered for word in EMERGENCY_KEYWORDS)
+
+
+def severity_many(descriptions, urgent=None):
+    """Returns an int array of severities (1-3), one per description.
+
+    Emergencies (keyword hit or flagged urgent) are 3; everything else is
+    classified by the ML model in a single batched transform + predict,
+    except for descriptions already in the severity cache.
+    """
+    from .ml_cache import get_cache
+    from .models import severity_model_version
+
+    descriptions = list(descriptions)
+    severity = np.ones(len(descriptions), dtype=np.int64)
+    emergency = np.fromiter((is_emergency(d) for d in descriptions), dtype=bool, count=len(descriptions))
+    if urgent is not None:
+        emergency |= np.asarray(urgent, dtype=bool)
+    severity[emergency] = 3
+
+    rest = np.flatnonzero(~emergency)
+    if len(rest):
+        predictions = np.array(get_cache("severity").get_or_compute(
+            [descriptions[i] for i in rest], severity_model_version(), _classify
+        ))
+        # Model classes 0/1/2 map to severity 1/2/3; anything unexpected counts as low.
+        severity[rest] = np.where((predictions >= 0) & (predictions <= 2), predictions + 1, 1)
+    return severity
+
+
+def _classify(descriptions):
+    from .inference import get_batcher
+    from .metrics import ml_timer
+
+    batcher = get_batcher()
+    # A lone row goes through the micro-batcher so it can share a model call
+    # with concurrent requests; batches go straight to the model.
+    with ml_timer():
+        if len(descriptions) == 1:
+            return [batcher.predict(descriptions[0])]
+        return [int(p) for p in batcher.predict_many(descriptions)]
+
+
+def score_arrays(severity, report_count):
+    """Returns (priority_score, priority) arrays for matching severity/report_count arrays."""
+    severity = np.asarray(severity)
+    score = np.round(severity * 1.5 + np.log(np.asarray(report_count) + 1), 2)
+    priority = np.where(severity == 3, 3, np.where(score >= 4, 2, 1))
+    return score, priority
+
+
+def score_issue(issue):
+    """Sets severity, priority_score, priority and priority_version on one issue in memory."""
+    severity = severity_many([issue.description])
+    score, priority = score_arrays(severity, [issue.report_count])
+    issue.severity = int(severity[0])
+    issue.priority_score = float(score[0])
+    issue.priority = int(priority[0])
+    issue.priority_version = current_priority_version()
+    issue.queue_key = work_queue.queue_key(issue.priority_score, issue.created_day)
+
+
+def reprioritize(queryset=None, chunk_size=CHUNK_SIZE, only_stale=False, progress=None):
+    """Re-scores issues chunk by chunk and writes back only rows that changed.
+
+    Issues are streamed by primary key in chunks of `chunk_size`, so memory
+    stays bounded by one chunk however large the table is. `progress`, if
+    given, is called with the rows scanned and updated so far after each
+    chunk. Returns a dict with the number of rows scanned and updated.
+    """
+    from .assignment import assign_bulk
+    from .models import Issue
+
+    version = current_priority_version()
+    if queryset is None:
+        queryset = Issue.objects.all()
+    if only_stale:
+        queryset = queryset.exclude(priority_version=version)
+    columns = ("id", "description", "report_count", "severity", "priority_score", "priority",
+               "priority_version", "assigned_officer_id", "status")
+
+    scanned = updated = 0
+    last_id = 0
+    while True:
+        rows = list(queryset.filter(id__gt=last_id).order_by("id").values_list(*columns)[:chunk_size])
+        if not rows:
+            break
+        last_id = rows[-1][0]
+        scanned += len(rows)
+
+        ids, descriptions, report_count, old_severity, old_score, old_priority, old_version, officers, status = zip(*rows)
+        severity = severity_many(descriptions)
+        score, priority = score_arrays(severity, np.array(report_count))
+
+        changed = (
+            (severity != np.array(old_severity))
+            | (score != np.round(np.array(old_score, dtype=np.float64), 2))
+            | (priority != np.array(old_priority))
+            | (np.array(old_version) != version)
+        )
+        needs_officer = (priority == 3) & np.array(
+            [officer is None and state != "Solved" for officer, state in zip(officers, status)]
+        )
+        # Least-loaded officer per department, counting this chunk's own assignments.
+        assigned = {}
+        if needs_officer.any():
+            pending = np.flatnonzero(needs_officer)
+            assigned = assign_bulk([ids[i] for i in pending], [descriptions[i] for i in pending])
+        changed |= np.array([issue_id in assigned for issue_id in ids])
+
+        # Rows sharing the same new values are written with one UPDATE ... WHERE id IN (...);
+        # with few distinct severities/scores that is far fewer statements than rows.
+        groups = defaultdict(list)
+        for i in np.flatnonzero(changed):
+            officer = assigned.get(ids[i])
+            groups[(int(severity[i]), float(score[i]), int(priority[i]), officer)].append(ids[i])
+        for (new_severity, new_score, new_priority, officer), group_ids in groups.items():
+            values = {"severity": new_severity, "priority_score": new_score, "priority": new_priority,
+                      "priority_version": version, "queue_key": work_queue.queue_key_expression(new_score)}
+            if officer is not None:
+                values["assigned_officer_id"] = officer
+            for start in range(0, len(group_ids), UPDATE_BATCH_SIZE):
+                Issue.objects.filter(id__in=group_ids[start:start + UPDATE_BATCH_SIZE]).update(**values)
+            updated += len(group_ids)
+        if progress:
+            progress(scanned, updated)
+
+    if updated:
+        view_cache.invalidate_all()  # Queryset updates send no post_save
+    return {"scanned": scanned, "updated": updated}
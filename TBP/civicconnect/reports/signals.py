@@ -0,0 +1,68 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from . import assignment, embeddings, text_index, trending, view_cache
+from .models import Issue, ReportedUser
+from .vector_index import loaded_index
+
+INDEXED_FIELDS = {"status", "embedding", "embedding_version", "latitude", "longitude"}
+TEXT_INDEXED_FIELDS = {"status", "description"}
+
+
+@receiver(post_save, sender=Issue)
+def index_issue(sender, instance, update_fields=None, **kwargs):
+    index = loaded_index()
+    if index is None:
+        return  # Nothing to keep in sync until this process first queries the index
+    if update_fields is not None and not INDEXED_FIELDS & set(update_fields):
+        return
+    if "embedding" in instance.get_deferred_fields():
+        return
+    if instance.status == "Solved" or not instance.embedding:
+        index.remove(instance.id)
+    elif instance.embedding_version == embeddings.embedding_version():
+        index.add(instance.id, embeddings.from_bytes(instance.embedding), instance.latitude, instance.longitude)
+
+
+@receiver(post_save, sender=Issue)
+def index_issue_text(sender, instance, update_fields=None, **kwargs):
+    if update_fields is not None and not TEXT_INDEXED_FIELDS & set(update_fields):
+        return
+    if TEXT_INDEXED_FIELDS & instance.get_deferred_fields():
+        return
+    text_index.index_issue(instance)
+
+
+@receiver(post_delete, sender=Issue)
+def release_officer_load(sender, instance, **kwargs):
+    if getattr(instance, "_loaded_load", None) is not None:
+        assignment.move_load(instance._loaded_load, None)
+
+
+@receiver(post_delete, sender=Issue)
+def unindex_issue(sender, instance, **kwargs):
+    index = loaded_index()
+    if index is not None:
+        index.remove(instance.id)
+
+
+@receiver(post_save, sender=Issue)
+def invalidate_issue_lists(sender, instance, update_fields=None, **kwargs):
+    view_cache.issue_changed(instance, update_fields)
+
+
+@receiver(post_delete, sender=Issue)
+def invalidate_deleted_issue_lists(sender, instance, **kwargs):
+    view_cache.issue_changed(instance, deleted=True)
+
+
+@receiver(post_save, sender=ReportedUser)
+def record_report_heat(sender, instance, created, **kwargs):
+    if created:
+        heat_key = trending.record_report(instance.issue_id, instance.reported_at)
+        view_cache.issue_reported(instance.issue_id, heat_key)
+
+
+@receiver(post_delete, sender=ReportedUser)
+def invalidate_reported_issue_lists(sender, instance, **kwargs):
+    view_cache.issue_reported(instance.issue_id)
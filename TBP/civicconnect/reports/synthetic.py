@@ -0,0 +1,276 @@
+"""Synthetic users, officers, issues and reports, for measuring the app at realistic scale.
+
+Issues come from a SyntheticCity. Its hotspots (neighbourhoods) sit within
+a radius of the centre, their popularity falls off like Zipf's law, and
+each one scatters issues around itself with its own spread; a share of
+reports lands anywhere in the city. Descriptions are the labelled dataset's
+sentences with the prefixes, places and durations people add, so nearby
+reports of one problem read alike without being identical. Report counts
+are heavy-tailed, and each report is a ReportedUser row from a distinct user.
+
+Rows go in with bulk_create, so Issue.save() and the post_save signals
+don't run (description_hash fills itself in on any insert). generate()
+fills in what they would have: geohash, created_day, queue_key, severity
+and priority, the trending heat of the reports (dated from the issue's
+creation on), officers for open priority-3 issues, and officers'
+open_issue_count. Severity is the model's verdict on the
+dataset sentence a description was built from, and priority_version is
+left blank, so `manage.py refresh_priorities` re-scores every row against
+its own text when that matters. Embeddings (`embed=True`, or
+`manage.py backfill_embeddings`), the vector index (`manage.py
+rebuild_issue_index`) and the text index (`manage.py rebuild_text_index`)
+are left for later, because at a million rows they cost more than the
+insert itself.
+"""
+import csv
+import os
+from contextlib import contextmanager
+from datetime import timedelta
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from . import assignment, embeddings, scoring, trending, work_queue
+from .geo import encode_geohash
+
+DATASET = os.path.join(settings.BASE_DIR, "civicconnect_ai", "issues_dataset.csv")
+DEFAULT_SEED = 42
+CITY_CENTER = (28.6139, 77.2090)  # The sample data's city (see civicconnect_ai/insert_data.py)
+METERS_PER_DEGREE = 111_320.0
+BACKGROUND_SHARE = 0.1  # Reports not tied to any hotspot
+REPORT_COUNT_EXPONENT = 2.5  # Zipf exponent of reports per issue: mostly 1, a few hundreds
+MAX_REPORT_COUNT = 500
+REPORT_DELAY_DAYS = 3.0  # Mean wait between an issue being filed and each later report of it
+DEPARTMENTS = list(assignment.DEPARTMENT_KEYWORDS) + ["General"]
+
+PREFIXES = ("", "", "", "Urgent: ", "Please fix: ", "Again, ", "Complaint: ", "Residents report ")
+SUFFIXES = (
+    "", "", "", " near {landmark}", " for {days} days", " since last week", " and it is getting worse",
+    " on {street}", " opposite {landmark}", ", reported before with no action",
+)
+LANDMARKS = ("the school", "the bus stop", "the market", "the hospital gate", "the metro station",
+             "the temple", "the park entrance", "the petrol pump", "the community hall")
+STREETS = ("Main Road", "Station Road", "Ring Road", "Canal Road", "Church Street", "Mall Road",
+           "Link Road", "Market Lane", "School Road", "Park Avenue")
+
+
+def load_sentences(path=DATASET):
+    with open(path, encoding="utf-8") as f:
+        return [row["description"] for row in csv.DictReader(f) if row.get("description")]
+
+
+class SyntheticCity:
+    """Hotspots, sentences and the random draws that turn them into issues.
+
+    `seed` lays out the city; `draws_seed`, if given, seeds the draws made
+    afterwards, so different runs can sample the same city differently.
+    """
+
+    def __init__(self, seed=DEFAULT_SEED, hotspots=50, center=CITY_CENTER, radius_km=15.0, sentences=None,
+                 draws_seed=None):
+        self.rng = np.random.default_rng(seed)
+        self.center = center
+        self.radius_m = radius_km * 1000
+        self.sentences = sentences or load_sentences()
+
+        # Uniform over the disc, so the outskirts get as many hotspots per km² as the centre.
+        distance = self.radius_m * np.sqrt(self.rng.random(hotspots))
+        angle = self.rng.random(hotspots) * 2 * np.pi
+        self.hotspot_lat, self.hotspot_lon = self._offset(distance * np.sin(angle), distance * np.cos(angle))
+        weights = 1.0 / np.arange(1, hotspots + 1)
+        self.hotspot_weight = self.rng.permutation(weights / weights.sum())
+        self.hotspot_spread_m = self.rng.uniform(100, 800, hotspots)
+        if draws_seed is not None:
+            self.rng = np.random.default_rng(draws_seed)
+
+    def _offset(self, north_m, east_m, lat=None, lon=None):
+        lat = self.center[0] if lat is None else lat
+        lon = self.center[1] if lon is None else lon
+        return (lat + north_m / METERS_PER_DEGREE,
+                lon + east_m / (METERS_PER_DEGREE * np.cos(np.radians(lat))))
+
+    def points(self, n):
+        """Returns (latitude, longitude, hotspot) arrays; hotspot is -1 for background reports."""
+        hotspot = self.rng.choice(len(self.hotspot_weight), size=n, p=self.hotspot_weight)
+        spread = self.hotspot_spread_m[hotspot]
+        lat, lon = self._offset(self.rng.normal(0, spread), self.rng.normal(0, spread),
+                                self.hotspot_lat[hotspot], self.hotspot_lon[hotspot])
+
+        background = self.rng.random(n) < BACKGROUND_SHARE
+        count = int(background.sum())
+        distance = self.radius_m * np.sqrt(self.rng.random(count))
+        angle = self.rng.random(count) * 2 * np.pi
+        lat[background], lon[background] = self._offset(distance * np.sin(angle), distance * np.cos(angle))
+        hotspot[background] = -1
+        return lat, lon, hotspot
+
+    def points_near(self, n, latitude, longitude, spread_m):
+        """Returns (latitude, longitude) arrays scattered normally around one spot."""
+        return self._offset(self.rng.normal(0, spread_m, n), self.rng.normal(0, spread_m, n), latitude, longitude)
+
+    def busiest_hotspot(self):
+        i = int(np.argmax(self.hotspot_weight))
+        return float(self.hotspot_lat[i]), float(self.hotspot_lon[i])
+
+    def descriptions(self, n):
+        """Returns (descriptions, sentence index) for n reports."""
+        sentence = self.rng.integers(len(self.sentences), size=n)
+        prefix = self.rng.integers(len(PREFIXES), size=n)
+        suffix = self.rng.integers(len(SUFFIXES), size=n)
+        landmark = self.rng.integers(len(LANDMARKS), size=n)
+        street = self.rng.integers(len(STREETS), size=n)
+        days = self.rng.integers(2, 15, size=n)
+        texts = []
+        for i in range(n):
+            text = self.sentences[sentence[i]]
+            if PREFIXES[prefix[i]]:
+                text = PREFIXES[prefix[i]] + text[0].lower() + text[1:]
+            texts.append(text + SUFFIXES[suffix[i]].format(
+                landmark=LANDMARKS[landmark[i]], street=STREETS[street[i]], days=days[i]
+            ))
+        return texts, sentence
+
+    def location_name(self, hotspot, street):
+        area = f"Sector {hotspot + 1}" if hotspot >= 0 else "Outskirts"
+        return f"{STREETS[street]}, {area}"
+
+    def report_counts(self, n):
+        return np.minimum(self.rng.zipf(REPORT_COUNT_EXPONENT, size=n), MAX_REPORT_COUNT)
+
+
+@contextmanager
+def _explicit_created_at(model, name="created_at"):
+    """Lets bulk_create keep the `name` values it is given instead of stamping now()."""
+    field = model._meta.get_field(name)
+    field.auto_now_add = False
+    try:
+        yield
+    finally:
+        field.auto_now_add = True
+
+
+def create_users(count, prefix, start=0, batch_size=5000):
+    from django.contrib.auth.models import User
+
+    for first in range(start, start + count, batch_size):
+        User.objects.bulk_create([
+            User(username=f"{prefix}-user-{i}", email=f"{prefix}-user-{i}@example.com", password="!")
+            for i in range(first, min(first + batch_size, start + count))
+        ])
+    return count
+
+
+def create_officers(count, prefix, rng, start=0):
+    from django.contrib.auth.models import User
+
+    from .models import Officer
+
+    users = User.objects.bulk_create(
+        [User(username=f"{prefix}-officer-{i}", email=f"{prefix}-officer-{i}@example.com", password="!")
+         for i in range(start, start + count)],
+        batch_size=5000,
+    )
+    Officer.objects.bulk_create(
+        [Officer(user=user, name=user.username, department=DEPARTMENTS[rng.integers(len(DEPARTMENTS))])
+         for user in users],
+        batch_size=5000,
+    )
+    return len(users)
+
+
+def generate(issues, users=0, officers=0, seed=DEFAULT_SEED, hotspots=50, radius_km=15.0, days=365,
+             batch_size=5000, prefix="synth", embed=False, progress=None):
+    """Adds `issues` issues (with their ReportedUser rows), plus `users` citizens and `officers` officers.
+
+    Issues are reported by users whose username starts with `prefix`,
+    including those made by earlier runs. The same seed and starting table
+    give the same rows; a second run adds different issues in the same city.
+    Returns a dict of rows created.
+    """
+    from django.contrib.auth.models import User
+
+    from .models import Issue, ReportedUser
+
+    city = SyntheticCity(seed=seed, hotspots=hotspots, radius_km=radius_km,
+                         draws_seed=[seed, Issue.objects.count()])
+    rng = city.rng
+    user_prefix, officer_prefix = f"{prefix}-user-", f"{prefix}-officer-"
+    with transaction.atomic():
+        create_users(users, prefix, start=User.objects.filter(username__startswith=user_prefix).count())
+        create_officers(officers, prefix, rng, start=User.objects.filter(username__startswith=officer_prefix).count())
+    pool = list(User.objects.filter(username__startswith=user_prefix).order_by("id").values_list("id", "username", "email"))
+    if issues and not pool:
+        raise ValueError(f"No '{user_prefix}*' users to report issues; create some with users=N.")
+
+    # Severity is per dataset sentence (one batched model call), see the module docstring.
+    base_severity = scoring.severity_many(city.sentences)
+    now = timezone.now()
+    created_issues = created_reports = 0
+    while created_issues < issues:
+        n = min(batch_size, issues - created_issues)
+        texts, sentence = city.descriptions(n)
+        lat, lon, hotspot = city.points(n)
+        street = rng.integers(len(STREETS), size=n)
+        age_days = rng.random(n) * days
+        report_count = np.minimum(city.report_counts(n), len(pool))
+        # Older issues are more likely to have been dealt with.
+        solved = rng.random(n) < 0.6 * age_days / max(days, 1)
+        in_progress = ~solved & (rng.random(n) < 0.2)
+
+        severity = np.where([scoring.is_emergency(text) for text in texts], 3, base_severity[sentence])
+        score, priority = scoring.score_arrays(severity, report_count)
+        vectors = embeddings.encode_many(texts) if embed else None
+        first_reporter = rng.integers(len(pool), size=n)
+
+        rows = []
+        reporters = []
+        reported_at = []
+        for i in range(n):
+            # Distinct reporters, the first of whom filed the issue.
+            if report_count[i] == 1:
+                reporter_ids = first_reporter[i:i + 1]
+            else:
+                reporter_ids = rng.choice(len(pool), size=int(report_count[i]), replace=False)
+            user_id, username, email = pool[reporter_ids[0]]
+            created_at = now - timedelta(days=float(age_days[i]))
+            created_day = work_queue.day_number(created_at)
+            delays = np.minimum(rng.exponential(REPORT_DELAY_DAYS, size=len(reporter_ids)), age_days[i])
+            delays[0] = 0.0
+            times = [created_at + timedelta(days=float(delay)) for delay in delays]
+            status = "Solved" if solved[i] else "In Progress" if in_progress[i] else "Pending"
+            rows.append(Issue(
+                user_id=user_id, username=username, email=email,
+                title=texts[i].split(",")[0][:50], description=texts[i],
+                status=status, progress_percentage=100 if solved[i] else 50 if in_progress[i] else 0,
+                location_name=city.location_name(hotspot[i], street[i]),
+                latitude=float(lat[i]), longitude=float(lon[i]),
+                geohash=encode_geohash(float(lat[i]), float(lon[i])),
+                created_at=created_at, created_day=created_day,
+                report_count=int(report_count[i]), severity=int(severity[i]),
+                priority_score=float(score[i]), priority=int(priority[i]),
+                queue_key=work_queue.queue_key(float(score[i]), created_day),
+                heat_key=trending.combine([trending.exponent(when) for when in times]), heat_updated_at=max(times),
+                embedding=embeddings.to_bytes(vectors[i]) if embed else None,
+                embedding_version=embeddings.embedding_version() if embed else "",
+            ))
+            reporters.append(reporter_ids)
+            reported_at.append(times)
+
+        with transaction.atomic(), _explicit_created_at(Issue), _explicit_created_at(ReportedUser, "reported_at"):
+            needs_officer = np.flatnonzero((priority == 3) & ~solved)
+            officer_for = assignment.assign_bulk(needs_officer.tolist(), [texts[i] for i in needs_officer])
+            for i, officer_id in officer_for.items():
+                rows[i].assigned_officer_id = officer_id
+            Issue.objects.bulk_create(rows)
+            reports = [ReportedUser(issue_id=issue.id, user_id=pool[r][0], reported_at=when)
+                       for issue, reporter_ids, times in zip(rows, reporters, reported_at)
+                       for r, when in zip(reporter_ids, times)]
+            ReportedUser.objects.bulk_create(reports, batch_size=batch_size)
+        created_issues += n
+        created_reports += len(reports)
+        if progress:
+            progress(created_issues, issues)
+
+    return {"users": users, "officers": officers, "issues": created_issues, "reports": created_reports}
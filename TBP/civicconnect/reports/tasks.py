@@ -0,0 +1,74 @@
+"""Job handlers (see reports.jobs); imported by ReportsConfig.ready() so workers know every kind."""
+from django.contrib.auth.models import User
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.db.models import F
+
+from . import embeddings
+from .dedup import find_duplicate, find_duplicate_cascade, index_candidates, local_candidates
+from .jobs import PermanentError, handler
+from .models import Issue, ReportedUser
+
+PROCESS_REPORT = "process_report"
+
+
+@handler(PROCESS_REPORT)
+def process_report(payload):
+    """Deduplicates a citizen's report against open issues nearby, then files or merges it.
+
+    A duplicate bumps the existing issue's report count and re-scores it; a
+    new issue is scored (severity, priority, officer) as it is created.
+    """
+    try:
+        user = User.objects.get(id=payload["user_id"])
+    except User.DoesNotExist:
+        raise PermanentError(f"User {payload['user_id']} no longer exists")
+    description = payload["description"]
+    latitude, longitude = payload["latitude"], payload["longitude"]
+    image = payload.get("image")
+
+    # Cheap pass over every open issue nearby; MiniLM only re-scores the uncertain ones.
+    # (Encodings are cached by text, so calling encode() more than once is free.)
+    nearby_issues = local_candidates(latitude, longitude)
+    issue, _ = find_duplicate_cascade(description, nearby_issues, query=lambda: embeddings.encode(description))
+    if issue is None:
+        # A new issue needs its embedding anyway, so the vector index's semantic
+        # neighbours (beyond the local list's cap) cost no extra MiniLM call.
+        query_embedding = embeddings.encode(description)
+        extra = index_candidates(query_embedding, latitude, longitude, exclude={i.id for i in nearby_issues})
+        issue, _ = find_duplicate(query_embedding, extra)
+
+    if issue is not None:
+        if image:
+            default_storage.delete(image)  # The existing issue keeps its own photo
+        with transaction.atomic():
+            if ReportedUser.objects.filter(issue=issue, user=user).exists():
+                return {"error": "You have already reported this issue.", "issue_id": issue.id}
+            issue.report_count = F("report_count") + 1
+            issue.save(update_fields=["report_count"])
+            issue.refresh_from_db()
+            ReportedUser.objects.create(issue=issue, user=user)
+            issue.update_priority()
+        return {
+            "message": "Issue already exists. Report count incremented.",
+            "issue_id": issue.id,
+            "report_count": issue.report_count,
+            "priority": issue.priority_score,
+        }
+
+    with transaction.atomic():
+        new_issue = Issue.objects.create(
+            user=user,
+            username=user.username,
+            email=user.email,
+            description=description,
+            location_name=payload["location_name"],
+            latitude=latitude,
+            longitude=longitude,
+            image=image or None,
+            report_count=1,
+            embedding=embeddings.to_bytes(query_embedding),
+            embedding_version=embeddings.embedding_version(),
+        )
+        ReportedUser.objects.create(issue=new_issue, user=user)  # Scored on create
+    return {"message": "New issue reported.", "issue_id": new_issue.id}
@@ -0,0 +1,24 @@
+"""Test helpers shared by the app's test cases."""
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+
+class QueryBudgetMixin:
+    """assertWithinQueryBudget() fails a test when a view makes more SQL queries than reports.urls.QUERY_BUDGETS allows.
+
+    Run it against a page with several rows: an N+1 pattern (a query per row
+    for a foreign key in the template) blows the budget, a fixed cost doesn't.
+    """
+
+    def assertWithinQueryBudget(self, client, url_name, *args, method="get", data=None, **kwargs):
+        from .urls import QUERY_BUDGETS
+
+        self.assertIn(url_name, QUERY_BUDGETS, f"No query budget declared for {url_name!r} in reports/urls.py")
+        budget = QUERY_BUDGETS[url_name]
+        with CaptureQueriesContext(connection) as queries:
+            response = getattr(client, method)(reverse(url_name, args=args, kwargs=kwargs), data)
+        if len(queries) > budget:
+            listing = "\n".join(f"  {i}. {q['sql']}" for i, q in enumerate(queries.captured_queries, 1))
+            self.fail(f"{url_name} made {len(queries)} queries, over its budget of {budget}:\n{listing}")
+        return response
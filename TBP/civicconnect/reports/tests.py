@@ -1,3 +1,991 @@
-from django.test import TestCase
+import math
+import os
+import random
+import tempfile
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
 
-# Create your tests here.
+import numpy as np
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from . import (assignment, cascade, embeddings, jobs, loadtest, scheduler, synthetic, text_index, trending, vector_index,
+               view_cache, work_queue)
+from .dedup import best_match, find_duplicate_cascade, first_match_sequential
+from .inference import SeverityBatcher
+from .models import Issue, Job, Officer, ReportedUser, ScheduledRun, SchedulerLock, description_hash
+from .management.commands.import_times import probe
+from .ml_cache import MLCache
+from .pagination import encode_cursor, keyset_paginate
+from .testing import QueryBudgetMixin
+from .model_registry import ArtifactError, current_version, load_severity_model, set_current, write_severity_artifact
+from .geo import covering_cells, encode_geohash, haversine_m, parse_point
+from .scoring import score_arrays
+
+
+class BatchedDedupTests(SimpleTestCase):
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.vectors = rng.standard_normal((200, 384)).astype(np.float32)
+        self.vectors /= np.linalg.norm(self.vectors, axis=1, keepdims=True)
+
+    def test_matches_sequential_scan_when_one_candidate_qualifies(self):
+        for target in (0, 57, 199):
+            query = self.vectors[target]
+            self.assertEqual(best_match(query, self.vectors)[0], first_match_sequential(query, self.vectors)[0])
+
+    def test_no_match_below_threshold(self):
+        query = np.zeros(384, dtype=np.float32)
+        query[0] = 1.0
+        self.assertEqual(first_match_sequential(query, self.vectors), (None, None))
+        self.assertIsNone(best_match(query, self.vectors)[0])
+
+    def test_prefers_best_over_first(self):
+        query = self.vectors[10]
+        vectors = np.stack([0.8 * query + 0.6 * self.vectors[11], query])
+        self.assertEqual(first_match_sequential(query, vectors)[0], 0)
+        self.assertEqual(best_match(query, vectors)[0], 1)
+
+    def test_strict_threshold(self):
+        query = np.array([1.0, 0.0], dtype=np.float32)
+        vectors = np.array([[0.75, np.sqrt(1 - 0.75 ** 2)]], dtype=np.float32)
+        self.assertEqual(best_match(query, vectors, threshold=0.75)[0], 0)
+        self.assertIsNone(best_match(query, vectors, threshold=0.75, inclusive=False)[0])
+
+
+class VectorIndexTests(SimpleTestCase):
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        centers = rng.standard_normal((40, 32))
+        self.vectors = (centers[rng.integers(0, 40, 3000)] + 0.4 * rng.standard_normal((3000, 32))).astype(np.float32)
+        self.vectors /= np.linalg.norm(self.vectors, axis=1, keepdims=True)
+        self.coords = np.column_stack([12.9 + rng.uniform(0, 0.05, 3000), 77.5 + rng.uniform(0, 0.05, 3000)])
+        self.ids = np.arange(1, 3001)
+        self.queries = [self.vectors[i] for i in rng.integers(0, 3000, 50)]
+        self.index = vector_index.IssueVectorIndex.build(self.ids, self.vectors, self.coords)
+        self.addCleanup(setattr, embeddings, "_version", embeddings._version)
+        embeddings._version = "test-model/1"
+
+    def exact(self, query, k=10, keep=None):
+        scores = self.vectors @ query
+        rows = np.flatnonzero(keep if keep is not None else np.ones(len(scores), dtype=bool))
+        return [int(self.ids[row]) for row in rows[np.argsort(-scores[rows])][:k]]
+
+    def test_recall_against_brute_force(self):
+        self.assertGreater(len(self.index.centroids), 1)  # Really probing lists, not scanning
+        recall = [len({i for i, _ in self.index.query(q, k=10)} & set(self.exact(q))) / 10 for q in self.queries]
+        self.assertGreaterEqual(np.mean(recall), 0.95)
+
+    def test_radius_filter(self):
+        lat, lon, radius = 12.925, 77.525, 1500
+        inside = haversine_m(lat, lon, self.coords[:, 0], self.coords[:, 1]) <= radius
+        self.assertTrue(0 < inside.sum() < len(inside))
+        for query in self.queries[:10]:
+            hits = [i for i, _ in self.index.query(query, k=10, lat=lat, lon=lon, radius_m=radius)]
+            self.assertTrue(all(inside[i - 1] for i in hits))
+            self.assertGreaterEqual(len(set(hits) & set(self.exact(query, keep=inside))), 8)
+
+    def test_add_remove_and_compact(self):
+        query = self.queries[0]
+        top = self.index.query(query, k=1)[0][0]
+        self.index.remove(top)
+        self.assertNotIn(top, self.index)
+        self.assertNotIn(top, [i for i, _ in self.index.query(query, k=10)])
+        self.index.add(top, self.vectors[top - 1], *self.coords[top - 1])
+        self.index.add(top, self.vectors[top - 1], *self.coords[top - 1])  # Unchanged: no second row
+        self.assertEqual(self.index.query(query, k=1)[0][0], top)
+
+        for issue_id in range(1, 2001):  # Past half tombstoned: remove() compacts by itself
+            self.index.remove(issue_id)
+        self.assertEqual(len(self.index), 1000)
+        self.assertLessEqual(self.index._size, 2000)
+        self.index.compact()
+        self.assertEqual(self.index._size, 1000)
+        keep = self.ids > 2000
+        for query in self.queries[:10]:
+            hits = [i for i, _ in self.index.query(query, k=5)]
+            self.assertTrue(all(i > 2000 for i in hits))
+            self.assertGreaterEqual(len(set(hits) & set(self.exact(query, k=5, keep=keep))), 4)
+
+    def test_snapshot_round_trip(self):
+        self.index.remove(1)
+        self.index.synced_at = timezone.now()
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "index.npz")
+            self.index.save(path)
+            loaded = vector_index.IssueVectorIndex.load(path)
+            embeddings._version = "test-model/2"
+            self.assertIsNone(vector_index.IssueVectorIndex.load(path))  # Vectors from another model
+        self.assertEqual(len(loaded), len(self.index))
+        self.assertNotIn(1, loaded)
+        self.assertEqual(loaded.synced_at, self.index.synced_at)
+        for query in self.queries[:10]:
+            self.assertEqual(loaded.query(query, k=10), self.index.query(query, k=10))
+
+
+class VectorIndexSyncTests(TestCase):
+    def setUp(self):
+        from django.contrib.auth.models import User
+
+        self.addCleanup(setattr, embeddings, "_version", embeddings._version)
+        embeddings._version = "test-model/1"
+        self.user = User.objects.create(username="citizen")
+        self.basis = np.eye(embeddings.EMBEDDING_DIM, dtype=np.float32)
+
+    def create(self, n, axis, **fields):
+        return Issue.objects.bulk_create([Issue(
+            user=self.user, username="citizen", email="c@example.com", description=f"issue {n}", location_name="x",
+            latitude=12.9, longitude=77.5 + n * 1e-4, embedding=embeddings.to_bytes(self.basis[axis]),
+            embedding_version=embeddings.embedding_version(), **fields,
+        )])[0]
+
+    def nearest(self, index, axis):
+        return [issue_id for issue_id, _ in index.query(self.basis[axis], k=1, min_score=0.99)]
+
+    def test_sync_picks_up_edits_and_solved_issues_not_only_new_rows(self):
+        edited, solved, reencoded = (self.create(n, n) for n in range(3))
+        index = vector_index.build_from_db()
+        self.assertEqual(len(index), 3)
+
+        # Other processes' writes, which this process's signals never saw
+        Issue.objects.filter(id=edited.id).update(embedding=embeddings.to_bytes(self.basis[10]),
+                                                  updated_at=timezone.now())
+        Issue.objects.filter(id=solved.id).update(status="Solved", updated_at=timezone.now())
+        Issue.objects.filter(id=reencoded.id).update(embedding_version="older-model/1", updated_at=timezone.now())
+        new = self.create(3, 3)
+        vector_index.sync(index)
+
+        self.assertEqual(self.nearest(index, 10), [edited.id])
+        self.assertEqual(self.nearest(index, 0), [])
+        self.assertNotIn(solved.id, index)
+        self.assertNotIn(reencoded.id, index)
+        self.assertEqual(self.nearest(index, 3), [new.id])
+        self.assertEqual(len(index), 2)
+
+
+class IssueEmbeddingTests(TestCase):
+    def setUp(self):
+        from django.contrib.auth.models import User
+
+        self.addCleanup(setattr, embeddings, "_version", embeddings._version)
+        embeddings._version = "test-model/1"
+        self.addCleanup(setattr, embeddings, "encode_many", embeddings.encode_many)
+        embeddings.encode_many = self.encode_many
+        self.encoded = []
+        self.user = User.objects.create(username="citizen")
+
+    def vector(self, text):
+        return np.eye(embeddings.EMBEDDING_DIM, dtype=np.float32)[len(text)]
+
+    def encode_many(self, texts):
+        # Stands in for MiniLM, recording what it was asked to encode.
+        self.encoded += texts
+        return np.stack([self.vector(text) for text in texts])
+
+    def create(self, description, embedding=None, version=None):
+        issue, = Issue.objects.bulk_create([Issue(
+            user=self.user, username="citizen", email="c@example.com", description=description, location_name="x",
+            latitude=12.9, longitude=77.5 + len(description) * 1e-4,
+            embedding=embedding if embedding is None else embeddings.to_bytes(embedding),
+            embedding_version=version or embeddings.embedding_version(),
+        )])
+        return Issue.objects.get(id=issue.id)
+
+    def test_stored_vector_is_reused_without_encoding(self):
+        stored = self.vector("pothole")
+        issue = self.create("pothole", stored)
+        with self.assertNumQueries(0):
+            np.testing.assert_array_equal(issue.get_embedding(), stored)
+        self.assertEqual(self.encoded, [])
+
+    def test_edit_or_new_model_version_re_encodes(self):
+        issue = self.create("pothole", self.vector("pothole"))
+        issue.description = "pothole near school"
+        np.testing.assert_array_equal(issue.get_embedding(), self.vector("pothole near school"))
+        self.assertEqual(self.encoded, ["pothole near school"])
+        issue.get_embedding()  # Persisted and remembered: not encoded again
+        self.assertEqual(len(self.encoded), 1)
+        issue.refresh_from_db()
+        np.testing.assert_array_equal(embeddings.from_bytes(issue.embedding), self.vector("pothole near school"))
+
+        self.encoded.clear()
+        issue = self.create("streetlight", self.vector("pothole"), version="older-model/1")
+        issue.get_embedding()
+        self.assertEqual(self.encoded, ["streetlight"])
+        issue.refresh_from_db()
+        self.assertEqual(issue.embedding_version, embeddings.embedding_version())
+        np.testing.assert_array_equal(embeddings.from_bytes(issue.embedding), self.vector("streetlight"))
+
+    def test_backfill_fills_missing_and_outdated_rows_only(self):
+        from io import StringIO
+
+        from django.core.management import call_command
+
+        current = self.create("pothole", self.vector("garbage"))
+        missing = self.create("streetlight")
+        outdated = self.create("water leak", self.vector("garbage"), version="older-model/1")
+        call_command("backfill_embeddings", batch_size=1, stdout=StringIO())
+
+        self.assertEqual(self.encoded, ["streetlight", "water leak"])
+        for issue, text in ((current, "garbage"), (missing, "streetlight"), (outdated, "water leak")):
+            issue.refresh_from_db()
+            self.assertEqual(issue.embedding_version, embeddings.embedding_version())
+            np.testing.assert_array_equal(embeddings.from_bytes(issue.embedding), self.vector(text))
+
+
+class GeohashTests(SimpleTestCase):
+    def test_known_geohash(self):
+        self.assertEqual(encode_geohash(57.64911, 10.40744, 11), "u4pruydqqvj")
+
+    def test_covering_cells_contain_every_point_in_radius(self):
+        rng = np.random.default_rng(1)
+        for radius in (25, 200, 1500):
+            cells = covering_cells(12.97, 77.59, radius)
+            lats = 12.97 + (rng.random(500) - 0.5) * radius / 50000
+            lons = 77.59 + (rng.random(500) - 0.5) * radius / 50000
+            for lat, lon in zip(lats, lons):
+                if haversine_m(12.97, 77.59, lat, lon) <= radius:
+                    geohash = encode_geohash(lat, lon)
+                    self.assertTrue(any(geohash.startswith(cell) for cell in cells))
+
+    def test_non_finite_input_is_rejected_not_looped_on(self):
+        for args in ((12.9, 77.5, float("nan")), (float("nan"), 77.5, 100), (12.9, float("inf"), 100)):
+            with self.assertRaises(ValueError):
+                covering_cells(*args)
+        self.assertEqual(parse_point("12.9", "77.5"), (12.9, 77.5))
+        for point in (("nan", "1"), ("1", "inf"), ("91", "0"), ("0", "-180.5"), (None, "1"), ("x", "1")):
+            with self.assertRaises(ValueError):
+                parse_point(*point)
+
+
+class ScoringTests(SimpleTestCase):
+    def test_score_arrays_matches_scalar_formula(self):
+        for severity in (1, 2, 3):
+            for report_count in (1, 2, 5, 40, 1000):
+                score, priority = score_arrays([severity], [report_count])
+                expected = round(severity * 1.5 + math.log(report_count + 1), 2)
+                self.assertAlmostEqual(float(score[0]), expected)
+                expected_priority = 3 if severity == 3 else 2 if expected >= 4 else 1
+                self.assertEqual(int(priority[0]), expected_priority)
+
+
+class SeverityBatcherTests(SimpleTestCase):
+    def test_concurrent_requests_share_batches(self):
+        batcher = SeverityBatcher(max_batch=16, max_wait_ms=20, classify_fn=lambda texts: np.array([len(t) % 3 for t in texts]))
+        texts = [f"issue {'x' * i}" for i in range(64)]
+        with ThreadPoolExecutor(max_workers=16) as pool:
+            results = list(pool.map(batcher.predict, texts))
+        self.assertEqual(results, [len(t) % 3 for t in texts])
+        self.assertLess(batcher.batches, len(texts))
+
+    def test_errors_reach_every_caller(self):
+        def fail(texts):
+            raise RuntimeError("model unavailable")
+
+        batcher = SeverityBatcher(max_batch=4, max_wait_ms=5, classify_fn=fail)
+        with self.assertRaises(RuntimeError):
+            batcher.predict("pothole")
+
+
+class MLCacheTests(SimpleTestCase):
+    def test_identical_descriptions_are_computed_once(self):
+        cache = MLCache("test", max_entries=10)
+        calls = []
+
+        def compute(texts):
+            calls.append(list(texts))
+            return [len(t) for t in texts]
+
+        first = cache.get_or_compute(["Pothole  on Main St", "pothole on main st", "leak"], "v1", compute)
+        second = cache.get_or_compute(["POTHOLE on Main St", "leak"], "v1", compute)
+        self.assertEqual(calls, [["Pothole  on Main St", "leak"]])
+        self.assertEqual(first, [19, 19, 4])
+        self.assertEqual(second, [19, 4])
+
+    def test_new_version_and_capacity(self):
+        cache = MLCache("test", max_entries=2)
+        compute = lambda texts: [t.upper() for t in texts]
+        cache.get_or_compute(["a", "b", "c"], "v1", compute)
+        self.assertEqual(cache.stats()["evictions"], 1)
+        cache.get_or_compute(["b"], "v2", compute)
+        self.assertEqual(cache.stats()["entries"], 1)
+        self.assertEqual(cache.stats()["hits"], 0)
+
+
+class EmbeddingVersionTests(SimpleTestCase):
+    def test_version_follows_the_weights_not_the_name(self):
+        import copy
+        from types import SimpleNamespace
+
+        import torch
+
+        model = torch.nn.Sequential(torch.nn.Linear(4, 2))
+        model.tokenizer = SimpleNamespace(get_vocab=lambda: {"pothole": 0, "road": 1})
+        same = copy.deepcopy(model)
+        self.assertEqual(embeddings.fingerprint(model), embeddings.fingerprint(same))
+        with torch.no_grad():
+            same[0].weight[0, 0] += 1e-3
+        self.assertNotEqual(embeddings.fingerprint(model), embeddings.fingerprint(same))
+
+
+class StartupTimeTests(SimpleTestCase):
+    # Generous enough for a slow CI box; importing torch or scikit-learn alone blows it.
+    SETUP_BUDGET_SECONDS = 3.0
+
+    def test_setup_and_urlconf_stay_light(self):
+        result = probe("civicconnect.urls")
+        self.assertEqual(result["heavy"], [])
+        self.assertLess(result["setup_s"] + result["import_s"], self.SETUP_BUDGET_SECONDS)
+
+
+class ModelRegistryTests(SimpleTestCase):
+    TEXTS = ["huge pothole on the main road", "streetlight flickering at night", "garbage bin overflowing",
+             "water pipe burst flooding the street", "pothole near school", "broken streetlight"]
+
+    def fit(self, rounds=5):
+        import xgboost as xgb
+        from sklearn.feature_extraction.text import TfidfVectorizer
+
+        vectorizer = TfidfVectorizer(stop_words="english")
+        X = vectorizer.fit_transform(self.TEXTS)
+        model = xgb.XGBClassifier(n_estimators=rounds, max_depth=2).fit(X, [0, 1, 2, 2, 0, 1])
+        return model, vectorizer
+
+    def test_round_trip_matches_sklearn_and_xgboost(self):
+        model, vectorizer = self.fit()
+        with tempfile.TemporaryDirectory() as root:
+            version = write_severity_artifact(model.get_booster(), vectorizer, root=root)
+            loaded = load_severity_model(root=root)
+            self.assertEqual(loaded.version, version)
+            queries = self.TEXTS + ["pothole and garbage", "nothing known here", ""]
+            features = loaded.features.transform(queries)
+            self.assertEqual(abs(features - vectorizer.transform(queries)).max(), 0)
+            self.assertEqual(list(loaded.predict(queries)), list(model.predict(vectorizer.transform(queries))))
+
+    def test_compiled_trees_match_xgboost_margins(self):
+        import xgboost as xgb
+
+        model, vectorizer = self.fit(rounds=20)
+        with tempfile.TemporaryDirectory() as root:
+            write_severity_artifact(model.get_booster(), vectorizer, root=root)
+            loaded = load_severity_model(root=root)
+            queries = self.TEXTS + ["pothole garbage streetlight", "school", "", "unknown words only"]
+            margins = loaded.ensemble.margins_sparse(*loaded.features.transform_arrays(queries))
+            expected = model.get_booster().predict(xgb.DMatrix(vectorizer.transform(queries)), output_margin=True)
+            np.testing.assert_array_equal(margins, expected)
+            self.assertEqual(list(loaded.predict_compiled(queries)), list(loaded.predict_xgboost(queries)))
+
+    def test_current_pointer_and_checksums(self):
+        model, vectorizer = self.fit()
+        with tempfile.TemporaryDirectory() as root:
+            first = write_severity_artifact(model.get_booster(), vectorizer, root=root)
+            second = write_severity_artifact(self.fit(rounds=6)[0].get_booster(), vectorizer, root=root, activate=False)
+            self.assertEqual(current_version(root=root), first)
+            set_current(second, root=root)
+            self.assertEqual(current_version(root=root), second)
+            with self.assertRaises(ArtifactError):
+                set_current("missing", root=root)
+
+            with open(os.path.join(root, "severity", second, "idf.npy"), "r+b") as f:
+                f.seek(-1, os.SEEK_END)
+                f.write(b"\x00")
+            with self.assertRaises(ArtifactError):
+                load_severity_model(root=root)
+
+
+class WordSetScorer:
+    """Cheap scorer stand-in: one dimension per known word."""
+    name = "test"
+    words = ["pothole", "road", "school", "garbage", "bin", "park", "light"]
+
+    def coverage(self, texts):
+        return np.array([np.mean([w in self.words for w in text.lower().split()]) for text in texts])
+
+    def vectors(self, texts):
+        out = np.array([[w in text.lower().split() for w in self.words] for text in texts], dtype=np.float32)
+        norms = np.linalg.norm(out, axis=1, keepdims=True)
+        return out / np.where(norms == 0, 1, norms)
+
+
+@override_settings(DEDUP_CASCADE_REJECT_BELOW=0.3, DEDUP_CASCADE_ACCEPT_ABOVE=0.95)
+class DedupCascadeTests(SimpleTestCase):
+    def setUp(self):
+        self._scorer, cascade._scorer = cascade._scorer, WordSetScorer()
+        self.addCleanup(setattr, cascade, "_scorer", self._scorer)
+        self.addCleanup(setattr, embeddings, "_version", embeddings._version)
+        embeddings._version = "test-model/1"  # Stands in for MiniLM, which these tests never load
+        cascade.stats.reset()
+
+    def issue(self, pk, description, vector):
+        vector = np.asarray(vector, dtype=np.float32)
+        issue = Issue(id=pk, description=description, embedding=embeddings.to_bytes(vector / np.linalg.norm(vector)),
+                      embedding_version=embeddings.embedding_version())
+        issue._loaded_description = description
+        return issue
+
+    def fail_if_called(self):
+        self.fail("MiniLM embedding requested for a case the cheap stage settles")
+
+    def test_cheap_stage_settles_clear_cases(self):
+        candidates = [self.issue(1, "pothole road school", [1, 0]), self.issue(2, "garbage bin park", [0, 1])]
+        issue, _ = find_duplicate_cascade("Pothole road school", candidates, query=self.fail_if_called)
+        self.assertEqual(issue.id, 1)
+        issue, _ = find_duplicate_cascade("light", candidates, query=self.fail_if_called)
+        self.assertIsNone(issue)
+        stats = cascade.stats.as_dict()
+        self.assertEqual((stats["settled_cheap_accept"], stats["settled_cheap_reject"], stats["rescored_minilm"]), (1, 3, 0))
+
+    def test_uncertain_candidates_go_to_minilm(self):
+        candidates = [self.issue(1, "pothole road", [1, 0]), self.issue(2, "garbage bin park", [0, 1])]
+        calls = []
+
+        def query():
+            calls.append(1)
+            return np.array([0.6, 0.8], dtype=np.float32)
+
+        # "pothole school" vs "pothole road" scores 0.5: in the band, so MiniLM decides (0.6 < 0.75).
+        issue, _ = find_duplicate_cascade("pothole school", candidates, query=query)
+        self.assertIsNone(issue)
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(cascade.stats.as_dict()["rescored_minilm"], 1)
+
+    def test_overlapping_words_alone_never_settle_a_duplicate(self):
+        # Only "garbage" is known on either side, so the cheap score is a perfect 1.0 for two different problems.
+        candidates = [self.issue(1, "Garbage truck ran over a cyclist", [1, 0])]
+        distinct = np.array([0.6, 0.8], dtype=np.float32)  # MiniLM: 0.6, below the duplicate threshold
+        for accept_above in (None, 0.95):
+            with self.subTest(accept_above=accept_above), override_settings(DEDUP_CASCADE_ACCEPT_ABOVE=accept_above):
+                issue, _ = find_duplicate_cascade("Garbage piled up", candidates, query=lambda: distinct)
+                self.assertIsNone(issue)
+        self.assertEqual(cascade.stats.as_dict()["settled_cheap_accept"], 0)
+
+
+class CascadeCalibrationTests(SimpleTestCase):
+    """The shipped cheap scorer and thresholds against the labelled pairs they were calibrated on."""
+
+    def setUp(self):
+        try:
+            scorer = cascade.Word2VecScorer()
+        except ImportError:
+            self.skipTest("gensim is not installed")
+        self._scorer, cascade._scorer = cascade._scorer, scorer
+        self.addCleanup(setattr, cascade, "_scorer", self._scorer)
+        self.addCleanup(setattr, embeddings, "_version", embeddings._version)
+        embeddings._version = "test-model/1"
+
+    def test_paraphrased_duplicates_reach_minilm(self):
+        import csv
+
+        from django.conf import settings
+
+        with open(os.path.join(settings.BASE_DIR, "civicconnect_ai", "dedup_pairs.csv"), encoding="utf-8") as f:
+            pairs = [(row["first"], row["second"]) for row in csv.DictReader(f) if row["duplicate"] == "1"]
+        self.assertIn(("Water pipe burst flooding the street", "Broken water main flooding road"), pairs)
+        vector = np.eye(embeddings.EMBEDDING_DIM, dtype=np.float32)[0]
+        for first, second in pairs:
+            calls = []
+            candidate = Issue(id=1, description=second, embedding=embeddings.to_bytes(vector),
+                              embedding_version=embeddings.embedding_version())
+            candidate._loaded_description = second
+
+            def query():
+                calls.append(1)
+                return vector  # MiniLM: the same problem
+
+            issue, _ = find_duplicate_cascade(first, [candidate], query=query)
+            self.assertEqual((issue and issue.id, len(calls)), (1, 1), (first, second))
+
+
+class TextIndexTests(SimpleTestCase):
+    def test_posting_weights_give_sklearn_cosine(self):
+        from sklearn.feature_extraction.text import TfidfVectorizer
+
+        corpus = ["Large pothole near the school", "Garbage bin overflowing near the park",
+                  "Street light broken, street dark", "Pothole on the main road"]
+        query = "pothole near the school gate"
+        vectorizer = TfidfVectorizer().fit(corpus)
+        expected = (vectorizer.transform(corpus) @ vectorizer.transform([query]).T).toarray().ravel()
+
+        counts = [text_index.term_counts(text) for text in corpus]
+        df = {term: sum(term in c for c in counts) for term in set().union(*counts)}
+        idfs = {term: text_index.idf(df[term], len(corpus)) for term in df}
+        query_counts = {t: c for t, c in text_index.term_counts(query).items() if t in df}
+        query_weights = text_index.unit_weights(query_counts, idfs)
+        for doc_counts, want in zip(counts, expected):
+            postings = text_index.unit_weights(doc_counts, idfs)
+            got = sum(w * idfs[t] ** 2 * postings[t] for t, w in query_weights.items() if t in postings)
+            self.assertAlmostEqual(got, want, places=6)
+
+
+@override_settings(JOBS_RUN_INLINE=False, JOBS_RETRY_BASE_SECONDS=5)
+class JobQueueTests(TestCase):
+    def setUp(self):
+        self.calls = []
+        jobs.handler("test_flaky")(self.flaky)
+        self.addCleanup(jobs.HANDLERS.pop, "test_flaky")
+
+    def flaky(self, payload):
+        self.calls.append(payload)
+        if len(self.calls) < payload["fail_times"] + 1:
+            raise RuntimeError("transient")
+        return {"calls": len(self.calls)}
+
+    def test_retries_with_backoff_then_succeeds(self):
+        job = jobs.enqueue("test_flaky", {"fail_times": 1})
+        self.assertEqual(jobs.run_pending(), 1)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Job.QUEUED, 1))
+        self.assertGreater(job.run_after, timezone.now())
+        self.assertEqual(jobs.run_pending(), 0)  # Not due yet
+
+        Job.objects.filter(id=job.id).update(run_after=timezone.now())
+        jobs.run_pending()
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.result), (Job.DONE, {"calls": 2}))
+
+    def test_gives_up_after_max_attempts(self):
+        job = jobs.enqueue("test_flaky", {"fail_times": 5}, max_attempts=1)
+        jobs.run_pending()
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.FAILED)
+        self.assertIn("transient", job.error)
+
+    def test_idempotency_key_and_inline_mode(self):
+        with self.settings(JOBS_RUN_INLINE=True):
+            first = jobs.enqueue("test_flaky", {"fail_times": 0}, idempotency_key="report:1:abc")
+            again = jobs.enqueue("test_flaky", {"fail_times": 0}, idempotency_key="report:1:abc")
+        self.assertEqual(first.id, again.id)
+        self.assertEqual(first.status, Job.DONE)
+        self.assertEqual(len(self.calls), 1)
+
+    def test_resubmitting_a_rejected_or_failed_report_returns_its_error(self):
+        from django.contrib.auth.models import User
+
+        user = User.objects.create_user("citizen", "c@example.com", "pw")
+        self.client.force_login(user)
+        form = {"description": "Pothole", "location_name": "Main St", "latitude": "12.9", "longitude": "77.5"}
+        payload = {"user_id": user.id, "image": None}
+        outcomes = {
+            "rejected": (Job.DONE, {"error": "You have already reported this issue.", "issue_id": 1}, 400),
+            "failed": (Job.FAILED, None, 500),
+        }
+        for key, (status, result, code) in outcomes.items():
+            Job.objects.create(kind="process_report", payload=payload, status=status, result=result,
+                               idempotency_key=f"report:{user.id}:{key}")
+            response = self.client.post(reverse("report_issue"), form, headers={"Idempotency-Key": key})
+            self.assertEqual(response.status_code, code, key)
+            self.assertNotIn("message", response.json())
+            self.assertTrue(response.json()["error"])
+
+
+class SchedulerTests(TestCase):
+    def setUp(self):
+        self.seen = []
+        scheduler.periodic("test_job", 3600)(self.job)
+        self.addCleanup(scheduler.JOBS.pop, "test_job")
+
+    def job(self, since):
+        self.seen.append(since)
+        return {"rows": 7}
+
+    def test_only_one_scheduler_holds_the_lock(self):
+        self.assertTrue(scheduler.acquire_lock("host-a:1"))
+        self.assertTrue(scheduler.acquire_lock("host-a:1"))  # Renewal
+        self.assertFalse(scheduler.acquire_lock("host-b:2"))
+        self.assertIsNone(scheduler.tick("host-b:2"))
+        scheduler.release_lock("host-a:1")
+        self.assertTrue(scheduler.acquire_lock("host-b:2"))
+
+    def test_runs_when_due_and_resumes_from_high_water_mark(self):
+        first = scheduler.tick("host-a:1", force=())
+        self.assertIn("test_job", [run.job for run in first])
+        self.assertIsNone(self.seen[0])
+        self.assertEqual(scheduler.tick("host-a:1"), [])  # Nothing due within the interval
+
+        scheduler.tick("host-a:1", force=["test_job"])
+        run = ScheduledRun.objects.filter(job="test_job").latest("started_at")
+        self.assertEqual(self.seen[1], ScheduledRun.objects.filter(job="test_job").earliest("started_at").high_water_mark)
+        self.assertEqual((run.status, run.rows), (ScheduledRun.OK, 7))
+        self.assertIsNotNone(run.duration_seconds)
+
+    @override_settings(SCHEDULER_HEARTBEAT_SECONDS=0)
+    def test_long_jobs_renew_the_lease_and_stop_once_it_is_taken_over(self):
+        from datetime import timedelta
+
+        lock = SchedulerLock.objects.filter(name=scheduler.LOCK_NAME)
+        expiries = []
+
+        def long_job(since):
+            for chunk in range(3):
+                if chunk < 2:
+                    lock.update(expires_at=timezone.now() + timedelta(seconds=1))  # Nearly used up by this chunk
+                scheduler.heartbeat(chunk)
+                expiries.append(lock.get().expires_at)
+                if chunk == 1:  # Pretend it lapsed anyway and another scheduler took it over
+                    lock.update(owner="host-b:2", expires_at=timezone.now() + timedelta(seconds=600))
+            return {"rows": 3}
+
+        scheduler.periodic("test_long_job", 3600)(long_job)
+        self.addCleanup(scheduler.JOBS.pop, "test_long_job")
+        scheduler.heartbeat()  # Outside a run: nothing to renew
+        runs = scheduler.tick("host-a:1", force=["test_long_job"])
+
+        self.assertEqual(len(expiries), 2)
+        self.assertTrue(all((expiry - timezone.now()).total_seconds() > 500 for expiry in expiries))
+        run = ScheduledRun.objects.get(job="test_long_job")
+        self.assertEqual(run.status, ScheduledRun.FAILED)
+        self.assertIn("LeaseLost", run.error)
+        self.assertIsNone(run.high_water_mark)
+        self.assertEqual(runs[-1], run)
+        self.assertIsNone(scheduler.tick("host-a:1"))  # The lease is host-b's now
+
+
+class OfficerAssignmentTests(TestCase):
+    def setUp(self):
+        from django.contrib.auth.models import User
+
+        def officer(name, department, load):
+            return Officer.objects.create(user=User.objects.create(username=name), name=name,
+                                          department=department, open_issue_count=load)
+
+        self.busy = officer("busy", "Roads", 5)
+        self.idle = officer("idle", "Roads", 1)
+        self.water = officer("water", "Water", 0)
+
+    def test_picks_least_loaded_in_department(self):
+        self.assertEqual(assignment.pick_officer("Pothole on the main road"), self.idle)
+        self.assertEqual(assignment.pick_officer("Sewage overflowing"), self.water)
+        self.assertEqual(assignment.pick_officer("Noise at night"), self.water)  # No department: anyone
+
+    def test_bulk_spreads_load_and_updates_counters(self):
+        assigned = assignment.assign_bulk([1, 2, 3, 4, 5, 6], ["pothole"] * 5 + ["noise"])
+        self.assertEqual(Counter(assigned.values()), {self.idle.id: 4, self.busy.id: 1, self.water.id: 1})
+        self.assertEqual(sorted(Officer.objects.values_list("open_issue_count", flat=True)), [1, 5, 6])
+
+
+@override_settings(WORK_QUEUE_AGING_PER_DAY=0.5)
+class WorkQueueTests(TestCase):
+    def test_old_low_priority_issues_age_past_new_urgent_ones(self):
+        from django.contrib.auth.models import User
+
+        user = User.objects.create(username="citizen")
+        officer = Officer.objects.create(user=User.objects.create(username="officer"), name="o", department="Roads")
+        today = work_queue.day_number(timezone.now())
+        rows = [  # (priority_score, days waiting, status)
+            (5.6, 0, "Pending"), (2.54, 10, "Pending"), (4.04, 1, "In Progress"), (5.6, 30, "Solved"),
+        ]
+        for n, (score, waited, status) in enumerate(rows):
+            Issue.objects.bulk_create([Issue(
+                user=user, username="citizen", email="c@example.com", description=f"issue {n}", location_name="x",
+                latitude=n, longitude=0, assigned_officer=officer, status=status, priority_score=score,
+                created_day=today - waited, queue_key=work_queue.queue_key(score, today - waited),
+            )])
+
+        first = keyset_paginate(work_queue.officer_queue(officer), work_queue.QUEUE_ORDERING, page_size=2)
+        rest = keyset_paginate(work_queue.officer_queue(officer), work_queue.QUEUE_ORDERING,
+                               cursor=first.next_cursor, page_size=2)
+        # Effective priorities: 2.54 + 5 = 7.54, 5.6, 4.04 + 0.5 = 4.54; the solved issue is left out.
+        self.assertEqual([i.description for i in first] + [i.description for i in rest],
+                         ["issue 1", "issue 0", "issue 2"])
+        self.assertFalse(rest.has_next)
+
+    def test_cursor_values_of_the_wrong_type_are_rejected(self):
+        from django.contrib.auth.models import User
+
+        user = User.objects.create_user("officer", "o@example.com", "pw")
+        Officer.objects.create(user=user, name="o", department="Roads")
+        self.client.force_login(user)
+        for values in (["high", 1], [None, 1], [{"score": 1}, 1], [1.5, [2]], [float("nan"), 1]):
+            response = self.client.get(reverse("officer_work_queue"), {"cursor": encode_cursor(values)})
+            self.assertEqual(response.status_code, 400, values)
+            response = self.client.get(reverse("officer_dashboard"), {"cursor": encode_cursor(values)})
+            self.assertRedirects(response, reverse("officer_dashboard"), fetch_redirect_response=False)
+
+
+class IssueUniquenessTests(TestCase):
+    def test_same_text_at_the_same_place_is_rejected_by_its_hash(self):
+        from django.contrib.auth.models import User
+        from django.db import IntegrityError, transaction
+
+        user = User.objects.create(username="citizen")
+        text = "Water logging near the market after every rain. " * 200  # Longer than a B-tree key may be
+
+        def create(text, latitude=0.0):
+            return Issue.objects.create(user=user, username="citizen", email="c@example.com", description=text,
+                                        location_name="x", latitude=latitude, longitude=0.0)
+
+        issue = create(text)
+        self.assertEqual(issue.description_hash, description_hash(text))
+        create(text, latitude=1.0)
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            create(text)
+
+        issue.description = "Edited"
+        issue.save(update_fields=["description"])
+        issue.refresh_from_db()
+        self.assertEqual(issue.description_hash, description_hash("Edited"))
+        create(text)  # The edited issue no longer holds the old text's key
+
+    def test_bulk_inserted_rows_get_their_hash_too(self):
+        from django.contrib.auth.models import User
+        from django.db import IntegrityError, transaction
+
+        user = User.objects.create(username="citizen")
+        rows = [Issue(user=user, username="citizen", email="c@example.com", description=text, location_name="x",
+                      latitude=0.0, longitude=0.0) for text in ("Pothole", "Broken streetlight")]
+        Issue.objects.bulk_create(rows)
+        self.assertEqual(sorted(Issue.objects.values_list("description_hash", flat=True)),
+                         sorted(description_hash(row.description) for row in rows))
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Issue.objects.bulk_create([Issue(user=user, username="citizen", email="c@example.com",
+                                             description="Pothole", location_name="x", latitude=0.0, longitude=0.0)])
+
+
+class TrendingTests(TestCase):
+    def test_fresh_reports_outrank_a_pile_of_old_ones(self):
+        from datetime import timedelta
+
+        from django.contrib.auth.models import User
+
+        users = User.objects.bulk_create([User(username=f"citizen{n}") for n in range(4)])
+        old, new = Issue.objects.bulk_create([Issue(
+            user=users[0], username="citizen", email="c@example.com", description=f"issue {n}", location_name="x",
+            latitude=n, longitude=0,
+        ) for n in range(2)])
+        for user in users:  # Four reports, three days (half-lives) ago: worth half a report now
+            ReportedUser.objects.create(issue=old, user=user)
+        ReportedUser.objects.filter(issue=old).update(reported_at=timezone.now() - timedelta(days=3))
+        trending.rebuild()
+        ReportedUser.objects.create(issue=new, user=users[0])
+
+        now = timezone.now()
+        old.refresh_from_db()
+        new.refresh_from_db()
+        self.assertAlmostEqual(trending.heat_at(old, now), 0.5, places=3)
+        self.assertAlmostEqual(trending.heat_at(new, now), 1.0, places=3)
+        self.assertEqual(list(trending.trending_issues()), [new, old])
+
+    def test_incremental_updates_match_a_rebuild(self):
+        from django.contrib.auth.models import User
+
+        users = User.objects.bulk_create([User(username=f"citizen{n}") for n in range(5)])
+        issue = Issue.objects.create(user=users[0], username="citizen", email="c@example.com", description="pothole",
+                                     location_name="x", latitude=0, longitude=0)
+        for user in users:
+            ReportedUser.objects.create(issue=issue, user=user)
+        issue.progress_percentage = 50
+        issue.save()  # Loaded before the reports: a full save must not write its heat back
+        issue.refresh_from_db()
+
+        trending.rebuild()
+        rebuilt = Issue.objects.get(id=issue.id)
+        self.assertAlmostEqual(issue.heat_key, rebuilt.heat_key, places=9)
+        self.assertEqual(issue.heat_updated_at, rebuilt.heat_updated_at)
+
+
+class QueryBudgetTests(QueryBudgetMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        from django.contrib.auth.models import User
+
+        cls.citizen = User.objects.create_user("citizen", "c@example.com", "pw")
+        cls.officer_user = User.objects.create_user("officer", "o@example.com", "pw")
+        cls.officer = Officer.objects.create(user=cls.officer_user, name="Officer", department="Roads")
+        today = work_queue.day_number(timezone.now())
+        cls.issues = Issue.objects.bulk_create([Issue(
+            user=cls.citizen, username="citizen", email="c@example.com", description=f"pothole {n}",
+            location_name="Main St", latitude=12.97 + n * 1e-4, longitude=77.59, assigned_officer=cls.officer,
+            created_day=today, queue_key=work_queue.queue_key(0.0, today),
+        ) for n in range(12)])
+        ReportedUser = Issue.reported_user_entries.rel.related_model
+        ReportedUser.objects.bulk_create([ReportedUser(issue=issue, user=cls.citizen) for issue in cls.issues])
+
+    def test_citizen_pages(self):
+        self.client.force_login(self.citizen)
+        for url_name in ("citizen_dashboard", "track_issue", "reported_issues", "authority_dashboard",
+                         "trending_issues", "prioritized_issues"):
+            self.assertEqual(self.assertWithinQueryBudget(self.client, url_name).status_code, 200)
+        self.assertWithinQueryBudget(self.client, "get_issue_status", self.issues[0].id)
+        self.assertWithinQueryBudget(self.client, "issue_detail", self.issues[0].id)
+        self.assertWithinQueryBudget(self.client, "nearby_issues", data={"lat": 12.97, "lon": 77.59})
+        page = self.assertWithinQueryBudget(self.client, "issue_list_api", data={"scope": "reported", "limit": 5}).json()
+        self.assertEqual(len(page["issues"]), 5)
+
+    def test_bad_coordinates_are_rejected(self):
+        self.client.force_login(self.citizen)
+        for params in ({"lat": 1, "lon": 1, "radius": "nan"}, {"lat": "nan", "lon": 1}, {"lat": 1, "lon": "inf"},
+                       {"lat": 95, "lon": 1}, {"lat": 1, "lon": 1, "radius": -5}, {"lat": 1}):
+            self.assertEqual(self.client.get(reverse("nearby_issues"), params).status_code, 400, params)
+        response = self.client.post(reverse("report_issue"), {
+            "location_name": "x", "description": "pothole", "latitude": "nan", "longitude": "1",
+        })
+        self.assertEqual(response.status_code, 400)
+
+    def test_officer_pages(self):
+        self.client.force_login(self.officer_user)
+        self.assertEqual(len(self.assertWithinQueryBudget(self.client, "officer_dashboard").context["issues"]), 12)
+        self.assertEqual(len(self.assertWithinQueryBudget(self.client, "officer_work_queue").json()["issues"]), 12)
+
+
+class IssueListApiTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        from django.contrib.auth.models import User
+
+        cls.citizen = User.objects.create_user("citizen", "c@example.com", "pw")
+        other = User.objects.create_user("other", "o@example.com", "pw")
+        cls.issues = Issue.objects.bulk_create([Issue(
+            user=cls.citizen if n % 4 else other, username="citizen", email="c@example.com",
+            description=f"pothole {n}", location_name="Main St", latitude=12.9 + n * 0.01, longitude=77.59,
+            status=("Pending", "In Progress", "Solved")[n % 3], priority=n % 4, priority_score=float(n % 5),
+        ) for n in range(20)])
+        ReportedUser.objects.bulk_create([ReportedUser(issue=issue, user=cls.citizen) for issue in cls.issues[:6]])
+
+    def setUp(self):
+        self.client.force_login(self.citizen)
+
+    def pages(self, **params):
+        ids, cursor = [], None
+        while True:
+            page = self.client.get(reverse("issue_list_api"), {**params, **({"cursor": cursor} if cursor else {})}).json()
+            ids += [issue["id"] for issue in page["issues"]]
+            cursor = page["next_cursor"]
+            if cursor is None:
+                return ids
+
+    def test_pages_cover_each_ordering_once(self):
+        mine = [issue for issue in self.issues if issue.user_id == self.citizen.id]
+        by_priority = sorted(mine, key=lambda issue: (-issue.priority_score, -issue.id))
+        self.assertEqual(self.pages(limit=4), sorted((issue.id for issue in mine), reverse=True))  # Created in id order
+        self.assertEqual(self.pages(order="priority", limit=4), [issue.id for issue in by_priority])
+        self.assertEqual(sorted(self.pages(scope="reported", limit=4)), [issue.id for issue in self.issues[:6]])
+
+    def test_fields_and_filters(self):
+        page = self.client.get(reverse("issue_list_api"), {
+            "fields": "id,status,priority", "status": "Pending,Solved", "priority": "2,3",
+            "bbox": "12.9,77.5,13.005,77.6",
+        }).json()
+        expected = [issue for issue in self.issues if issue.user_id == self.citizen.id and issue.latitude <= 13.005
+                    and issue.status != "In Progress" and issue.priority >= 2]
+        self.assertEqual(page["issues"], [{"id": issue.id, "status": issue.status, "priority": issue.priority}
+                                          for issue in sorted(expected, key=lambda issue: -issue.id)])
+
+    def test_bad_parameters_are_rejected(self):
+        for params in ({"fields": "id,password"}, {"order": "random"}, {"bbox": "1,2,3"}, {"status": "Lost"},
+                       {"cursor": "not-a-cursor"}, {"limit": "many"}, {"cursor": encode_cursor(["yesterday", 1])},
+                       {"cursor": encode_cursor([None, 1])}, {"cursor": encode_cursor([[2024], "x"])}):
+            self.assertEqual(self.client.get(reverse("issue_list_api"), params).status_code, 400, params)
+
+
+class SyntheticDataTests(TestCase):
+    def test_generated_rows_are_complete_and_consistent(self):
+        counts = synthetic.generate(200, users=30, officers=3, seed=7, batch_size=64)
+        self.assertEqual(counts["issues"], 200)
+        issues = list(Issue.objects.all())
+        self.assertEqual(counts["reports"], sum(issue.report_count for issue in issues))
+        self.assertEqual(Issue.reported_user_entries.rel.related_model.objects.count(), counts["reports"])
+        for issue in issues:
+            self.assertEqual(issue.geohash, encode_geohash(issue.latitude, issue.longitude))
+            self.assertEqual(issue.description_hash, description_hash(issue.description))
+            self.assertAlmostEqual(issue.created_day, work_queue.day_number(issue.created_at), places=6)
+            self.assertAlmostEqual(issue.queue_key, work_queue.queue_key(issue.priority_score, issue.created_day))
+        self.assertGreater(len({issue.created_at.date() for issue in issues}), 30)
+        self.assertEqual(assignment.recount(), 0)  # Officer counters match the rows
+
+    def test_same_seed_same_city(self):
+        first, second = synthetic.SyntheticCity(seed=3), synthetic.SyntheticCity(seed=3)
+        texts, _ = first.descriptions(20)
+        self.assertEqual(texts, second.descriptions(20)[0])
+        np.testing.assert_array_equal(first.points(20)[0], second.points(20)[0])
+
+
+@override_settings(PASSWORD_HASHERS=["django.contrib.auth.hashers.MD5PasswordHasher"])  # Logins in milliseconds
+class LoadTestTests(TestCase):
+    def test_summary_percentiles_and_error_rate(self):
+        recorder = loadtest.Recorder()
+        for ms in range(1, 101):
+            recorder.record("citizen_dashboard", ms / 1000, 200, True)
+        recorder.record("report_issue", 0.01, 500, False)
+        summary = loadtest.summarize(recorder, elapsed=10.0)
+        dashboard = summary["endpoints"]["citizen_dashboard"]
+        self.assertEqual((dashboard["requests"], dashboard["throughput_rps"], dashboard["p50_ms"]), (100, 10.0, 50.5))
+        self.assertAlmostEqual(dashboard["p99_ms"], 99.01)
+        self.assertEqual(summary["endpoints"]["report_issue"]["error_rate"], 1.0)
+        self.assertEqual(summary["totals"]["errors"], 1)
+
+    def test_virtual_users_log_in_and_act(self):
+        accounts = loadtest.ensure_accounts({"citizen": 1, "officer": 1}, "pw")
+        self.assertTrue(Officer.objects.filter(user__username=accounts["officer"][0]).exists())
+        recorder = loadtest.Recorder()
+        options = {"flood": True, "focus": (28.61, 77.21), "issue_ids": [], "think_ms": 0, "session_actions": 5}
+        citizen = loadtest.VirtualUser("citizen", accounts["citizen"][0], "pw", loadtest.ClientTransport(), recorder,
+                                       random.Random(0), synthetic.SyntheticCity(draws_seed=0), options)
+        citizen.login()
+        citizen.report_issue()
+        citizen.get_job_status()
+        officer = loadtest.VirtualUser("officer", accounts["officer"][0], "pw", loadtest.ClientTransport(), recorder,
+                                       random.Random(0), synthetic.SyntheticCity(draws_seed=0), options)
+        officer.login()
+        officer.officer_work_queue()
+        self.assertEqual(set(recorder.seconds), {"login", "report_issue", "get_job_status", "officer_work_queue"})
+        self.assertEqual(sum(recorder.errors.values()), 0, dict(recorder.statuses))
+        self.assertEqual(len(citizen.job_ids), 1)
+
+
+class ViewCacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        from django.contrib.auth.models import User
+
+        cls.user = User.objects.create_user("citizen", "c@example.com", "pw")
+        now = trending.exponent(timezone.now())
+        cls.issues = Issue.objects.bulk_create([Issue(
+            user=cls.user, username="citizen", email="c@example.com", description=f"pothole {n}",
+            location_name="Main St", latitude=12.97 + n * 1e-3, longitude=77.59, report_count=n + 1,
+            heat_key=now + n - 5,
+        ) for n in range(12)])  # Trending shows the 10 hottest, which here have report counts 12 down to 3
+
+    def setUp(self):
+        cache.clear()
+
+    def test_cached_until_a_change_that_matters(self):
+        with self.assertNumQueries(1):
+            self.assertEqual([i.report_count for i in view_cache.TRENDING.get()], list(range(12, 2, -1)))
+        with self.assertNumQueries(0):
+            view_cache.TRENDING.get()
+
+        top, bottom = Issue.objects.get(id=self.issues[-1].id), Issue.objects.get(id=self.issues[0].id)
+        top.progress_percentage = 50
+        top.save(update_fields=["progress_percentage"])  # Not shown on the list
+        bottom.report_count = 2
+        bottom.save(update_fields=["report_count"])  # Still colder than the 10th
+        with self.assertNumQueries(0):
+            view_cache.TRENDING.get()
+
+        ReportedUser.objects.create(issue=bottom, user=self.user)  # A fresh report outweighs old heat: enters
+        with self.assertNumQueries(1):
+            self.assertEqual(view_cache.TRENDING.get()[6].id, bottom.id)
+
+        ReportedUser.objects.create(issue=top, user=self.user)  # A listed issue gained a report
+        with self.assertNumQueries(1):
+            view_cache.TRENDING.get()
+
+    def test_change_during_rebuild_leaves_entry_stale(self):
+        def build(limit):
+            cached.invalidate()  # An issue saved while the query runs
+            return view_cache._trending(limit)
+
+        cached = view_cache.CachedList("test-race", build, "report_count", 10, fields=("report_count",))
+        cached.get()
+        cached.get()
+        self.assertEqual(cached.stats.counts["rebuilds"], 2)
+
+    def test_only_the_lock_holder_rebuilds(self):
+        view_cache.PRIORITIZED.get()
+        view_cache.PRIORITIZED.invalidate()
+        cache.add(f"{view_cache.PRIORITIZED.key}:lock", 1)  # Another worker is rebuilding
+        with self.assertNumQueries(0):
+            self.assertEqual(len(view_cache.PRIORITIZED.get()), 12)  # Served stale
+        self.assertEqual(view_cache.PRIORITIZED.stats.counts["stale_hits"], 1)
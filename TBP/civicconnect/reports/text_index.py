@@ -0,0 +1,144 @@
+"""Persistent inverted TF-IDF index over open issues' descriptions.
+
+Each open issue has one IssueTerm posting per distinct term, holding
+count / norm, where norm is the issue's TF-IDF vector length when it was
+indexed. A query only reads postings for its own terms. Document
+frequencies come from those same postings, and one GROUP BY then sums
+query weight x idf x posting weight per issue: the TF-IDF cosine similarity
+of TfidfVectorizer's defaults (lowercase, 2+ character word tokens, smooth
+idf, l2 norm).
+
+Postings are rewritten when an issue is saved with a new description or
+status (see signals.py) and removed when it's solved. Norms use the idf
+at the time the issue was indexed. While the corpus is small, idf moves a
+lot with every issue, so every posting is recomputed on each write; past
+FULL_REBUILD_BELOW open issues the drift is slow and
+`manage.py rebuild_text_index` recomputes postings periodically.
+"""
+import math
+import re
+from collections import Counter
+
+from django.db import transaction
+from django.db.models import Case, Count, F, FloatField, Sum, Value, When
+
+TOKEN_PATTERN = re.compile(r"(?u)\b\w\w+\b")  # TfidfVectorizer's default token_pattern
+MAX_TERM_LENGTH = 64
+BATCH_SIZE = 2000
+FULL_REBUILD_BELOW = 200  # Open issues; below this a full rebuild is cheaper than stale norms
+
+
+def term_counts(text):
+    return Counter(token[:MAX_TERM_LENGTH] for token in TOKEN_PATTERN.findall((text or "").lower()))
+
+
+def idf(df, n):
+    """Smoothed inverse document frequency, as TfidfVectorizer(smooth_idf=True) computes it."""
+    return math.log((1 + n) / (1 + df)) + 1
+
+
+def unit_weights(counts, idfs):
+    """{term: count / norm} where norm is the length of the count x idf vector."""
+    norm = math.sqrt(sum((count * idfs[term]) ** 2 for term, count in counts.items()))
+    return {term: count / norm for term, count in counts.items()} if norm else {}
+
+
+def _models():
+    from .models import Issue, IssueTerm
+
+    return Issue, IssueTerm
+
+
+def _open_count(Issue):
+    return Issue.objects.exclude(status="Solved").count()
+
+
+def _document_frequencies(IssueTerm, terms):
+    rows = IssueTerm.objects.filter(term__in=terms).values("term").annotate(df=Count("id"))
+    return {row["term"]: row["df"] for row in rows}
+
+
+def index_issue(issue):
+    """(Re)writes the postings of one issue; solved issues just lose theirs."""
+    Issue, IssueTerm = _models()
+    n = _open_count(Issue)
+    if n < FULL_REBUILD_BELOW:
+        rebuild(Issue, IssueTerm)
+        return
+    with transaction.atomic():
+        IssueTerm.objects.filter(issue_id=issue.pk).delete()
+        counts = term_counts(issue.description)
+        if issue.status == "Solved" or not counts:
+            return
+        df = _document_frequencies(IssueTerm, list(counts))
+        # The issue's own postings are not in yet, so count it in each of its terms.
+        weights = unit_weights(counts, {term: idf(df.get(term, 0) + 1, n) for term in counts})
+        IssueTerm.objects.bulk_create(
+            [IssueTerm(issue_id=issue.pk, term=term, weight=weight) for term, weight in weights.items()]
+        )
+
+
+def remove_issue(issue_id):
+    _, IssueTerm = _models()
+    IssueTerm.objects.filter(issue_id=issue_id).delete()
+
+
+def search(description, k=5, exclude=()):
+    """Top-k (issue_id, cosine similarity) pairs among open issues, best first."""
+    Issue, IssueTerm = _models()
+    counts = term_counts(description)
+    df = _document_frequencies(IssueTerm, list(counts))
+    counts = {term: count for term, count in counts.items() if term in df}  # Unknown terms can't match
+    if not counts:
+        return []
+    n = _open_count(Issue)
+    idfs = {term: idf(df[term], n) for term in counts}
+    query = unit_weights(counts, idfs)
+    # cosine = sum over shared terms of (query count / query norm * idf) * (idf * doc count / doc norm)
+    coefficient = Case(
+        *[When(term=term, then=Value(weight * idfs[term] ** 2)) for term, weight in query.items()],
+        output_field=FloatField(),
+    )
+    rows = (
+        IssueTerm.objects.filter(term__in=list(query))
+        .exclude(issue_id__in=list(exclude))
+        .values("issue_id")
+        .annotate(score=Sum(coefficient * F("weight")))
+        .order_by("-score", "issue_id")[:k]
+    )
+    return [(row["issue_id"], row["score"]) for row in rows]
+
+
+def rebuild(Issue=None, IssueTerm=None, batch_size=BATCH_SIZE, progress=None):
+    """Recomputes every posting from scratch with the current document frequencies.
+
+    Two streaming passes over open issues: one to count document
+    frequencies, one to write postings. `progress`, if given, is called with
+    the number of issues the current pass has read, once per batch. Returns
+    the number of issues indexed.
+    """
+    if Issue is None:
+        Issue, IssueTerm = _models()
+    rows = Issue.objects.exclude(status="Solved").order_by("id").values_list("id", "description")
+    df = Counter()
+    n = 0
+    for _, description in rows.iterator(chunk_size=batch_size):
+        df.update(term_counts(description).keys())
+        n += 1
+        if progress and n % batch_size == 0:
+            progress(n)
+
+    with transaction.atomic():
+        IssueTerm.objects.all().delete()
+        batch = []
+        for done, (issue_id, description) in enumerate(rows.iterator(chunk_size=batch_size), 1):
+            counts = term_counts(description)
+            weights = unit_weights(counts, {term: idf(df[term], n) for term in counts})
+            batch.extend(IssueTerm(issue_id=issue_id, term=term, weight=weight) for term, weight in weights.items())
+            if len(batch) >= batch_size:
+                IssueTerm.objects.bulk_create(batch)
+                batch = []
+                if progress:
+                    progress(done)
+        IssueTerm.objects.bulk_create(batch)
+    return n
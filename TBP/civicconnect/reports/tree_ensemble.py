@@ -0,0 +1,159 @@
+"""XGBoost tree ensembles compiled to flat NumPy arrays, and a vectorized evaluator.
+
+compile_booster() turns a trained booster into one set of node arrays for
+all trees. CompiledEnsemble walks every tree for a batch of rows in lockstep:
+one fancy-indexing step per tree level instead of one C++ call per
+prediction. Serving therefore needs only NumPy, not the xgboost runtime.
+
+The evaluator reproduces xgboost's predictions exactly:
+- features and thresholds are compared in float32 (`x < threshold` goes left);
+- absent (or zero) sparse entries are missing and take the node's default child;
+- leaf values are summed in float32, in tree order, on top of the base margin.
+"""
+import json
+
+import numpy as np
+
+ROW_BLOCK = 256  # Rows densified at a time; bounds the scratch matrix to ROW_BLOCK x num_features
+
+
+class UnsupportedModel(ValueError):
+    pass
+
+
+def _floats(value):
+    # base_score is stored as "5E-1" or, per class, "[5E-1,5E-1,5E-1]".
+    return [float(v) for v in value.strip("[]").split(",")]
+
+
+def compile_booster(booster):
+    """Returns a dict of flat arrays describing every tree of a gbtree booster."""
+    model = json.loads(booster.save_raw("json"))["learner"]
+    objective = model["objective"]["name"]
+    if objective not in ("multi:softmax", "multi:softprob"):
+        raise UnsupportedModel(f"Only multi-class softmax boosters can be compiled, not {objective}")
+    if model["gradient_booster"]["name"] != "gbtree":
+        raise UnsupportedModel("Only gbtree boosters can be compiled")
+    params = model["learner_model_param"]
+    num_class = int(params["num_class"])
+    base_score = _floats(params["base_score"])
+    if len(base_score) == 1:
+        base_score *= num_class
+
+    trees = model["gradient_booster"]["model"]["trees"]
+    tree_class = model["gradient_booster"]["model"]["tree_info"]
+    feature, threshold, left, right, default, roots = [], [], [], [], [], []
+    max_depth = 0
+    for tree in trees:
+        if any(tree["split_type"]):
+            raise UnsupportedModel("Categorical splits are not supported")
+        offset = len(feature)
+        roots.append(offset)
+        lefts = tree["left_children"]
+        is_leaf = [child == -1 for child in lefts]
+        for node, leaf in enumerate(is_leaf):
+            if leaf:
+                # Leaves point at themselves so a finished row stays put while deeper rows keep walking.
+                feature.append(-1)
+                left.append(offset + node)
+                right.append(offset + node)
+                default.append(offset + node)
+            else:
+                feature.append(tree["split_indices"][node])
+                left.append(offset + lefts[node])
+                right.append(offset + tree["right_children"][node])
+                default.append(offset + (lefts[node] if tree["default_left"][node] else tree["right_children"][node]))
+            # For a leaf, split_conditions holds the leaf value.
+            threshold.append(tree["split_conditions"][node])
+
+        depth = [0] * len(lefts)
+        for node, parent in enumerate(tree["parents"]):
+            if parent != 2147483647:  # Root's parent sentinel
+                depth[node] = depth[parent] + 1
+        max_depth = max(max_depth, max(depth))
+
+    return {
+        "feature": np.array(feature, dtype=np.int32),
+        "threshold": np.array(threshold, dtype=np.float32),
+        "left": np.array(left, dtype=np.int32),
+        "right": np.array(right, dtype=np.int32),
+        "default": np.array(default, dtype=np.int32),
+        "roots": np.array(roots, dtype=np.int32),
+        "tree_class": np.array(tree_class, dtype=np.int32),
+        "base_score": np.array(base_score, dtype=np.float32),
+        "max_depth": np.array(max_depth, dtype=np.int32),
+        "num_feature": np.array(int(params["num_feature"]), dtype=np.int32),
+    }
+
+
+class CompiledEnsemble:
+    def __init__(self, arrays):
+        self.feature = arrays["feature"]
+        self.threshold = arrays["threshold"]
+        self.left = arrays["left"]
+        self.right = arrays["right"]
+        self.default = arrays["default"]
+        self.roots = arrays["roots"]
+        self.base_score = arrays["base_score"]
+        self.max_depth = int(arrays["max_depth"])
+        self.num_feature = int(arrays["num_feature"])
+        self.num_class = len(self.base_score)
+
+        tree_class = arrays["tree_class"]
+        # Trees are stored round-robin by class (0, 1, 2, 0, 1, 2, ...). Evaluate them
+        # grouped by class, keeping their order within a class, so each class's
+        # leaf values sit in one contiguous run that can be summed in tree order.
+        by_class = [np.flatnonzero(tree_class == c) for c in range(self.num_class)]
+        if len({len(trees) for trees in by_class}) != 1:
+            raise UnsupportedModel("Every class must have the same number of trees")
+        self._roots = self.roots[np.concatenate(by_class)]
+        self._trees_per_class = len(by_class[0])
+        # Leaves read the extra always-missing column at index num_feature.
+        self._safe_feature = np.where(self.feature < 0, self.num_feature, self.feature)
+        # children[3 * node + k] with k = 0 right, 1 left (x < threshold), 2 default (x missing).
+        self._children = np.stack([self.right, self.left, self.default], axis=1).ravel()
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as arrays:
+            return cls({name: arrays[name] for name in arrays.files})
+
+    def _leaves(self, dense):
+        """Leaf node reached in every tree by every row of `dense` (NaN = missing)."""
+        # Flat indexing with np.take is several times cheaper than 2-D fancy indexing.
+        row_offset = (np.arange(len(dense)) * dense.shape[1])[:, None]
+        flat = dense.ravel()
+        nodes = np.broadcast_to(self._roots, (len(dense), len(self._roots)))
+        for _ in range(self.max_depth):
+            x = flat.take(row_offset + self._safe_feature.take(nodes))
+            # NaN compares False, so a missing value lands on 0 + 2 = default.
+            branch = (x < self.threshold.take(nodes)) + np.isnan(x) * 2
+            nodes = self._children.take(nodes * 3 + branch)
+        return nodes
+
+    def margins_sparse(self, indptr, indices, data):
+        """Raw per-class scores for CSR rows (indptr/indices/data), shape (rows, num_class)."""
+        n_rows = len(indptr) - 1
+        out = np.empty((n_rows, self.num_class), dtype=np.float32)
+        data = np.asarray(data, dtype=np.float32)
+        for start in range(0, n_rows, ROW_BLOCK):
+            stop = min(start + ROW_BLOCK, n_rows)
+            lo, hi = indptr[start], indptr[stop]
+            # NaN means "missing"; the extra last column is what leaves look up.
+            dense = np.full((stop - start, self.num_feature + 1), np.nan, dtype=np.float32)
+            row_of = np.repeat(np.arange(stop - start), np.diff(indptr[start:stop + 1]))
+            values = data[lo:hi]
+            present = values != 0  # A stored zero is missing too, as with absent entries
+            dense[row_of[present], indices[lo:hi][present]] = values[present]
+
+            terms = np.empty((stop - start, self.num_class, self._trees_per_class + 1), dtype=np.float32)
+            terms[:, :, 0] = self.base_score
+            terms[:, :, 1:] = self.threshold[self._leaves(dense)].reshape(stop - start, self.num_class, -1)
+            # cumsum adds strictly left to right (np.sum may pair terms up): base margin
+            # first, then each tree in order, exactly as xgboost accumulates in float32.
+            out[start:stop] = np.cumsum(terms, axis=2, dtype=np.float32)[:, :, -1]
+        return out
+
+    def predict_sparse(self, indptr, indices, data):
+        """Class index per row (argmax of the margins, as multi:softmax does)."""
+        return np.argmax(self.margins_sparse(indptr, indices, data), axis=1)
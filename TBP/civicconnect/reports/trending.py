@@ -0,0 +1,116 @@
+"""Trending issues: a report count that decays with a half-life.
+
+An issue's heat at time t sums its reports, each weighted down by age:
+
+    heat(t) = sum over reports of 2 ** -((t - reported_at) / half_life)
+
+Written as 2 ** -(t / half_life) * sum(2 ** (reported_at / half_life)),
+the factor in t is the same for every issue, so, as with the work queue
+(see work_queue.py), the *order* never changes with time. Issue.heat_key
+stores the log of the rest,
+
+    heat_key = log2(sum(2 ** (reported_at / half_life)))
+
+and trending is simply ORDER BY heat_key DESC, id DESC over the index
+issue_heat_idx: the top k are the first k index entries. Each new report
+moves one row by a single UPDATE,
+
+    heat_key = logaddexp2(heat_key, reported_at / half_life)
+
+done in SQL so concurrent reports can't lose one another, and
+heat_updated_at records when the key last moved (the latest report), so
+heat_at() can tell how much an issue has cooled since. Keys grow by
+about one per half-life, so float precision is never an issue.
+
+Deleting a report doesn't lower the key, and after changing
+TRENDING_HALF_LIFE_HOURS, or inserting reports without save() (bulk_create,
+raw SQL), run `manage.py rebuild_heat` to recompute every key from
+ReportedUser.reported_at.
+"""
+import math
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Value
+from django.db.models.functions import Abs, Coalesce, Greatest, Least, Ln, Power
+
+from .work_queue import day_number
+
+TRENDING_ORDERING = ("-heat_key", "-id")  # Matches issue_heat_idx
+BATCH_SIZE = 2000
+# Beyond this gap the smaller term adds less than a float can hold; capping it also keeps
+# POWER() clear of underflow, which PostgreSQL reports as an error.
+MAX_GAP = 64.0
+
+
+def exponent(when, half_life_hours=None):
+    """log2 of the weight a report made at `when` adds to heat_key: its time in half-lives since the epoch."""
+    half_life_hours = settings.TRENDING_HALF_LIFE_HOURS if half_life_hours is None else half_life_hours
+    return day_number(when) * 24.0 / half_life_hours
+
+
+def heat_key_expression(when):
+    """heat_key for UPDATE ... SET: the row's own key with one report made at `when` added."""
+    x = Value(exponent(when))
+    gap = Least(Abs(F("heat_key") - x), Value(MAX_GAP))
+    return Greatest(F("heat_key"), x) + Ln(Value(1.0) + Power(Value(2.0), -gap)) / Value(math.log(2))
+
+
+def record_report(issue_id, when):
+    """Adds a report made at `when` to the issue's heat. Returns the new heat_key."""
+    from .models import Issue
+
+    with transaction.atomic():
+        Issue.objects.filter(id=issue_id).update(
+            heat_key=heat_key_expression(when),
+            heat_updated_at=Greatest(Coalesce(F("heat_updated_at"), Value(when)), Value(when)),
+        )
+        return Issue.objects.filter(id=issue_id).values_list("heat_key", flat=True).first()
+
+
+def combine(exponents):
+    """heat_key of a set of reports, from their exponent()s; 0.0 (one report at the epoch) for none."""
+    return float(np.logaddexp2.reduce(exponents)) if len(exponents) else 0.0
+
+
+def heat_at(issue, now):
+    """The issue's decayed report count as of `now`."""
+    return 2.0 ** (issue.heat_key - exponent(now))
+
+
+def trending_issues():
+    from .models import Issue
+
+    return Issue.objects.order_by(*TRENDING_ORDERING)
+
+
+def rebuild(Issue=None, ReportedUser=None, batch_size=BATCH_SIZE):
+    """Recomputes every issue's heat from its ReportedUser rows. Returns the number of issues updated.
+
+    Works through the table in id ranges, each read and written in one
+    transaction, so reports made meanwhile are lost only within a range.
+    """
+    if Issue is None:
+        from .models import Issue, ReportedUser
+
+    ids = Issue.objects.order_by("id").values_list("id", flat=True)
+    updated = 0
+    last_id = 0
+    while True:
+        with transaction.atomic():
+            chunk = list(ids.filter(id__gt=last_id)[:batch_size])
+            if not chunk:
+                return updated
+            reports = {issue_id: [] for issue_id in chunk}
+            rows = ReportedUser.objects.filter(issue_id__gte=chunk[0], issue_id__lte=chunk[-1])
+            for issue_id, reported_at in rows.values_list("issue_id", "reported_at").iterator(chunk_size=batch_size):
+                if issue_id in reports:  # Not an issue inserted since `chunk` was read
+                    reports[issue_id].append(reported_at)
+            Issue.objects.bulk_update([
+                Issue(id=issue_id, heat_key=combine([exponent(when) for when in times]),
+                      heat_updated_at=max(times, default=None))
+                for issue_id, times in reports.items()
+            ], ["heat_key", "heat_updated_at"])
+        updated += len(chunk)
+        last_id = chunk[-1]
@@ -1,15 +1,18 @@
 from django.urls import path
+from .metrics import metrics_view
 from .views import (
     home, index,citizen_register, authority_register,
     citizen_login, authority_login, citizen_dashboard, authority_dashboard,
     prioritized_issues, report_issue,logout_user,trending_issues,
-    officer_login, officer_dashboard, issue_detail, track_issue,update_progress,reported_issues
+    officer_login, officer_dashboard, issue_detail, track_issue,update_progress,reported_issues,
+    nearby_issues, get_issue_status, officer_work_queue, issue_list_api
 )
 
 urlpatterns = [
     path("", home, name="home"),
     path("index/", index, name="index"),
     path("report_issue/", report_issue, name="report_issue"),
+    path("issues/nearby/", nearby_issues, name="nearby_issues"),
     #path("submit-issue/", submit_issue, name="submit_issue"),
     path("citizen/register/", citizen_register, name="citizen_register"),
     path("authority/register/", authority_register, name="authority_register"),
@@ -21,9 +24,31 @@ urlpatterns = [
     path("trending-issues/", trending_issues, name="trending_issues"),
     path("officer-login/", officer_login, name="officer_login"),
     path("officer-dashboard/", officer_dashboard, name="officer_dashboard"),
+    path("officer/queue/", officer_work_queue, name="officer_work_queue"),
     path("issue/<int:issue_id>/", issue_detail, name="issue_detail"),
     path('reported-issues/', reported_issues, name='reported_issues'),
     path("track/", track_issue, name="track_issue"),  # ✅ Proper import added
+    path("api/issues/", issue_list_api, name="issue_list_api"),
+    path("get_issue_status/<int:issue_id>/", get_issue_status, name="get_issue_status"),
+    path("get_issue_status/job/<int:job_id>/", get_issue_status, name="get_job_status"),
     path("update-progress/<int:issue_id>/", update_progress, name="update_progress"),
     path("logout/", logout_user, name="logout"),
+    path("metrics/", metrics_view, name="metrics"),
 ]
+
+# Most SQL queries a request to each view may make, however many rows it shows
+# (session + user lookups included). Enforced by reports.testing.QueryBudgetMixin.
+QUERY_BUDGETS = {
+    "citizen_dashboard": 3,
+    "track_issue": 3,
+    "reported_issues": 3,
+    "authority_dashboard": 3,
+    "officer_dashboard": 4,
+    "officer_work_queue": 4,
+    "trending_issues": 3,
+    "prioritized_issues": 3,
+    "nearby_issues": 3,
+    "issue_detail": 3,
+    "get_issue_status": 3,
+    "issue_list_api": 3,
+}
@@ -0,0 +1,261 @@
+"""In-process IVF (inverted file) index over the embeddings of open issues.
+
+Vectors are bucketed by their nearest k-means centroid; a query only scores
+the rows in the `nprobe` buckets closest to it. Inserts and deletes are
+incremental, and the whole index can be written to / read from an .npz
+snapshot so worker processes don't rebuild it at boot.
+
+Other processes' writes reach the index through sync(), which re-reads the
+issues whose updated_at moved since the index last looked: new ones, edited
+(re-encoded) ones, and ones solved or moved to another embedding version.
+Anything that writes an embedding or status must therefore stamp updated_at,
+as save() does.
+"""
+import datetime
+import os
+import threading
+from datetime import timedelta
+
+import numpy as np
+from django.conf import settings
+from django.utils import timezone
+
+from . import embeddings
+from .geo import haversine_m
+
+MIN_ROWS_PER_LIST = 64  # Below this many rows per centroid an exact scan is cheaper
+KMEANS_ITERATIONS = 10
+# updated_at is stamped when save() runs, not when its transaction commits (see cron.py), so
+# sync() looks this far behind its last mark; rows it sees twice are left untouched.
+SYNC_OVERLAP = timedelta(seconds=60)
+
+
+def _kmeans(vectors, nlist, rng):
+    centroids = vectors[rng.choice(len(vectors), nlist, replace=False)].copy()
+    for _ in range(KMEANS_ITERATIONS):
+        assign = np.argmax(vectors @ centroids.T, axis=1)
+        for c in range(nlist):
+            members = vectors[assign == c]
+            if len(members):
+                centroid = members.mean(axis=0)
+                centroids[c] = centroid / (np.linalg.norm(centroid) or 1.0)
+    return centroids
+
+
+class IssueVectorIndex:
+    def __init__(self, dim, centroids=None, nprobe=8):
+        self.dim = dim
+        self.centroids = centroids if centroids is not None else np.zeros((0, dim), dtype=embeddings.EMBEDDING_DTYPE)
+        self.nprobe = nprobe
+        self.synced_at = None  # When sync() (or the build) last read the issue table
+        self._lock = threading.RLock()
+        self._ids = np.zeros(0, dtype=np.int64)
+        self._vectors = np.zeros((0, dim), dtype=embeddings.EMBEDDING_DTYPE)
+        self._coords = np.zeros((0, 2), dtype=np.float64)
+        self._alive = np.zeros(0, dtype=bool)
+        self._bucket = np.zeros(0, dtype=np.int32)
+        self._size = 0
+        self._row_of = {}
+        self._lists = [[] for _ in range(max(len(self.centroids), 1))]
+
+    def __len__(self):
+        return len(self._row_of)
+
+    def __contains__(self, issue_id):
+        return issue_id in self._row_of
+
+    @classmethod
+    def build(cls, ids, vectors, coords, nprobe=8, seed=0):
+        vectors = np.asarray(vectors, dtype=embeddings.EMBEDDING_DTYPE)
+        dim = vectors.shape[1]
+        nlist = len(vectors) // MIN_ROWS_PER_LIST
+        nlist = int(np.sqrt(len(vectors))) if nlist > 1 else 0
+        centroids = _kmeans(vectors, nlist, np.random.default_rng(seed)) if nlist else None
+        index = cls(dim, centroids, nprobe)
+        for issue_id, vector, (lat, lon) in zip(ids, vectors, coords):
+            index.add(int(issue_id), vector, lat, lon)
+        return index
+
+    def _list_for(self, vector):
+        if not len(self.centroids):
+            return 0
+        return int(np.argmax(self.centroids @ vector))
+
+    def _grow(self):
+        capacity = max(2 * len(self._ids), 256)
+        for name in ("_ids", "_vectors", "_coords", "_alive", "_bucket"):
+            old = getattr(self, name)
+            new = np.zeros((capacity,) + old.shape[1:], dtype=old.dtype)
+            new[: self._size] = old[: self._size]
+            setattr(self, name, new)
+
+    def add(self, issue_id, vector, lat, lon):
+        with self._lock:
+            row = self._row_of.get(issue_id)
+            if row is not None and np.array_equal(self._vectors[row], vector) and tuple(self._coords[row]) == (lat, lon):
+                return  # Unchanged; re-adding would only leave a tombstone
+            self.remove(issue_id)
+            if self._size == len(self._ids):
+                self._grow()
+            row = self._size
+            self._size += 1
+            self._ids[row] = issue_id
+            self._vectors[row] = vector
+            self._coords[row] = (lat, lon)
+            self._alive[row] = True
+            self._row_of[issue_id] = row
+            self._bucket[row] = self._list_for(self._vectors[row])
+            self._lists[self._bucket[row]].append(row)
+
+    def remove(self, issue_id):
+        with self._lock:
+            row = self._row_of.pop(issue_id, None)
+            if row is not None:
+                # Rows are tombstoned and skipped at query time; compact() reclaims them.
+                self._alive[row] = False
+                if self._size > 1024 and len(self._row_of) < self._size // 2:
+                    self.compact()
+
+    def compact(self):
+        with self._lock:
+            live = np.flatnonzero(self._alive[: self._size])
+            for name in ("_ids", "_vectors", "_coords", "_alive", "_bucket"):
+                setattr(self, name, getattr(self, name)[live].copy())
+            self._size = len(live)
+            self._row_of = {int(issue_id): row for row, issue_id in enumerate(self._ids)}
+            self._lists = [[] for _ in self._lists]
+            for row, bucket in enumerate(self._bucket):
+                self._lists[bucket].append(row)
+
+    def query(self, vector, k=10, lat=None, lon=None, radius_m=None, min_score=None):
+        """Returns up to k (issue_id, score) pairs, best first.
+
+        When lat/lon/radius_m are given, only issues within radius_m metres of
+        that point are considered.
+        """
+        with self._lock:
+            if len(self.centroids):
+                probes = np.argsort(-(self.centroids @ vector))[: self.nprobe]
+                rows = np.fromiter(
+                    (row for p in probes for row in self._lists[p]), dtype=np.int64
+                )
+            else:
+                rows = np.arange(self._size)
+            if not len(rows):
+                return []
+            rows = rows[self._alive[rows]]
+            if radius_m is not None and lat is not None and lon is not None:
+                coords = self._coords[rows]
+                rows = rows[haversine_m(lat, lon, coords[:, 0], coords[:, 1]) <= radius_m]
+            if not len(rows):
+                return []
+            scores = self._vectors[rows] @ vector
+            if min_score is not None:
+                keep = scores >= min_score
+                rows, scores = rows[keep], scores[keep]
+            top = np.argsort(-scores)[:k] if len(scores) <= k else np.argpartition(-scores, k)[:k]
+            top = top[np.argsort(-scores[top])]
+            return [(int(self._ids[rows[i]]), float(scores[i])) for i in top]
+
+    def save(self, path):
+        with self._lock:
+            live = np.flatnonzero(self._alive[: self._size])
+            tmp_path = f"{path}.tmp.npz"
+            np.savez(
+                tmp_path,
+                ids=self._ids[live],
+                vectors=self._vectors[live],
+                coords=self._coords[live],
+                centroids=self.centroids,
+                synced_at=np.float64(self.synced_at.timestamp() if self.synced_at else np.nan),
+                embedding_version=np.str_(embeddings.embedding_version()),
+            )
+            os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path, nprobe=8):
+        """Loads a snapshot, or returns None if it is missing, from an older format or another embedding model."""
+        if not os.path.exists(path):
+            return None
+        with np.load(path) as data:
+            if "synced_at" not in data.files or str(data["embedding_version"]) != embeddings.embedding_version():
+                return None
+            centroids = data["centroids"]
+            index = cls(data["vectors"].shape[1], centroids if len(centroids) else None, nprobe)
+            for issue_id, vector, (lat, lon) in zip(data["ids"], data["vectors"], data["coords"]):
+                index.add(int(issue_id), vector, lat, lon)
+            synced_at = float(data["synced_at"])
+            if not np.isnan(synced_at):
+                index.synced_at = datetime.datetime.fromtimestamp(synced_at, tz=datetime.timezone.utc)
+        return index
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def snapshot_path():
+    return settings.ISSUE_INDEX_PATH
+
+
+def open_issues():
+    from .models import Issue
+
+    return Issue.objects.exclude(status="Solved").exclude(embedding__isnull=True).filter(
+        embedding_version=embeddings.embedding_version()
+    )
+
+
+def build_from_db():
+    started = timezone.now()
+    rows = list(open_issues().values_list("id", "embedding", "latitude", "longitude"))
+    if rows:
+        vectors = np.stack([embeddings.from_bytes(row[1]) for row in rows])
+    else:
+        vectors = np.zeros((0, embeddings.EMBEDDING_DIM), dtype=embeddings.EMBEDDING_DTYPE)
+    index = IssueVectorIndex.build([row[0] for row in rows], vectors, [(row[2], row[3]) for row in rows])
+    index.synced_at = started
+    return index
+
+
+def sync(index):
+    """Applies the issues saved (by any process) since the index last looked.
+
+    A changed issue is (re-)added if it is open with a current embedding and
+    removed otherwise, so edits, re-encodings and solved issues all show up,
+    not only new rows. An index that was never synced reads every issue.
+    """
+    from .models import Issue
+
+    started = timezone.now()
+    since = index.synced_at
+    changed = Issue.objects.all() if since is None else Issue.objects.filter(updated_at__gte=since - SYNC_OVERLAP)
+    changed = changed.values_list("id", "status", "embedding", "embedding_version", "latitude", "longitude")
+    version = embeddings.embedding_version()
+    for issue_id, status, embedding, embedding_version, lat, lon in changed:
+        if status != "Solved" and embedding and embedding_version == version:
+            index.add(issue_id, embeddings.from_bytes(embedding), lat, lon)
+        else:
+            index.remove(issue_id)
+    index.synced_at = started
+
+
+def get_index():
+    """Returns this process's index, loading the snapshot (or building from the DB) on first use."""
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = IssueVectorIndex.load(snapshot_path()) or build_from_db()
+    sync(_index)
+    return _index
+
+
+def loaded_index():
+    """Returns the index only if this process has already loaded it."""
+    return _index
+
+
+def reset_index():
+    global _index
+    with _index_lock:
+        _index = None
@@ -0,0 +1,177 @@
+"""Shared lists every authority sees (trending, prioritized), cached through Django's cache.
+
+Each CachedList keeps three cache keys:
+
+    <key>:data   the evaluated list, kept VIEW_CACHE_SECONDS x STALE_FACTOR
+    <key>:gen    a generation counter, bumped by invalidate()
+    <key>:built  the generation the data was built at, and which ids and
+                 sort value it covers (for targeted invalidation)
+
+The data is fresh while `built` matches `gen` and is younger than
+VIEW_CACHE_SECONDS. A change that lands while a list is being rebuilt
+bumps `gen` first, so the rebuilt entry is born stale rather than hiding
+the change.
+
+Stampede protection: when the entry is stale, the worker that wins
+cache.add() on <key>:lock rebuilds it. Everyone else serves the stale
+list meanwhile, or, if there is none yet, waits up to WAIT_SECONDS for the
+winner before building it themselves.
+
+Invalidation is targeted (see signals.py): a saved or deleted issue only
+bumps a list when it is on it, or when its sort value is high enough to
+enter it. Bulk updates that skip signals (scoring.reprioritize) invalidate
+explicitly; VIEW_CACHE_SECONDS bounds anything else.
+
+Use a shared cache backend (REDIS_URL) so workers share entries and locks;
+the per-process default still caches, it just can't coordinate.
+"""
+import time
+from numbers import Number
+
+from django.conf import settings
+from django.core.cache import cache
+
+STALE_FACTOR = 10  # Stale data is kept this many times longer than it is fresh, to serve during rebuilds
+WAIT_SECONDS = 2.0
+POLL_SECONDS = 0.05
+
+
+class CacheStats:
+    def __init__(self):
+        self.counts = {"hits": 0, "stale_hits": 0, "rebuilds": 0, "waits": 0, "uncached_builds": 0,
+                       "invalidations": 0}
+
+    def add(self, event):
+        self.counts[event] += 1  # A lost increment under a race only blurs a counter
+
+
+class CachedList:
+    def __init__(self, name, build, sort_field, limit, fields):
+        self.name = name
+        self.key = f"views:{name}"
+        self.build = build  # Called with `limit`; returns the list, in `sort_field` order, descending
+        self.sort_field = sort_field
+        self.limit = limit
+        self.fields = set(fields)  # Issue fields shown on the page
+        self.stats = CacheStats()
+
+    def _generation(self):
+        generation = cache.get(f"{self.key}:gen")
+        if generation is None:
+            cache.add(f"{self.key}:gen", 0, timeout=None)
+            generation = cache.get(f"{self.key}:gen", 0)
+        return generation
+
+    def get(self):
+        values = cache.get_many([f"{self.key}:data", f"{self.key}:built", f"{self.key}:gen"])
+        data, built = values.get(f"{self.key}:data"), values.get(f"{self.key}:built")
+        generation = values.get(f"{self.key}:gen", 0)
+        if data is not None and built and built["generation"] == generation and built["fresh_until"] > time.time():
+            self.stats.add("hits")
+            return data
+
+        lock_key = f"{self.key}:lock"
+        if cache.add(lock_key, 1, timeout=settings.VIEW_CACHE_LOCK_SECONDS):
+            try:
+                return self._rebuild()
+            finally:
+                cache.delete(lock_key)
+        if data is not None:
+            self.stats.add("stale_hits")
+            return data
+
+        # Cold cache and another worker is already building: wait for it instead of piling on.
+        self.stats.add("waits")
+        deadline = time.monotonic() + WAIT_SECONDS
+        while time.monotonic() < deadline:
+            time.sleep(POLL_SECONDS)
+            data = cache.get(f"{self.key}:data")
+            if data is not None:
+                return data
+        self.stats.add("uncached_builds")
+        return self.build(self.limit)
+
+    def _rebuild(self):
+        self.stats.add("rebuilds")
+        generation = self._generation()  # Read before the query, so a change during it makes this stale
+        data = self.build(self.limit)
+        full = len(data) >= self.limit
+        cache.set_many({
+            f"{self.key}:data": data,
+            f"{self.key}:built": {
+                "generation": generation,
+                "fresh_until": time.time() + settings.VIEW_CACHE_SECONDS,
+                "ids": {item.id for item in data},
+                # Rows sorting below this can't enter the list; None while the list isn't full.
+                "threshold": getattr(data[-1], self.sort_field) if full else None,
+            },
+        }, timeout=settings.VIEW_CACHE_SECONDS * STALE_FACTOR)
+        return data
+
+    def invalidate(self):
+        self.stats.add("invalidations")
+        try:
+            cache.incr(f"{self.key}:gen")
+        except ValueError:  # No counter yet, so nothing built from it either
+            cache.add(f"{self.key}:gen", 1, timeout=None)
+
+    def affected_by(self, built, issue_id, sort_value, update_fields=None):
+        """Whether a change to this issue can change the cached list described by `built`."""
+        if update_fields is not None and not self.fields & set(update_fields):
+            return False
+        if issue_id in built["ids"] or built["threshold"] is None:
+            return True
+        # An F() expression (e.g. report_count + 1) has no value yet; assume it may qualify.
+        return not isinstance(sort_value, Number) or sort_value >= built["threshold"]
+
+
+def _trending(limit):
+    from . import trending
+
+    return list(trending.trending_issues()[:limit])
+
+
+def _prioritized(limit):
+    from .models import Issue
+
+    return list(Issue.objects.order_by("-priority_score", "-report_count", "-id")[:limit])
+
+
+TRENDING = CachedList("trending", _trending, "heat_key", 10,
+                      fields=("description", "location_name", "report_count", "severity", "priority", "image",
+                              "heat_key"))
+PRIORITIZED = CachedList("prioritized", _prioritized, "priority_score", 200,
+                         fields=("description", "location_name", "priority_score", "report_count"))
+LISTS = (TRENDING, PRIORITIZED)
+
+
+def _built(lists):
+    built = cache.get_many([f"{cached.key}:built" for cached in lists])
+    return [(cached, built[f"{cached.key}:built"]) for cached in lists if f"{cached.key}:built" in built]
+
+
+def issue_changed(issue, update_fields=None, deleted=False):
+    """Invalidates the cached lists a saved (or deleted) issue may appear on."""
+    for cached, built in _built(LISTS):
+        if deleted:
+            affected = issue.id in built["ids"]
+        else:
+            affected = cached.affected_by(built, issue.id, issue.__dict__.get(cached.sort_field), update_fields)
+        if affected:
+            cached.invalidate()
+
+
+def issue_reported(issue_id, heat_key=None):
+    """A report was added to (with the issue's new heat_key) or removed from an issue."""
+    for cached, built in _built([TRENDING]):
+        if issue_id in built["ids"] or (heat_key is not None and cached.affected_by(built, issue_id, heat_key)):
+            cached.invalidate()
+
+
+def invalidate_all():
+    for cached in LISTS:
+        cached.invalidate()
+
+
+def stats():
+    return {cached.name: dict(cached.stats.counts) for cached in LISTS}
@@ -1,15 +1,26 @@
+import hashlib
+
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth import authenticate, login
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
 from django.http import JsonResponse
-from django.contrib.auth.models import User
-from django.db.models import F, Q
 from django.views.decorators.csrf import csrf_exempt
-from django.db import IntegrityError
-from .models import Issue, Officer, ReportedUser
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.urls import reverse
+from django.utils import timezone
+from .models import Issue, Job, Officer
+from . import issue_api, jobs, view_cache, work_queue
+from .geo import parse_point, within_radius
+from .tasks import PROCESS_REPORT
+from .pagination import InvalidCursor, keyset_paginate
 from .forms import CitizenRegistrationForm, AuthorityRegistrationForm
-from .ai_prioritization import compute_severity, calculate_priority
+
+MAX_NEARBY_RADIUS_METERS = 5000
+DASHBOARD_PAGE_SIZE = 50
+DASHBOARD_ORDERING = ("-priority_score", "-report_count", "-id")  # Matches issue_dashboard_order_idx
+WORK_QUEUE_MAX_LIMIT = 100
 
 # ✅ Home Page View
 def home(request):
@@ -31,24 +42,39 @@ def citizen_login(request):
 # ✅ Citizen Dashboard
 @login_required
 def citizen_dashboard(request):
-    citizen_issues = Issue.objects.filter(user=request.user)
-    return render(request, "reports/citizen_dashboard.html", {"issues": citizen_issues})
+    return render(request, "reports/citizen_dashboard.html")
 
-# ✅ Track Issue
+# ✅ Track Issue (the list of the user's issues is paged in from issue_list_api)
 @login_required
 def track_issue(request):
-    issues = Issue.objects.filter(user=request.user).order_by('-created_at')
-    return render(request, 'reports/track_issue.html', {"issues": issues})
+    return render(request, 'reports/track_issue.html')
+
+# ✅ Issue List API (keyset pages of the user's issues; parameters in issue_api.py)
+@login_required
+def issue_list_api(request):
+    try:
+        return JsonResponse(issue_api.issue_page(request.user, request.GET))
+    except (issue_api.InvalidQuery, InvalidCursor) as e:
+        return JsonResponse({"error": str(e)}, status=400)
 
 # ✅ Get Issue Status
 @login_required
-def get_issue_status(request, issue_id=None):
+def get_issue_status(request, issue_id=None, job_id=None):
+    if job_id:
+        # A report still being processed: poll until its job is done, then show the issue.
+        job = get_object_or_404(Job, id=job_id, kind=PROCESS_REPORT, payload__user_id=request.user.id)
+        data = {"job_id": job.id, "job_status": job.status}
+        if job.status == Job.FAILED:
+            data["error"] = "Processing the report failed."
+        elif job.status == Job.DONE:
+            data.update(job.result)
+        return JsonResponse(data)
     try:
         if issue_id:
             issue = Issue.objects.get(id=issue_id, user=request.user)
         else:
-            issues = Issue.objects.filter(user=request.user).values('id', 'title', 'status', 'created_at')
-            return JsonResponse(list(issues), safe=False)
+            # The first page only; issue_list_api serves the rest (its next_cursor is included).
+            return JsonResponse(issue_api.issue_page(request.user, {}))
 
         data = {
             "title": issue.title,
@@ -64,64 +90,95 @@ def get_issue_status(request, issue_id=None):
 
 @login_required
 def reported_issues(request):
-    # ✅ Show all issues the user has ever reported (even duplicates)
-    issues = Issue.objects.filter(reported_user_entries__user=request.user).distinct()
-    return render(request, 'reports/reported_issues.html', {'issues': issues})
+    # ✅ All issues the user has ever reported (even duplicates), paged in from issue_list_api?scope=reported
+    return render(request, 'reports/reported_issues.html')
 
 
-# ✅ Report Issue with Semantic Deduplication + AI Priority
+# ✅ Report Issue: stored and queued; semantic dedup + AI priority run in a background job (tasks.process_report)
 @login_required
 def report_issue(request):
     if request.method == "POST":
         user = request.user
         location_name = request.POST.get("location_name", "").strip()
         description = request.POST.get("description", "").strip()
-        latitude = float(request.POST.get("latitude"))
-        longitude = float(request.POST.get("longitude"))
+        try:
+            latitude, longitude = parse_point(request.POST.get("latitude"), request.POST.get("longitude"))
+        except ValueError as e:
+            return JsonResponse({"error": str(e)}, status=400)
         image = request.FILES.get("image")
 
         if not location_name or not description:
             return JsonResponse({"error": "Location and description are required."}, status=400)
 
-        nearby_issues = Issue.objects.filter(
-            Q(latitude__range=(latitude - 0.0002, latitude + 0.0002)) &
-            Q(longitude__range=(longitude - 0.0002, longitude + 0.0002))
-        )
-
-        for issue in nearby_issues:
-            similarity = issue.compute_description_similarity(description)
-            if similarity >= 0.75:  # 75% semantic similarity threshold
-                if ReportedUser.objects.filter(issue=issue, user=user).exists():
-                    return JsonResponse({"error": "You have already reported this issue."}, status=400)
-                issue.report_count = F("report_count") + 1
-                issue.save(update_fields=["report_count"])
-                issue.refresh_from_db()
-                ReportedUser.objects.create(issue=issue, user=user)
-                issue.update_priority()
-                return JsonResponse({
-                    "message": "Issue already exists. Report count incremented.",
-                    "report_count": issue.report_count,
-                    "priority": issue.priority_score
-                })
-
-        new_issue = Issue.objects.create(
-            user=user,
-            username=user.username,
-            email=user.email,
-            description=description,
-            location_name=location_name,
-            latitude=latitude,
-            longitude=longitude,
-            image=image if image else None,
-            report_count=1
-        )
-        ReportedUser.objects.create(issue=new_issue, user=user)
-        new_issue.update_priority()
+        # A resubmitted form (double click, retry after a timeout) maps to the same job. The
+        # report form sends a key per page load; other clients fall back to same text/place/day.
+        key = request.headers.get("Idempotency-Key") or hashlib.sha256(
+            f"{description}|{latitude}|{longitude}|{timezone.localdate()}".encode()
+        ).hexdigest()
+        payload = {
+            "user_id": user.id,
+            "location_name": location_name,
+            "description": description,
+            "latitude": latitude,
+            "longitude": longitude,
+            "image": default_storage.save(f"issue_images/{image.name}", image) if image else None,
+        }
+        job = jobs.enqueue(PROCESS_REPORT, payload, idempotency_key=f"report:{user.id}:{key}"[:128])
+        if job.payload["image"] and job.payload["image"] != payload["image"]:
+            default_storage.delete(payload["image"])  # Resubmission: the first upload is the one used
 
-        return JsonResponse({"message": "New issue reported.", "issue_id": new_issue.id})
+        data = {
+            "message": "Report received.",
+            "job_id": job.id,
+            "job_status": job.status,
+            "status_url": reverse("get_job_status", args=[job.id]),
+        }
+        # Ran inline, or a resubmission of a finished report: answer with its outcome.
+        if job.status == Job.FAILED:
+            del data["message"]
+            data["error"] = "Processing the report failed."
+            return JsonResponse(data, status=500)
+        if job.status == Job.DONE:
+            data.update(job.result)
+            if "error" in job.result:
+                del data["message"]
+                return JsonResponse(data, status=400)
+        return JsonResponse(data, status=202)
 
     return JsonResponse({"error": "Invalid request method."}, status=400)
 
+# ✅ Open Issues Near a Point (for the report map)
+@login_required
+def nearby_issues(request):
+    if "lat" not in request.GET or "lon" not in request.GET:
+        return JsonResponse({"error": "lat and lon are required."}, status=400)
+    try:
+        latitude, longitude = parse_point(request.GET["lat"], request.GET["lon"])
+        radius = float(request.GET.get("radius", settings.DEDUP_RADIUS_METERS))
+    except ValueError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+    if not 0 < radius < float("inf"):  # Also false for NaN
+        return JsonResponse({"error": "radius must be a positive number of metres."}, status=400)
+    radius = min(radius, MAX_NEARBY_RADIUS_METERS)
+
+    open_issues = Issue.objects.exclude(status="Solved").only(
+        "id", "title", "description", "status", "latitude", "longitude", "report_count"
+    )
+    issues = within_radius(open_issues, latitude, longitude, radius)
+    return JsonResponse({"issues": [
+        {
+            "id": issue.id,
+            "title": issue.title,
+            "description": issue.description,
+            "status": issue.status,
+            "latitude": issue.latitude,
+            "longitude": issue.longitude,
+            "report_count": issue.report_count,
+            "distance_m": round(issue.distance_m, 1),
+        }
+        for issue in issues
+    ]})
+
 # ✅ Report Issue Page
 @login_required
 def index(request):
@@ -147,13 +204,18 @@ def authority_login(request):
 # ✅ Authority Dashboard
 @login_required
 def authority_dashboard(request):
-    issues = Issue.objects.all().order_by('-priority_score', '-report_count')
-
-    # ✅ Ensure priorities are freshly recalculated
-    for i in issues:
-        i.update_priority()
+    # Priorities are kept current on write, so this is a pure read of one page.
+    try:
+        page = keyset_paginate(
+            Issue.objects.select_related("user"),
+            DASHBOARD_ORDERING,
+            cursor=request.GET.get("cursor"),
+            page_size=DASHBOARD_PAGE_SIZE,
+        )
+    except InvalidCursor:
+        return redirect("authority_dashboard")
 
-    return render(request, "reports/authority_dashboard.html", {"reported_issues": issues})
+    return render(request, "reports/authority_dashboard.html", {"reported_issues": page.items, "page": page})
 
 
 # ✅ Citizen Registration
@@ -193,8 +255,8 @@ def authority_register(request):
 # ✅ AI-Prioritized Issues List
 @login_required
 def prioritized_issues(request):
-    calculate_priority()
-    issues = Issue.objects.order_by('-priority_score')
+    # Scores are kept current on write (and by the scheduler), so this only reads the shared cached list.
+    issues = view_cache.PRIORITIZED.get()
     return render(request, 'reports/prioritized_issues.html', {'issues': issues})
 
 # ✅ Officer Login
@@ -216,8 +278,40 @@ def officer_login(request):
 @login_required
 def officer_dashboard(request):
     officer = get_object_or_404(Officer, user=request.user)
-    issues = Issue.objects.filter(assigned_officer=officer)
-    return render(request, "reports/officer_dashboard.html", {"issues": issues})
+    # Open issues, most urgent first, with long-waiting ones aged upwards (see work_queue.py).
+    try:
+        page = keyset_paginate(work_queue.officer_queue(officer), work_queue.QUEUE_ORDERING,
+                               cursor=request.GET.get("cursor"), page_size=DASHBOARD_PAGE_SIZE)
+    except InvalidCursor:
+        return redirect("officer_dashboard")
+    return render(request, "reports/officer_dashboard.html", {"issues": page.items, "page": page})
+
+# ✅ Officer Work Queue API (?limit=1 is "what next?"; follow next_cursor for more)
+@login_required
+def officer_work_queue(request):
+    officer = get_object_or_404(Officer, user=request.user)
+    try:
+        limit = min(max(int(request.GET.get("limit", DASHBOARD_PAGE_SIZE)), 1), WORK_QUEUE_MAX_LIMIT)
+        page = keyset_paginate(work_queue.officer_queue(officer), work_queue.QUEUE_ORDERING,
+                               cursor=request.GET.get("cursor"), page_size=limit)
+    except (ValueError, InvalidCursor):
+        return JsonResponse({"error": "Invalid limit or cursor."}, status=400)
+    now = timezone.now()
+    return JsonResponse({
+        "issues": [{
+            "id": issue.id,
+            "title": issue.title,
+            "description": issue.description,
+            "location_name": issue.location_name,
+            "status": issue.status,
+            "severity": issue.severity,
+            "priority_score": issue.priority_score,
+            "effective_priority": round(work_queue.effective_priority(issue, now), 2),
+            "created_at": issue.created_at,
+            "progress_percentage": issue.progress_percentage,
+        } for issue in page.items],
+        "next_cursor": page.next_cursor,
+    })
 
 # ✅ Issue Detail View
 @login_required
@@ -256,10 +350,5 @@ def logout_user(request):
 # ✅ Trending Issues Dashboard
 @login_required
 def trending_issues(request):
-    trending_issues = Issue.objects.order_by('-report_count')[:10]
-    
-    # Refresh priority before showing
-    for issue in trending_issues:
-        issue.update_priority()
-
+    trending_issues = view_cache.TRENDING.get()
     return render(request, "reports/trending_issues.html", {"trending_issues": trending_issues})
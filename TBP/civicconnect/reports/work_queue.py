@@ -0,0 +1,67 @@
+"""Per-officer work queue: open issues by priority, with old issues aging upwards.
+
+An issue's effective priority at time t is
+
+    priority_score + WORK_QUEUE_AGING_PER_DAY * (t - created_at) in days
+
+so a low-priority issue overtakes fresher, higher-scored ones once it has
+waited long enough. The term in t is the same for every issue, so the
+*order* never changes with time. Issue.queue_key stores the rest,
+priority_score - rate * created_day, and the queue is simply ORDER BY
+queue_key DESC, id DESC. It is kept current with priority_score (see
+scoring.py), backed by the partial index officer_queue_idx over open
+issues, and paged by keyset. Any page, including "the next item", is one
+index range scan whatever the queue's length.
+
+After changing WORK_QUEUE_AGING_PER_DAY, or inserting issues without going
+through save() (bulk_create, raw SQL) and so without created_day, run
+`manage.py rekey_work_queue`.
+"""
+from django.conf import settings
+from django.db.models import F, Value
+
+QUEUE_ORDERING = ("-queue_key", "-id")  # Matches officer_queue_idx
+SECONDS_PER_DAY = 86400.0
+
+
+def day_number(when):
+    """`when` as days since the Unix epoch."""
+    return when.timestamp() / SECONDS_PER_DAY
+
+
+def queue_key(priority_score, created_day, rate=None):
+    rate = settings.WORK_QUEUE_AGING_PER_DAY if rate is None else rate
+    return priority_score - rate * created_day
+
+
+def queue_key_expression(priority_score=None):
+    """queue_key for UPDATE ... SET: from a fixed new score, or from the row's own priority_score."""
+    score = F("priority_score") if priority_score is None else Value(float(priority_score))
+    return score - Value(float(settings.WORK_QUEUE_AGING_PER_DAY)) * F("created_day")
+
+
+def effective_priority(issue, now):
+    """The aged priority the queue is ordered by, as of `now`."""
+    return issue.queue_key + settings.WORK_QUEUE_AGING_PER_DAY * day_number(now)
+
+
+def officer_queue(officer):
+    """Open issues assigned to `officer`, most urgent first."""
+    from .models import Issue
+
+    return Issue.objects.filter(assigned_officer=officer).exclude(status="Solved").order_by(*QUEUE_ORDERING)
+
+
+def rekey(batch_size=2000):
+    """Fills in missing created_day values, then recomputes every queue_key. Returns rows updated."""
+    from .models import Issue
+
+    batch = []
+    for issue in Issue.objects.filter(created_day=0).only("id", "created_at").iterator(chunk_size=batch_size):
+        issue.created_day = day_number(issue.created_at)
+        batch.append(issue)
+        if len(batch) >= batch_size:
+            Issue.objects.bulk_update(batch, ["created_day"])
+            batch = []
+    Issue.objects.bulk_update(batch, ["created_day"])
+    return Issue.objects.update(queue_key=queue_key_expression())